@@ -5,10 +5,19 @@
 #define TCA_ADDR        0x70        // TCA9548A I2C 주소
 #define MPU_ADDR        0x68        // MPU6050/6500 I2C 주소
 #define NUM_CHANNELS    8
-#define READ_INTERVAL   100ul       // ms, 브로드캐스트 간격
+#define READ_INTERVAL   100ul       // ms, 브로드캐스트 간격 (바이너리 프레임이면 20ms 이하도 가능)
 #define GYRO_SF         131.0       // GYRO_CONFIG=0x00(±250 dps)
 #define INT_PIN         D5          // INT 한 선으로 묶인 입력 핀(예: D5=GPIO14)
 
+// ===== 전송 형식 =====
+// 0: JSON 텍스트 프레임(기존), 1: 바이너리 프레임 (imu_protocol.py 로 디코딩)
+#define BINARY_FRAMES   0
+#define FRAME_FMT_F32   0
+#define FRAME_FMT_I16   1
+#define FRAME_FORMAT    FRAME_FMT_F32   // I16 은 값×I16_SCALE 을 int16 으로 (±327.67, 범위 밖은 포화)
+#define I16_SCALE       100
+#define FRAME_NFIELDS   6               // ROLL, PITCH, YAW, X_DEL_ANG, Y_DEL_ANG, Z_DEL_ANG
+
 // Wi-Fi
 const char* ssid     = "S23";
 const char* password = "dgm2025!";
@@ -31,6 +40,7 @@ double xDelAng[NUM_CHANNELS], yDelAng[NUM_CHANNELS], zDelAng[NUM_CHANNELS];
 
 unsigned long lastMicrosCh[NUM_CHANNELS]; // 채널별 마지막 업데이트(us)
 unsigned long lastBroadcast = 0;          // 마지막 전송(ms)
+uint32_t frameSeq = 0;                    // 프레임 번호 (JSON/바이너리 공통, 전송마다 +1)
 
 volatile bool intFlag = false;            // ISR 플래그
 
@@ -68,6 +78,28 @@ private:
 
 Kalman kalmanRoll[NUM_CHANNELS], kalmanPitch[NUM_CHANNELS];
 
+// ===== 바이너리 프레임 (little-endian, 16바이트 헤더 + 채널별 u32 t_us + 채널×6 값) =====
+struct __attribute__((packed)) FrameHeader {
+  uint8_t  magic[2];   // 'I','M'
+  uint8_t  version;    // 2 (1 = t_us 없음)
+  uint8_t  format;     // FRAME_FMT_F32 / FRAME_FMT_I16
+  uint8_t  nch;
+  uint8_t  nfields;
+  uint16_t scale;      // I16 배율 (F32 는 1)
+  uint32_t seq;
+  uint32_t micros;
+};
+
+#if FRAME_FORMAT == FRAME_FMT_I16
+typedef int16_t FrameValue;
+#else
+typedef float FrameValue;
+#endif
+
+// 값 영역이 4바이트 경계(16 + 4×채널)에서 시작하도록 버퍼도 정렬 (ESP8266 비정렬 float 쓰기 방지)
+static uint8_t frameBuf[sizeof(FrameHeader) + NUM_CHANNELS * sizeof(uint32_t)
+                        + NUM_CHANNELS * FRAME_NFIELDS * sizeof(FrameValue)] __attribute__((aligned(4)));
+
 // ===== 유틸 =====
 void tcaselect(uint8_t ch) {
   Wire.beginTransmission(TCA_ADDR);
@@ -206,6 +238,76 @@ void setup(){
   webSocket.enableHeartbeat(15000, 3000, 2); // 15s마다 ping, 3s 대기, 2회 실패시 종료
 }
 
+// ===== 브로드캐스트 =====
+static inline FrameValue toFrameValue(double v){
+#if FRAME_FORMAT == FRAME_FMT_I16
+  double s = v * I16_SCALE;
+  if (s >  32767.0) s =  32767.0;
+  if (s < -32768.0) s = -32768.0;
+  return (int16_t)lround(s);
+#else
+  return (float)v;
+#endif
+}
+
+void broadcastBinary(){
+  FrameHeader h;
+  h.magic[0] = 'I'; h.magic[1] = 'M';
+  h.version = 2;
+  h.format  = FRAME_FORMAT;
+  h.nch     = NUM_CHANNELS;
+  h.nfields = FRAME_NFIELDS;
+  h.scale   = (FRAME_FORMAT == FRAME_FMT_I16) ? I16_SCALE : 1;
+  h.seq     = frameSeq++;
+  h.micros  = micros();
+  memcpy(frameBuf, &h, sizeof(h));
+
+  // 채널별 마지막 샘플 시각 (GUI 특성 계산의 시간축)
+  uint8_t* p = frameBuf + sizeof(h);
+  for (uint8_t ch=0; ch<NUM_CHANNELS; ch++){
+    uint32_t t = lastMicrosCh[ch];
+    memcpy(p, &t, sizeof(t)); p += sizeof(t);
+  }
+
+  FrameValue* v = (FrameValue*)p;
+  for (uint8_t ch=0; ch<NUM_CHANNELS; ch++){
+    *v++ = toFrameValue(rollArr[ch]);
+    *v++ = toFrameValue(pitchArr[ch]);
+    *v++ = toFrameValue(yawArr[ch]);
+    *v++ = toFrameValue(xDelAng[ch]);
+    *v++ = toFrameValue(yDelAng[ch]);
+    *v++ = toFrameValue(zDelAng[ch]);
+  }
+  webSocket.broadcastBIN(frameBuf, sizeof(frameBuf));
+}
+
+void broadcastJSON(){
+  // 길어질 수 있으니 미리 버퍼 예약 (필드 추가로 여유 증가)
+  String data;
+  data.reserve(256 + NUM_CHANNELS * 128);
+
+  data = String("{\"seq\":") + frameSeq++ + ",\"t_us\":" + micros() + ",\"sensors\":[";
+  for (uint8_t ch=0; ch<NUM_CHANNELS; ch++){
+    // 예시 코드와 동일하게 '보정 미적용' ROLL/PITCH/YAW 전송
+    data += String("{\"id\":") + ch +
+            ",\"t_us\":"      + lastMicrosCh[ch] +
+            ",\"X_DEL_ANG\":" + String(xDelAng[ch],2) +
+            ",\"Y_DEL_ANG\":" + String(yDelAng[ch],2) +
+            ",\"Z_DEL_ANG\":" + String(zDelAng[ch],2) +
+            ",\"ROLL\":"      + String(rollArr[ch],2) +
+            ",\"PITCH\":"     + String(pitchArr[ch],2) +
+            ",\"YAW\":"       + String(yawArr[ch],2) +
+            "}";
+    if (ch < NUM_CHANNELS-1) data += ",";
+
+    // ★★★ 조립 중에도 이벤트 서비스
+    webSocket.loop();
+    yield();
+  }
+  data += "]}";
+  webSocket.broadcastTXT(data);
+}
+
 // ===== 한 채널 서비스 =====
 bool serviceOneChannel(uint8_t ch){
   tcaselect(ch);
@@ -296,29 +398,10 @@ void loop(){
   unsigned long now = millis();
   if (now - lastBroadcast >= READ_INTERVAL){
     lastBroadcast = now;
-
-    // 길어질 수 있으니 미리 버퍼 예약 (필드 추가로 여유 증가)
-    String data;
-    data.reserve(256 + NUM_CHANNELS * 128);
-
-    data = "{\"sensors\":[";
-    for (uint8_t ch=0; ch<NUM_CHANNELS; ch++){
-      // 예시 코드와 동일하게 '보정 미적용' ROLL/PITCH/YAW 전송
-      data += String("{\"id\":") + ch +
-              ",\"X_DEL_ANG\":" + String(xDelAng[ch],2) +
-              ",\"Y_DEL_ANG\":" + String(yDelAng[ch],2) +
-              ",\"Z_DEL_ANG\":" + String(zDelAng[ch],2) +
-              ",\"ROLL\":"      + String(rollArr[ch],2) +
-              ",\"PITCH\":"     + String(pitchArr[ch],2) +
-              ",\"YAW\":"       + String(yawArr[ch],2) +
-              "}";
-      if (ch < NUM_CHANNELS-1) data += ",";
-
-      // ★★★ 조립 중에도 이벤트 서비스
-      webSocket.loop();
-      yield();
-    }
-    data += "]}";
-    webSocket.broadcastTXT(data);
+#if BINARY_FRAMES
+    broadcastBinary();
+#else
+    broadcastJSON();
+#endif
   }
 }
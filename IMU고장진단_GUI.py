@@ -7,22 +7,28 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
-import pandas as pd
-import joblib
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-from matplotlib.patches import Circle
+# pandas / joblib(sklearn) / matplotlib / websocket / requests 는 처음 쓰는 곳에서 불러옴 (창을 먼저 띄움)
 import threading
-import websocket
-import json
-from datetime import datetime, timedelta
+import queue
+from datetime import datetime
 import numpy as np
-import platform
-import sqlite3
 import uuid
 import os
-import requests  # ✅ API 호출용
+import time
+
+from imu_buffer import IMURingBuffer
+from imu_db import DBWriter, allocate_imu_codes
+from imu_features import FEATURE_COLUMNS, extract_features, window_gaps
+from imu_font import cache_path, default_candidates, resolve_font
+from imu_metrics import metrics, open_panel
+from imu_model import ModelManager
+from imu_outbox import OutboxDrainer, enqueue_job
+from imu_plot import BlitPlotter, RenderGovernor
+from imu_protocol import LinkTracker, parse_message
+from imu_replay import FrameRecorder, ReplaySource
+from imu_schema import create_analysis_schema, ensure_legacy_schema
+from imu_upload import UploadClient
+from imu_ws import Backoff
 
 class LoginDialog(simpledialog.Dialog):
     """이메일/비밀번호를 한 번에 입력받는 모달 다이얼로그"""
@@ -79,8 +85,8 @@ class IMUGUI:
         self.root.configure(bg='#f8f9fa')
         
         self.fullscreen = False
-        self.data_records = []
-        self.pipeline = None
+        # 모델은 백그라운드 로드 + 워밍업 후 교체 (마지막 모델 경로+해시를 기록해 시작 시 다시 로드)
+        self.models = ModelManager(state_path=cache_path('model.json'), dispatch=lambda fn: self.root.after(0, fn))
         self.streaming = False
         self.auto_mode = False
         self.collection_start_time = None
@@ -90,9 +96,36 @@ class IMUGUI:
         
         self.data_lock = threading.Lock()
         self.MAX_RECORDS = 10000
+        # 센서별 링 버퍼 (센서 8개 합계 MAX_RECORDS)
+        self.buffer = IMURingBuffer(n_sensors=8, capacity=self.MAX_RECORDS // 8)
+        # 프레임 번호/장치 시각 추적 (패킷 손실률 측정)
+        self.link = LinkTracker(n_sensors=8)
+        # 성능 창(F12)에서 조회 시점에 읽는 값
+        metrics.gauge('buffer_overwritten', lambda: self.buffer.dropped)
+        metrics.gauge('frames_lost', lambda: self.link.dropped)
+
+        # 수신원: 장비 WebSocket 또는 녹화 파일 재생 (replay_path), 수신 프레임 녹화 (recorder)
+        self.ws_url = "ws://10.200.246.81:81"
+        self.replay_path = None
+        self.replay_speed = 1.0
+        self.recorder = None
+        # DB 파일별 전용 writer 스레드 (대기열 최대 DB_QUEUE_SIZE)
+        self.DB_QUEUE_SIZE = 32
+        self._db_writers = {}
         
         self.ws_connected = False
         self.connection_timeout = 10  # ⬅️ 타임아웃 살짝 여유
+        # 연결 끊김 시 자동 재연결 (RECONNECT_MIN 초부터 2배씩, 최대 RECONNECT_MAX 초, jitter 50%) - 버퍼 유지
+        self.AUTO_RECONNECT = True
+        self.RECONNECT_MIN = 0.5
+        self.RECONNECT_MAX = 10.0
+        self.reconnects = 0
+        # 응답 없는 연결(Wi-Fi 단절 등) 감지용 ping 주기/대기 (초)
+        self.PING_INTERVAL = 5
+        self.PING_TIMEOUT = 3
+        # 특성 창이 끊긴 구간과 겹친 센서: 'flag' = 예측하고 표시, 'exclude' = 진단에서 제외
+        self.GAP_POLICY = 'flag'
+        self._stop_event = threading.Event()
 
         # ✅ 카운트다운 시작 여부(스레드 안전한 UI 트리거용)
         self._countdown_started = False
@@ -121,17 +154,20 @@ class IMUGUI:
         # ✅ API 로그인/설정 상태
         self.api_base_var = tk.StringVar(value="http://127.0.0.1:8000")
         self.auth_token = None
+        # API 업로드 동시 전송 수 (센서별 POST /imu)
+        self.UPLOAD_WORKERS = 8
         self.user_summary = None
         self.operator_name_var = tk.StringVar(value=self.operator_name)
 
         # 로컬(내부용) 분석 DB 초기화 (기존 유지)
         self.init_database()
         self.setup_korean_font()
-        plt.style.use('default')
         
         self.root.bind("<F11>", self.toggle_fullscreen)
         self.root.bind("<Escape>", lambda e: self.root.attributes("-fullscreen", False))
+        self.root.bind("<F12>", lambda e: self.open_metrics_panel())
         self.setup_main_layout()
+        self.restore_model()
 
         self.roll = 0.0
         self.pitch = 0.0
@@ -140,95 +176,59 @@ class IMUGUI:
     # ----------------- 내부 분석용 DB -----------------
     def init_database(self):
         self.db_path = "imu_analysis.db"
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS imu_raw_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    sensor_id INTEGER NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    roll REAL NOT NULL,
-                    pitch REAL NOT NULL,
-                    yaw REAL NOT NULL,
-                    x_del_ang REAL NOT NULL,
-                    y_del_ang REAL NOT NULL,
-                    z_del_ang REAL NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS diagnosis_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    sensor_id INTEGER NOT NULL,
-                    measurement_date DATE NOT NULL,
-                    measurement_time TIME NOT NULL,
-                    data_collection_duration REAL NOT NULL,
-                    predicted_roll_drift REAL,
-                    predicted_pitch_drift REAL,
-                    predicted_yaw_drift REAL,
-                    max_drift_axis TEXT,
-                    max_drift_value REAL,
-                    max_drift_signed REAL,
-                    is_faulty BOOLEAN NOT NULL,
-                    fault_threshold REAL NOT NULL,
-                    diagnosis_status TEXT NOT NULL,
-                    model_version TEXT,
-                    data_quality_score REAL,
-                    notes TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS measurement_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    start_time DATETIME NOT NULL,
-                    end_time DATETIME,
-                    total_duration REAL,
-                    sensor_count INTEGER,
-                    total_data_points INTEGER,
-                    session_type TEXT,
-                    operator_name TEXT,
-                    facility_location TEXT,
-                    equipment_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-            print("✅ 로컬 분석 DB 초기화 완료")
-        except Exception as e:
-            if conn:
-                conn.rollback()
+        self.db_writer = self._get_db_writer(self.db_path)
+        # API 업로드 대기열 (같은 DB 의 upload_outbox, 로그인 전에는 쌓아 두기만 함)
+        self.outbox = OutboxDrainer(self.db_path, dispatch=lambda fn: self.root.after(0, fn),
+                                    on_change=self.on_outbox_change).start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_app_close)
+
+        def on_error(e):
             print(f"❌ 로컬 DB 초기화 오류: {e}")
             messagebox.showerror("데이터베이스 오류", f"데이터베이스 초기화 실패:\n{e}")
-        finally:
-            if conn:
-                conn.close()
+        self.submit_db_job(create_analysis_schema,
+                           on_done=lambda _: print("✅ 로컬 분석 DB 초기화 완료"),
+                           on_error=on_error)
+
+    def _get_db_writer(self, db_path):
+        """DB 파일마다 연결을 유지하는 writer 스레드 하나씩 (최초 요청 시 생성)"""
+        key = os.path.abspath(db_path)
+        writer = self._db_writers.get(key)
+        if writer is None:
+            writer = DBWriter(db_path, dispatch=lambda fn: self.root.after(0, fn),
+                              maxsize=self.DB_QUEUE_SIZE, name=f"db-writer:{os.path.basename(db_path)}")
+            self._db_writers[key] = writer
+        return writer
+
+    def submit_db_job(self, job, on_done=None, on_error=None, writer=None):
+        """DB 쓰기 작업을 writer 스레드에 넘김(UI 스레드는 대기하지 않음). 대기열이 가득 차면 False"""
+        try:
+            (writer or self.db_writer).submit(job, on_done, on_error)
+            return True
+        except queue.Full:
+            self.update_status("DB 쓰기 대기열이 가득 찼습니다", 'warning')
+            print("⚠️ DB 쓰기 대기열 초과 - 작업을 건너뜀")
+            return False
+
+    def on_app_close(self):
+        """창 닫기: 남은 DB 작업을 마무리한 뒤 종료"""
+        self.streaming = False
+        self.auto_mode = False
+        self.outbox.stop()
+        for writer in self._db_writers.values():
+            writer.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.root.destroy()
 
     # ----------------- 폰트/레이아웃/UI -----------------
     def setup_korean_font(self):
-        system = platform.system()
-        if system == 'Windows':
-            font_candidates = ['Malgun Gothic', 'Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        elif system == 'Darwin':
-            font_candidates = ['AppleGothic', 'Arial Unicode MS', 'DejaVu Sans']
-        else:
-            font_candidates = ['DejaVu Sans', 'Liberation Sans', 'Noto Sans CJK KR']
-        available_fonts = [f.name for f in fm.fontManager.ttflist]
-        korean_font = None
-        for font in font_candidates:
-            if font in available_fonts:
-                korean_font = font
-                break
+        # 찾은 폰트는 실행 간 캐시 (캐시가 있으면 matplotlib 없이 결정), rcParams 는 그래프 생성 시 적용
+        korean_font, _ = resolve_font(default_candidates())
+        self.korean_font_found = korean_font is not None
         if korean_font:
-            plt.rcParams['font.family'] = korean_font
             self.font_family = korean_font
             print(f"✅ 한글 폰트 설정: {korean_font}")
         else:
-            plt.rcParams['axes.unicode_minus'] = False
             self.font_family = 'DejaVu Sans'
             print("⚠️ 한글 폰트를 찾을 수 없어 기본 폰트를 사용합니다.")
 
@@ -399,6 +399,24 @@ class IMUGUI:
     def setup_plots(self, parent):
         plot_frame = tk.Frame(parent, bg=self.colors['bg_medium'], relief='solid', bd=1)
         plot_frame.pack(fill='both', expand=True, padx=5, pady=5)
+        # matplotlib 은 창이 표시된 뒤 불러와 그래프 생성 (그 전까지 axes 는 비어 있음)
+        self.axes = []; self.canvas = None; self.plotter = None
+        # 그래프 갱신 주기는 측정한 그리기 시간으로 조절, 새 데이터가 없으면 그리지 않음
+        self.render = RenderGovernor()
+        self.plot_placeholder = tk.Label(plot_frame, text="Loading charts...", font=(self.font_family, 14),
+                                         bg=self.colors['bg_medium'], fg=self.colors['text_secondary'])
+        self.plot_placeholder.pack(fill='both', expand=True)
+        self.root.after(100, lambda: self.build_plots(plot_frame))
+
+    def build_plots(self, plot_frame):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        plt.style.use('default')
+        if self.korean_font_found:
+            plt.rcParams['font.family'] = self.font_family
+        else:
+            plt.rcParams['axes.unicode_minus'] = False
+        self.plot_placeholder.destroy()
         self.fig, axs = plt.subplots(4, 2, figsize=(14, 10), facecolor='white')
         self.axes = axs.flatten()
         for i, ax in enumerate(self.axes):
@@ -411,11 +429,18 @@ class IMUGUI:
             for spine in ax.spines.values():
                 spine.set_edgecolor('#495057'); spine.set_linewidth(1.5); spine.set_capstyle('round')
             ax.patch.set_edgecolor('#343a40'); ax.patch.set_linewidth(2)
-        self.axes[6].set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
-        self.axes[7].set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
+        self.axes[6].set_xlabel("Time (s)", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
+        self.axes[7].set_xlabel("Time (s)", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
         plt.tight_layout(pad=3.0, h_pad=2.5, w_pad=2.5)
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        # 라인/범례는 한 번만 생성하고 이후에는 set_data + blit 으로 갱신
+        self.plotter = BlitPlotter(self.canvas, self.axes,
+                                   line_colors=('#dc3545', '#28a745', '#007bff'),
+                                   line_kw={'linewidth': 2, 'alpha': 0.8},
+                                   legend_kw={'loc': 'upper right', 'fontsize': 9, 'framealpha': 0.95,
+                                              'facecolor': 'white', 'edgecolor': self.colors['grid'],
+                                              'prop': {'family': self.font_family}})
 
     def setup_statusbar(self):
         statusbar = tk.Frame(self.root, bg=self.colors['bg_medium'], height=35, relief='solid', bd=1)
@@ -428,8 +453,16 @@ class IMUGUI:
         tk.Label(info_frame, text="v2.2 | Local SQLite Upload",
                  font=(self.font_family, 10, 'bold'),
                  bg=self.colors['bg_medium'], fg=self.colors['text_secondary']).pack(side='right')
+        self.render_label = tk.Label(info_frame, text="", font=(self.font_family, 10),
+                                     bg=self.colors['bg_medium'], fg=self.colors['text_secondary'])
+        self.render_label.pack(side='right', padx=15)
+        # 클릭 또는 F12 → 단계별 처리 시간 성능 창
+        self.render_label.bind("<Button-1>", lambda e: self.open_metrics_panel())
 
     # ----------------- 공용 UI 유틸 -----------------
+    def open_metrics_panel(self):
+        open_panel(self.root)
+
     def toggle_fullscreen(self, event=None):
         self.fullscreen = not self.fullscreen
         self.root.attributes("-fullscreen", self.fullscreen)
@@ -452,11 +485,12 @@ class IMUGUI:
                                                      fill=self.colors['danger'], outline=self.colors['danger'])
             self.conn_indicator['label'].config(text="WebSocket: OFFLINE", fg=self.colors['danger'])
 
-    def update_model_status(self, loaded):
+    def update_model_status(self, loaded, version=None):
         if loaded:
             self.model_indicator['canvas'].itemconfig(self.model_indicator['led'],
                                                       fill=self.colors['success'], outline=self.colors['success'])
-            self.model_indicator['label'].config(text="ML Pipeline: READY", fg=self.colors['success'])
+            self.model_indicator['label'].config(text=f"ML Pipeline: READY ({version})" if version else "ML Pipeline: READY",
+                                                 fg=self.colors['success'])
         else:
             self.model_indicator['canvas'].itemconfig(self.model_indicator['led'],
                                                       fill=self.colors['danger'], outline=self.colors['danger'])
@@ -464,8 +498,15 @@ class IMUGUI:
 
     def update_data_count(self):
         with self.data_lock:
-            count = len(self.data_records)
-        self.data_count_label.config(text=f"Records: {count:,}")
+            count = len(self.buffer)
+            dropped, loss = self.link.dropped, self.link.loss_rate
+            gap = self.link.gap_seconds
+        text = f"Records: {count:,}"
+        if dropped:
+            text += f" | Loss {dropped:,} ({loss:.1%})"
+        if gap:
+            text += f" | Gap {gap:.1f}s"
+        self.data_count_label.config(text=text)
         if self.session_id:
             self.session_label.config(text=f"Session: {self.session_id[:8]}...")
 
@@ -490,8 +531,10 @@ class IMUGUI:
         self.auto_mode = True
         self._countdown_started = False
         with self.data_lock:
-            self.data_records = []
+            self.buffer.clear()
+            self.link.reset()
         self.predictions_data = {}
+        self.reset_plots()
         self.collection_start_time = datetime.now()
         self.session_id = str(uuid.uuid4())
         self.save_session_info()
@@ -514,23 +557,17 @@ class IMUGUI:
         self.wait_for_connection(on_conn)
 
     def save_session_info(self):
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("BEGIN")
+        params = (self.session_id, self.collection_start_time.isoformat(),
+                  "자동", "운영자", "시설위치", "IMU-001")
+        def job(conn):
             conn.execute('''
                 INSERT INTO measurement_sessions 
                 (session_id, start_time, session_type, operator_name, facility_location, equipment_id)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (self.session_id, self.collection_start_time.isoformat(),
-                  "자동", "운영자", "시설위치", "IMU-001"))
-            conn.commit()
-            self.update_data_count()
-        except Exception as e:
-            if conn: conn.rollback()
-            print(f"세션 정보 저장 오류: {e}")
-        finally:
-            if conn: conn.close()
+            ''', params)
+        self.submit_db_job(job,
+                           on_done=lambda _: self.update_data_count(),
+                           on_error=lambda e: print(f"세션 정보 저장 오류: {e}"))
 
     def start_countdown(self, seconds_left):
         if seconds_left > 0 and self.auto_mode:
@@ -545,36 +582,40 @@ class IMUGUI:
 
     def clear_data(self):
         with self.data_lock:
-            self.data_records = []
+            self.buffer.clear()
+            self.link.reset()
         self.predictions_data = {}
         self.update_data_count()
-        for ax in self.axes:
-            ax.cla(); ax.set_facecolor('#fafafa')
-            ax.set_title(f"[SENSOR {self.axes.tolist().index(ax)}]", fontsize=12, fontweight='bold',
-                         color=self.colors['text_primary'], fontfamily=self.font_family, pad=10)
-            ax.set_ylabel("Angle (°)", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
-            ax.grid(True, alpha=0.3, color=self.colors['grid'], linestyle='-', linewidth=0.5)
-            ax.tick_params(colors=self.colors['text_secondary'])
-            for s in ax.spines.values():
-                s.set_edgecolor('#495057'); s.set_linewidth(1.5); s.set_capstyle('round')
-            ax.patch.set_edgecolor('#343a40'); ax.patch.set_linewidth(2)
-        self.canvas.draw()
+        self.reset_plots()
         self.measure_status.config(text="⏸ STANDBY", fg=self.colors['text_secondary'])
         self.update_status("데이터 초기화 완료", 'success')
 
     # --- ✅ 모든 웹소켓 콜백에서 UI 접근은 메인 스레드로 던지기 ---
+    def reset_plots(self):
+        if self.plotter is None: return
+        for ax in self.axes:
+            for txt in list(ax.texts): txt.remove()
+        self.plotter.reset()
+        self.canvas.draw()
+        self.render.invalidate()
+
     def on_message(self, ws, message):
         try:
-            msg = json.loads(message); ts = datetime.now()
-            with self.data_lock:
-                if 'sensors' in msg:
-                    for sensor in msg['sensors']:
-                        rec = sensor.copy(); rec['SN'] = rec.get('id'); rec['timestamp'] = ts
-                        self.data_records.append(rec)
-                else:
-                    msg['timestamp'] = ts; self.data_records.append(msg)
-                if len(self.data_records) > self.MAX_RECORDS:
-                    self.data_records = self.data_records[-self.MAX_RECORDS:]
+            # 재생 중에는 녹화 당시 수신 간격을 유지한 시각 사용
+            ts = getattr(ws, 'recv_time', None) or time.time()
+            if self.recorder is not None:
+                self.recorder.write(message, ts)
+            # JSON/바이너리 공통 Frame → 프레임 번호(손실 집계)·장치 시각과 함께 링 버퍼에 기록
+            t0 = time.perf_counter()
+            frame = parse_message(message)
+            t1 = time.perf_counter()
+            with metrics.locked(self.data_lock):
+                t2 = time.perf_counter()
+                prev_rx = self.link.last_rx
+                samples = self.link.ingest(self.buffer, frame, ts)
+            metrics.observe('parse', t1 - t0); metrics.observe('append', time.perf_counter() - t2)
+            if prev_rx is not None: metrics.observe('frame_interval', ts - prev_rx)
+            metrics.count('frames'); metrics.count('samples', samples)
         except Exception as e:
             print("메시지 파싱 오류:", e)
         finally:
@@ -598,6 +639,10 @@ class IMUGUI:
         self.root.after(0, _on_main)
 
     def on_close(self, ws, close_status, close_msg):
+        if self.streaming:
+            # 재연결 후 첫 프레임까지를 끊긴 구간으로 기록 (predict 에서 창과 겹치는 센서 표시/제외)
+            with self.data_lock:
+                self.link.disconnected(time.time())
         def _on_main():
             print("WebSocket 연결 종료")
             self.ws_connected = False
@@ -622,22 +667,51 @@ class IMUGUI:
     def start_stream(self):
         if self.streaming: return
         self.ws_connected = False
-        ws_url = "ws://10.200.246.81:81"
-        try:
-            self.ws = websocket.WebSocketApp(ws_url,
-                                             on_open=self.on_open,
-                                             on_message=self.on_message,
-                                             on_error=self.on_error,
-                                             on_close=self.on_close)
-            self.wst = threading.Thread(target=self.ws.run_forever); self.wst.daemon = True
-            self.streaming = True; self.wst.start()
-            self.root.after(100, self.update_plot)
-        except Exception as e:
-            print(f"WebSocket 시작 오류: {e}"); self.streaming = False; self.ws_connected = False
+        # 수신 스레드마다 별도 중지 신호 (이전 스레드가 늦게 끝나도 새 수신 상태를 건드리지 않음)
+        self._stop_event = threading.Event()
+        self.wst = threading.Thread(target=self._run_supervised, args=(self._stop_event,)); self.wst.daemon = True
+        self.streaming = True; self.wst.start()
+        self.root.after(100, self.update_plot)
+
+    def _connect_source(self):
+        callbacks = dict(on_open=self.on_open, on_message=self.on_message,
+                         on_error=self.on_error, on_close=self.on_close)
+        if self.replay_path:
+            return ReplaySource(self.replay_path, speed=self.replay_speed, **callbacks)
+        import websocket
+        return websocket.WebSocketApp(self.ws_url, **callbacks)
+
+    def _run_supervised(self, stop_event):
+        """연결이 끊기면 stop_stream 전까지 backoff 후 재연결 (재생 파일은 한 번만 재생)"""
+        backoff = Backoff(self.RECONNECT_MIN, self.RECONNECT_MAX)
+        while not stop_event.is_set():
+            try:
+                ws = self._connect_source()
+            except Exception as e:
+                print(f"WebSocket 시작 오류: {e}")
+                break
+            self.ws = ws
+            if stop_event.is_set():
+                break
+            started = time.monotonic()
+            ws.run_forever(ping_interval=self.PING_INTERVAL, ping_timeout=self.PING_TIMEOUT)
+            if stop_event.is_set() or not self.AUTO_RECONNECT or self.replay_path:
+                break
+            # 한동안 유지된 연결이 끊긴 경우는 짧은 지연부터 다시 시작
+            if time.monotonic() - started > self.RECONNECT_MAX:
+                backoff.reset()
+            delay = backoff.next()
+            self.reconnects += 1
+            print(f"🔄 {delay:.1f}초 후 재연결 ({backoff.attempt}회째)")
+            self.root.after(0, lambda n=backoff.attempt, d=delay:
+                            self.update_status(f"재연결 시도 {n}회 ({d:.1f}초 후)", 'warning'))
+            if stop_event.wait(delay):
+                break
 
     def stop_stream(self):
         if not self.streaming: return
         self.streaming = False; self.ws_connected = False
+        self._stop_event.set()
         self.update_connection_status(False)
         try: self.ws.close()
         except: pass
@@ -649,47 +723,33 @@ class IMUGUI:
     def update_plot(self):
         if not self.streaming: return
         try:
-            with self.data_lock:
-                if self.data_records:
-                    df = pd.DataFrame(self.data_records.copy())
-            if 'df' in locals() and not df.empty:
-                if 'timestamp' not in df.columns:
-                    self.root.after(100, self.update_plot); return
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                for ax in self.axes:
-                    ax.cla(); ax.set_facecolor('#fafafa')
-                    ax.grid(True, alpha=0.3, color=self.colors['grid'], linestyle='-', linewidth=0.5)
-                    ax.tick_params(colors=self.colors['text_secondary'])
-                    for s in ax.spines.values():
-                        s.set_edgecolor('#495057'); s.set_linewidth(1.5); s.set_capstyle('round')
-                    ax.patch.set_edgecolor('#343a40'); ax.patch.set_linewidth(2)
-                for sn in range(8):
-                    ax = self.axes[sn]
-                    ax.set_title(f"[SENSOR {sn}]", fontsize=12, fontweight='bold',
-                                 color=self.colors['text_primary'], fontfamily=self.font_family, pad=10)
-                    if 'SN' in df.columns:
-                        sub = df[df['SN'] == sn]
-                        if not sub.empty and all(c in sub.columns for c in ['ROLL','PITCH','YAW']):
-                            ax.plot(sub['timestamp'], sub['ROLL'], '#dc3545', linewidth=2, label='Roll', alpha=0.8)
-                            ax.plot(sub['timestamp'], sub['PITCH'], '#28a745', linewidth=2, label='Pitch', alpha=0.8)
-                            ax.plot(sub['timestamp'], sub['YAW'], '#007bff', linewidth=2, label='Yaw', alpha=0.8)
-                            ax.legend(loc='upper right', fontsize=9, framealpha=0.95,
-                                      facecolor='white', edgecolor=self.colors['grid'],
-                                      prop={'family': self.font_family})
-                    ax.set_ylabel("Angle (°)", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
-                    if sn >= 6:
-                        ax.set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'], fontfamily=self.font_family)
-                plt.tight_layout(pad=3.0, h_pad=2.5, w_pad=2.5)
-                self.canvas.draw()
+            series = {}
+            with metrics.locked(self.data_lock):
+                # 지난 그리기 이후 새 샘플이 없으면 복사/그리기 생략
+                if self.plotter is not None and self.render.changed(self.buffer):
+                    for sn in range(8):
+                        if self.buffer.count(sn):
+                            cols = self.buffer.sensor(sn)
+                            series[sn] = (cols['timestamp'].copy(), cols['ROLL'].copy(),
+                                          cols['PITCH'].copy(), cols['YAW'].copy())
+            # 변경된 센서의 라인만 set_data + blit (그리기 시간 측정)
+            if series:
+                t0 = time.perf_counter()
+                self.plotter.update(series)
+                self.render.record(time.perf_counter() - t0)
+                metrics.observe('plot', time.perf_counter() - t0)
         except Exception as e:
             print(f"플롯 업데이트 오류: {e}")
-        self.root.after(100, self.update_plot)
+        # 다음 주기 = 그리기 시간 기준 (느린 PC 에서는 늘어남)
+        interval = self.render.interval_ms()
+        self.render_label.config(text=self.render.summary())
+        self.root.after(interval, self.update_plot)
 
     def save_data(self):
         with self.data_lock:
-            if not self.data_records:
+            if not len(self.buffer):
                 messagebox.showwarning("경고", "저장할 데이터가 없습니다"); return
-            df = pd.DataFrame(self.data_records.copy())
+            df = self.buffer.to_dataframe()
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx",
                                                  filetypes=[("Excel 파일","*.xlsx")])
         if file_path:
@@ -717,6 +777,7 @@ class IMUGUI:
 
         base = self._get_api_base()
         try:
+            import requests
             self.update_status("로그인 중...", "info")
             resp = requests.post(f"{base}/auth/login",
                                  json={"email": email, "password": password},
@@ -732,6 +793,7 @@ class IMUGUI:
 
             data = resp.json()
             self.auth_token = data.get("token")
+            self.outbox.set_client(self._get_uploader())
             self.user_summary = data.get("summary", {})
             display_name = self.user_summary.get("name") or self.user_summary.get("email") or "user"
             self.operator_name_var.set(display_name)
@@ -772,51 +834,16 @@ class IMUGUI:
         path = os.path.expanduser(path)
         return path
 
-    @staticmethod
-    def _table_exists(conn, table_name: str) -> bool:
-        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND lower(name)=lower(?)", (table_name,))
-        return cur.fetchone() is not None
-
     def _ensure_min_schema(self, conn):
         """
-        최소 스키마 보장:
+        최소 스키마 보장 (imu_schema.LEGACY_STEPS, 서버 스키마이므로 user_version 은 건드리지 않음):
         - user(id, email, password_hash, name, role, created_at, updated_at)
         - imurecord(id, code, serial, inspected_at, passed, inspector_id, box_no, destination, arrived, roll, pitch, yaw, created_at, updated_at)
+        - imu_code_seq (code 채번) + imurecord(serial, inspected_at) 인덱스
         이미 존재하면 건너뜀(기존 스키마와 충돌하지 않도록 NOT EXISTS 사용)
         """
         conn.execute("PRAGMA foreign_keys=ON")
-        if not self._table_exists(conn, "user"):
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS user (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE,
-                    password_hash TEXT,
-                    name TEXT,
-                    role TEXT DEFAULT 'USER',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        if not self._table_exists(conn, "imurecord"):
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS imurecord (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    code TEXT UNIQUE,
-                    serial TEXT,
-                    inspected_at DATETIME,
-                    passed INTEGER,
-                    inspector_id INTEGER,
-                    box_no INTEGER,
-                    destination TEXT,
-                    arrived INTEGER,
-                    roll REAL,
-                    pitch REAL,
-                    yaw REAL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(inspector_id) REFERENCES user(id)
-                )
-            """)
+        ensure_legacy_schema(conn)
 
     def _get_or_create_admin_id(self, conn) -> int:
         cur = conn.execute("SELECT id FROM user WHERE lower(name)=lower(?) OR lower(email)=lower(?)",
@@ -828,12 +855,31 @@ class IMUGUI:
                      ("admin@local", "local", "admin", "ADMIN"))
         return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
 
-    def _next_imu_code(self, conn) -> str:
-        cur = conn.execute("SELECT COALESCE(MAX(CAST(code AS INTEGER)), 0) FROM imurecord WHERE code GLOB '[0-9]*'")
-        max_n = cur.fetchone()[0] or 0
-        n = int(max_n) + 1
-        width = 3 if n < 1000 else len(str(n))
-        return str(n).zfill(width)
+    def _get_uploader(self):
+        """API 업로드 클라이언트 (주소/토큰이 같으면 재사용 → 연결 유지)"""
+        base = self._get_api_base()
+        client = getattr(self, '_uploader', None)
+        if client is None or client.base_url != base or client.token != self.auth_token:
+            if client is not None: client.close()
+            client = UploadClient(base, token=self.auth_token, max_workers=self.UPLOAD_WORKERS,
+                                  dispatch=lambda fn: self.root.after(0, fn))
+            self._uploader = client
+        return client
+
+    def on_outbox_change(self, summary):
+        """업로드 대기열 전송 결과 (OutboxDrainer → UI 스레드)"""
+        if summary['auth_required']:
+            self.update_status(f"API 인증 만료 - 다시 로그인하세요 (전송 대기 {summary['pending']}건)", "warning")
+        elif summary['server_down']:
+            self.update_status(f"API 서버 연결 실패 - 재시도 대기 (전송 대기 {summary['pending']}건)", "warning")
+        elif summary['sent_now']:
+            status = "success" if summary['pending'] == 0 else "info"
+            self.update_status(f"API 업로드 {summary['sent_now']}건 완료 (전송 대기 {summary['pending']}건)", status)
+        if summary['dead_now']:
+            failures = summary['failures']
+            detail = "\n".join(failures[:5]) + ("\n..." if len(failures) > 5 else "")
+            messagebox.showwarning("부분 실패", f"서버가 거부한 업로드가 있습니다 (재시도하지 않음).\n"
+                                             f"- 거부: {summary['dead_now']}건\n\n상세:\n{detail}")
 
     def save_to_database(self):
         """
@@ -842,7 +888,7 @@ class IMUGUI:
         - 비로그인 상태면: 기존 로컬 SQLite에 직접 insert (레거시 호환)
         """
         with self.data_lock:
-            has_data = bool(self.data_records)
+            has_data = len(self.buffer) > 0
         if not has_data:
             messagebox.showwarning("경고", "업로드할 데이터가 없습니다"); return
         if not self.predictions_data:
@@ -863,51 +909,33 @@ class IMUGUI:
                 messagebox.showwarning("입력 오류", "Box No는 숫자여야 합니다.")
                 return
 
-        # ✅ 1) 로그인 상태면 API 업로드
+        # ✅ 1) 로그인 상태면 API 업로드 (먼저 로컬 upload_outbox 에 기록 → 전송/재시도는 OutboxDrainer)
         if self.auth_token:
-            base = self._get_api_base()
-            headers = {"X-Auth-Token": self.auth_token}
-            success, failed = 0, 0
-            failures = []
-
-            self.update_status("API로 업로드 중...", "info")
+            items = []
             for sensor_id, pred in sorted(self.predictions_data.items()):
-                try:
-                    payload = {
-                        "serial": f"SENSOR-{sensor_id:02d}",
-                        "inspected_at": inspected_at,
-                        "passed": (not bool(pred.get("is_faulty", False))),
-                        "box_no": box_no,
-                        "destination": destination,
-                        "arrived": arrived,
-                        "roll":  self._finite_or_none(pred.get("roll_drift")),
-                        "pitch": self._finite_or_none(pred.get("pitch_drift")),
-                        "yaw":   self._finite_or_none(pred.get("yaw_drift")),
-                    }
-                    print("UPLOADING:", sensor_id, payload)  # 디버그 로그
-
-                    resp = requests.post(f"{base}/imu", json=payload, headers=headers, timeout=10)
-                    if resp.status_code in (200, 201):
-                        success += 1
-                    else:
-                        try:
-                            msg = resp.json().get("detail", resp.text)
-                        except Exception:
-                            msg = resp.text
-                        failed += 1
-                        failures.append(f"센서 {sensor_id}: {resp.status_code} {msg}")
-                except Exception as e:
-                    failed += 1
-                    failures.append(f"센서 {sensor_id}: {e}")
-
-            if failed == 0:
-                self.update_status(f"API 업로드 완료({success}건)", "success")
-                messagebox.showinfo("성공", f"API 업로드 완료!\n- 업로드 성공: {success}건")
-            else:
-                self.update_status(f"일부 업로드 실패: 성공 {success} / 실패 {failed}", "warning")
-                detail = "\n".join(failures[:5]) + ("\n..." if len(failures) > 5 else "")
-                messagebox.showwarning("부분 실패",
-                                       f"일부 업로드에 실패했습니다.\n- 성공: {success}\n- 실패: {failed}\n\n상세:\n{detail}")
+                items.append((sensor_id, {
+                    "serial": f"SENSOR-{sensor_id:02d}",
+                    "inspected_at": inspected_at,
+                    "passed": (not bool(pred.get("is_faulty", False))),
+                    "box_no": box_no,
+                    "destination": destination,
+                    "arrived": arrived,
+                    "roll":  self._finite_or_none(pred.get("roll_drift")),
+                    "pitch": self._finite_or_none(pred.get("pitch_drift")),
+                    "yaw":   self._finite_or_none(pred.get("yaw_drift")),
+                }))
+                print("UPLOADING:", sensor_id, items[-1][1])  # 디버그 로그
+            def on_done(added):
+                self.outbox.wake()
+                pending = self.outbox.counts['pending'] + added
+                self.update_status(f"API 업로드 대기열 저장({len(items)}건) - 전송 대기 {pending}건", "info")
+                messagebox.showinfo("저장", f"API 업로드 대기열에 저장했습니다.\n- 결과: {len(items)}건 (새로 추가 {added}건)\n"
+                                          f"서버에 연결되면 자동으로 전송합니다.")
+            def on_error(e):
+                self.update_status("업로드 대기열 저장 실패", "danger")
+                messagebox.showerror("DB 오류", f"업로드 대기열 저장 실패:\n{e}")
+            self.outbox.set_client(self._get_uploader())
+            self.submit_db_job(enqueue_job(items), on_done, on_error)
             return
 
         # 🔁 2) 비로그인 상태: 로컬 SQLite (레거시)
@@ -917,30 +945,21 @@ class IMUGUI:
         except Exception:
             pass
 
-        try:
-            conn = sqlite3.connect(db_path, timeout=30)
-            conn.execute("BEGIN")
+        predictions = sorted(self.predictions_data.items())
+
+        def job(conn):
             self._ensure_min_schema(conn)
             admin_id = self._get_or_create_admin_id(conn)   # 레거시: admin 계정
-            conn.commit()
-        except Exception as e:
-            try: conn.rollback()
-            except: pass
-            messagebox.showerror("DB 오류", f"DB 초기화 실패:\n{e}")
-            return
-
-        success, failed = 0, 0
-        failures = []
-        try:
-            conn.execute("BEGIN")
-            for sensor_id, pred in sorted(self.predictions_data.items()):
+            success, failed = 0, 0
+            failures = []
+            codes = allocate_imu_codes(conn, len(predictions))   # 저장 한 번에 코드 묶음 예약
+            for (sensor_id, pred), code in zip(predictions, codes):
                 try:
                     passed = 0 if bool(pred.get("is_faulty", False)) else 1
                     roll_val = self._finite_or_none(pred.get("roll_drift"))
                     pitch_val = self._finite_or_none(pred.get("pitch_drift"))
                     yaw_val = self._finite_or_none(pred.get("yaw_drift"))
                     serial = f"SENSOR-{sensor_id:02d}"
-                    code = self._next_imu_code(conn)
                     conn.execute("""
                         INSERT INTO imurecord
                         (code, serial, inspected_at, passed, inspector_id, box_no, destination, arrived, roll, pitch, yaw, created_at, updated_at)
@@ -951,38 +970,73 @@ class IMUGUI:
                 except Exception as ie:
                     failed += 1
                     failures.append(f"센서 {sensor_id}: {ie}")
-            conn.commit()
-        except Exception as e:
-            try: conn.rollback()
-            except: pass
-            messagebox.showerror("DB 오류", f"업로드 중 오류:\n{e}")
-            conn.close()
-            return
-        finally:
-            conn.close()
+            return success, failed, failures
 
-        if failed == 0:
-            self.update_status(f"로컬 DB 업로드 완료({success}건) → {db_path}", "success")
-            messagebox.showinfo("성공", f"로컬 DB 업로드 완료!\n- 업로드 성공: {success}건\n- DB: {db_path}")
-        else:
-            self.update_status(f"일부 업로드 실패: 성공 {success} / 실패 {failed}", "warning")
-            detail = "\n".join(failures[:5]) + ("\n..." if len(failures) > 5 else "")
-            messagebox.showwarning("부분 실패",
-                                   f"일부 업로드에 실패했습니다.\n- 성공: {success}\n- 실패: {failed}\n\n상세:\n{detail}")
+        def on_done(result):
+            success, failed, failures = result
+            if failed == 0:
+                self.update_status(f"로컬 DB 업로드 완료({success}건) → {db_path}", "success")
+                messagebox.showinfo("성공", f"로컬 DB 업로드 완료!\n- 업로드 성공: {success}건\n- DB: {db_path}")
+            else:
+                self.update_status(f"일부 업로드 실패: 성공 {success} / 실패 {failed}", "warning")
+                detail = "\n".join(failures[:5]) + ("\n..." if len(failures) > 5 else "")
+                messagebox.showwarning("부분 실패",
+                                       f"일부 업로드에 실패했습니다.\n- 성공: {success}\n- 실패: {failed}\n\n상세:\n{detail}")
+
+        def on_error(e):
+            self.update_status("로컬 DB 업로드 실패", "danger")
+            messagebox.showerror("DB 오류", f"로컬 DB 업로드 실패:\n{e}")
+
+        if self.submit_db_job(job, on_done, on_error, writer=self._get_db_writer(db_path)):
+            self.update_status("로컬 DB 업로드 중...", "info")
 
     # ----------------- 모델/예측 -----------------
     def load_model(self):
         file_path = filedialog.askopenfilename(title="AI 모델 파일 선택", filetypes=[("Pickle 파일","*.pkl")])
         if not file_path: return
-        try:
-            self.pipeline = joblib.load(file_path)
-            self.update_model_status(True)
-            self.update_status("AI 모델 로드 완료", 'success')
-            messagebox.showinfo("성공", "AI 모델이 성공적으로 로드되었습니다")
-        except Exception as e:
-            self.update_model_status(False)
+        # 로드 + 워밍업은 백그라운드에서, 끝나면 교체 (수집 중에도 가능, 기존 모델은 교체 전까지 계속 사용)
+        def on_done(model):
+            self.update_model_status(True, model.version)
+            self.update_status(f"AI 모델 로드 완료 ({model.version})", 'success')
+            messagebox.showinfo("성공", f"AI 모델이 성공적으로 로드되었습니다\n버전: {model.version}")
+        def on_error(e):
+            self.update_model_status(self.pipeline is not None, self.models.version)
             self.update_status("모델 로드 실패", 'danger')
             messagebox.showerror("오류", f"모델 로드 실패:\n{e}")
+        self.models.load_async(file_path, on_done, on_error)
+        self.update_status("AI 모델 로드 중...", 'info')
+
+    def restore_model(self):
+        """마지막으로 사용한 모델을 백그라운드로 다시 로드 (기록이 없으면 아무것도 하지 않음)"""
+        def on_done(model):
+            self.update_model_status(True, model.version)
+            self.update_status(f"마지막 AI 모델 로드 완료 ({model.version})", 'success')
+        def on_error(e):
+            self.update_status("마지막 AI 모델을 불러오지 못했습니다", 'warning')
+        if self.models.restore(on_done, on_error) is not None:
+            self.update_status("마지막 AI 모델 로드 중...", 'info')
+
+    @property
+    def pipeline(self):
+        return self.models.pipeline
+
+    def predict_batch(self, X_feat, sensor_ids):
+        """(센서 수 × 9) 특성을 한 번에 추론 → {센서: 예측값}. 배치 실패 시 행 단위 재시도"""
+        if len(X_feat) == 0:
+            return {}
+        pipeline = self.pipeline  # 도중에 모델이 교체되어도 같은 모델로 예측
+        try:
+            with metrics.timer('predict'):
+                return dict(zip(sensor_ids, pipeline.predict(X_feat)))
+        except Exception as e:
+            print(f"일괄 예측 오류, 센서별로 재시도: {e}")
+        results = {}
+        for i, sn in enumerate(sensor_ids):
+            try:
+                results[sn] = pipeline.predict(X_feat.iloc[[i]])[0]
+            except Exception as e:
+                print(f"센서 {sn} 예측 호출 오류: {e}")
+        return results
 
     def predict(self):
         # 다음 자동 사이클을 위해 플래그 리셋
@@ -991,58 +1045,27 @@ class IMUGUI:
         if self.pipeline is None:
             messagebox.showerror("오류", "AI 모델이 로드되지 않았습니다"); return
         with self.data_lock:
-            if not self.data_records:
+            if not len(self.buffer):
                 messagebox.showwarning("경고", "예측할 데이터가 없습니다"); return
-            data_for_prediction = self.data_records.copy()
+            cols = self.buffer.columns()
         try:
-            df = pd.DataFrame(data_for_prediction)
-            required = ['timestamp','SN','ROLL','PITCH','YAW','X_DEL_ANG','Y_DEL_ANG','Z_DEL_ANG']
-            missing = [c for c in required if c not in df.columns]
-            if missing:
-                messagebox.showerror("오류", f"필수 데이터 컬럼이 없습니다: {missing}"); return
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            predictions = {}; self.predictions_data = {} 
-
-            for sn in range(8):
-                sub = df[df['SN'] == sn].sort_values('timestamp')
-                if len(sub) < 2: continue
-                t0 = sub['timestamp'].iloc[0]                             
-                start_time = t0 + timedelta(seconds=1); end_time = start_time + timedelta(seconds=4)
-                window = sub[(sub['timestamp'] >= start_time) & (sub['timestamp'] <= end_time)]
-                if len(window) < 2: continue
-
-                p5 = (-window['X_DEL_ANG']).mean()
-                q5 = (-window['Z_DEL_ANG']).mean()
-                r5 = ( window['Y_DEL_ANG']).mean()
-
-                dt = (window['timestamp'].iloc[-1] - window['timestamp'].iloc[0]).total_seconds()
-                if dt == 0: continue
-                Rd5 = (window['ROLL'].iloc[-1]-window['ROLL'].iloc[0])/dt
-                Pd5 = (window['PITCH'].iloc[-1]-window['PITCH'].iloc[0])/dt
-                Yd5 = (window['YAW'].iloc[-1]-window['YAW'].iloc[0])/dt
-
-                R = window['ROLL'].values; P = window['PITCH'].values
-                p = -window['X_DEL_ANG'].values; q = -window['Z_DEL_ANG'].values; r = window['Y_DEL_ANG'].values
-                
-                R_rad = np.deg2rad(R); P_rad = np.deg2rad(P)
-                cos_P = np.cos(P_rad); cos_P = np.where(np.abs(cos_P) < 1e-10, 1e-10*np.sign(cos_P), cos_P)
-                sin_R = np.sin(R_rad); cos_R = np.cos(R_rad)
-                tan_P = np.clip(np.tan(P_rad), -100, 100)
-                Rdot = p + (q*sin_R + r*cos_R) * tan_P
-                Pdot = q * cos_R - r * sin_R
-                Ydot = (q * sin_R + r * cos_R) / cos_P
-                Rdot = np.nan_to_num(Rdot); Pdot = np.nan_to_num(Pdot); Ydot = np.nan_to_num(Ydot)
-                Rdot5 = Rdot.mean(); Pdot5 = Pdot.mean(); Ydot5 = Ydot.mean()
-
-                X_feat = pd.DataFrame([[p5,q5,r5,Rd5,Pd5,Yd5,Rdot5,Pdot5,Ydot5]],
-                                      columns=['p5','q5','r5','Rd5','Pd5','Yd5','Rdot5','Pdot5','Ydot5'])
-                if X_feat.isnull().any().any(): continue
-
-                try:
-                    raw_pred = self.pipeline.predict(X_feat)
-                except Exception as e:
-                    print(f"센서 {sn} 예측 호출 오류: {e}"); continue
+            predictions = {}; self.predictions_data = {}
 
+            # 전체 센서 특성을 한 번에 계산 → 한 번의 pipeline.predict 로 추론
+            with metrics.timer('features'):
+                feature_sns, feature_rows = extract_features(cols)
+            feature_sns = feature_sns.tolist()
+            # 특성 창과 겹치는 연결 끊김 구간 (센서별 초)
+            with self.data_lock:
+                gaps = self.link.gap_intervals(time.time())
+            gap_sns, overlap = window_gaps(cols, gaps)
+            gap_seconds = {sn: sec for sn, sec in zip(gap_sns.tolist(), overlap.tolist()) if sec > 0}
+            import pandas as pd
+            X_feat = pd.DataFrame(feature_rows, columns=FEATURE_COLUMNS)
+            for sn, raw_pred in self.predict_batch(X_feat, feature_sns).items():
+                if sn in gap_seconds and self.GAP_POLICY == 'exclude':
+                    print(f"⚠️ 센서 {sn}: 측정 창에 연결 끊김 {gap_seconds[sn]:.1f}초 포함 - 진단 제외")
+                    continue
                 # --- ✅ 출력 평탄화/검증: [[Rdel,Pdel,Ydel]] 등 어떤 형태든 안전하게 3개 추출
                 pred_flat = np.array(raw_pred).reshape(-1)
 
@@ -1070,6 +1093,9 @@ class IMUGUI:
                     'is_faulty': is_faulty,
                     'status': status
                 }
+                if sn in gap_seconds:
+                    self.predictions_data[sn]['gap_seconds'] = gap_seconds[sn]
+                    self.predictions_data[sn]['notes'] = f"측정 창에 연결 끊김 {gap_seconds[sn]:.1f}초 포함"
 
             self.display_predictions(predictions)
             if self.auto_mode:
@@ -1083,6 +1109,7 @@ class IMUGUI:
             print(f"예측 오류 상세: {e}")
 
     def display_predictions(self, predictions):
+        if self.canvas is None: return
         for sn, ax in enumerate(self.axes):
             pred = predictions.get(sn)
             for txt in list(ax.texts): txt.remove()
@@ -1101,6 +1128,9 @@ class IMUGUI:
                     bgcolor = self.colors['danger'] if fail else self.colors['success']
                     border_color = '#dc3545' if fail else '#28a745'
                     label = f"100s DRIFT PREDICTION\n{max_axis}: {max_signed:.2f}°\n{status}"
+                    # 측정 창에 연결 끊김이 있던 센서 표시
+                    if self.predictions_data.get(sn, {}).get('gap_seconds'):
+                        label += "\n(연결 끊김 포함)"
                 else:
                     # 호환 유지(단일 출력 모델 대비)
                     val = pred[0]; fail = abs(val) > self.threshold
@@ -1117,10 +1147,24 @@ class IMUGUI:
         self.canvas.draw()
 
 if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="IMU 고장진단 GUI")
+    ap.add_argument("--url", help="WebSocket 주소 (예: 시뮬레이터 ws://127.0.0.1:8081)")
+    ap.add_argument("--replay", help="장비 대신 녹화 파일(.imurec) 재생")
+    ap.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 = 최대 속도)")
+    ap.add_argument("--record", help="수신 프레임을 녹화할 파일 (.imurec)")
+    args = ap.parse_args()
+
     root = tk.Tk()
     try:
         root.state('zoomed')
     except Exception:
         root.attributes('-zoomed', True)
     app = IMUGUI(root)
+    if args.url:
+        app.ws_url = args.url
+    app.replay_path = args.replay
+    app.replay_speed = args.speed
+    if args.record:
+        app.recorder = FrameRecorder(args.record)
     root.mainloop()
@@ -1,20 +1,15 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
-import joblib
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-from matplotlib.patches import Circle
-import threading
-import websocket
-import json
-from datetime import datetime, timedelta
-import numpy as np
-import platform
-import sqlite3
-import uuid
+# matplotlib 은 창이 뜬 뒤 build_plots 에서, pandas/joblib 은 엔진이 처음 쓸 때 불러옴
+from datetime import datetime
 import os
+import time
+
+from imu_engine import IMUEngine
+from imu_font import cache_path, default_candidates, resolve_font
+from imu_metrics import metrics, open_panel
+from imu_plot import BlitPlotter, RenderGovernor
+from imu_replay import FrameRecorder
 
 class IMUGUI:
     def __init__(self, root):
@@ -23,24 +18,20 @@ class IMUGUI:
         self.root.configure(bg='#1a1a2e')  # 다크 네이비 배경
         
         self.fullscreen = False
-        self.data_records = []
-        self.pipeline = None
-        self.streaming = False
         self.auto_mode = False
-        self.collection_start_time = None
-        self.threshold = 3.3
-        self.session_id = None
-        self.predictions_data = {}
-        
-        # 스레드 안전성을 위한 Lock 추가
-        self.data_lock = threading.Lock()
-        
-        # 최대 레코드 수 제한
-        self.MAX_RECORDS = 10000
-        
-        # WebSocket 연결 상태
-        self.ws_connected = False
-        self.connection_timeout = 5
+        self.live_mode = False
+        
+        # 수집·분석·저장은 IMUEngine 이 담당 (헤드리스 CLI 와 공유), GUI 는 화면과 조작만 담당
+        # DB 작업/모델 로드 완료와 연결 상태 알림은 root.after 로 UI 스레드에서 처리
+        # 마지막으로 쓴 모델은 경로+해시를 기록해 두고 시작할 때 백그라운드로 다시 로드
+        self.engine = IMUEngine(
+            dispatch=lambda fn: self.root.after(0, fn),
+            on_event=lambda event, info: self.root.after(0, self.on_engine_event, event, info),
+            model_state_path=cache_path('model.json'))
+        self.buffer = self.engine.buffer
+        self.data_lock = self.engine.data_lock
+        self.link = self.engine.link
+        self.stream_writer = self.engine.stream_writer
         
         # 스마트 팩토리 색상 테마
         self.colors = {
@@ -63,116 +54,64 @@ class IMUGUI:
         # 한글 폰트 설정
         self.setup_korean_font()
         
-        # 다크 테마 스타일 설정
-        plt.style.use('dark_background')
-        
         self.root.bind("<F11>", self.toggle_fullscreen)
         self.root.bind("<Escape>", lambda e: self.root.attributes("-fullscreen", False))
+        self.root.bind("<F12>", lambda e: self.open_metrics_panel())
 
         # 메인 레이아웃 구성
         self.setup_main_layout()
+        
+        # 마지막 모델 복원
+        self.restore_model()
 
     def init_database(self):
-        """데이터베이스 초기화"""
-        self.db_path = "imu_analysis.db"
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS imu_raw_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    sensor_id INTEGER NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    roll REAL NOT NULL,
-                    pitch REAL NOT NULL,
-                    yaw REAL NOT NULL,
-                    x_del_ang REAL NOT NULL,
-                    y_del_ang REAL NOT NULL,
-                    z_del_ang REAL NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS diagnosis_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    sensor_id INTEGER NOT NULL,
-                    measurement_date DATE NOT NULL,
-                    measurement_time TIME NOT NULL,
-                    data_collection_duration REAL NOT NULL,
-                    predicted_roll_drift REAL,
-                    predicted_pitch_drift REAL,
-                    predicted_yaw_drift REAL,
-                    max_drift_axis TEXT,
-                    max_drift_value REAL,
-                    max_drift_signed REAL,
-                    is_faulty BOOLEAN NOT NULL,
-                    fault_threshold REAL NOT NULL,
-                    diagnosis_status TEXT NOT NULL,
-                    model_version TEXT,
-                    data_quality_score REAL,
-                    notes TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS measurement_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    start_time DATETIME NOT NULL,
-                    end_time DATETIME,
-                    total_duration REAL,
-                    sensor_count INTEGER,
-                    total_data_points INTEGER,
-                    session_type TEXT,
-                    operator_name TEXT,
-                    facility_location TEXT,
-                    equipment_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            conn.commit()
-            print("✅ 데이터베이스 초기화 완료")
-            
-        except Exception as e:
-            if conn:
-                conn.rollback()
+        """데이터베이스 초기화 (엔진의 전용 writer 스레드가 연결을 계속 유지)"""
+        self.root.protocol("WM_DELETE_WINDOW", self.on_app_close)
+        
+        def on_error(e):
             print(f"❌ 데이터베이스 초기화 오류: {e}")
             messagebox.showerror("데이터베이스 오류", f"데이터베이스 초기화 실패:\n{e}")
-        finally:
-            if conn:
-                conn.close()
+        
+        if not self.engine.init_database(on_done=lambda _: print("✅ 데이터베이스 초기화 완료"),
+                                         on_error=on_error):
+            self.update_status("DB 쓰기 대기열이 가득 찼습니다", 'warning')
+
+    def on_app_close(self):
+        """창 닫기: 남은 DB 작업을 마무리한 뒤 종료"""
+        self.auto_mode = False
+        self.engine.close()
+        self.root.destroy()
+
+    def on_engine_event(self, event, info):
+        """엔진 연결 상태 알림 → 화면 갱신"""
+        if event == 'connected':
+            self.update_connection_status(True)
+            self.update_status("데이터 수집 중", 'success')
+        elif event == 'error':
+            self.update_connection_status(False)
+            self.update_status("연결 오류 발생", 'danger')
+        elif event == 'disconnected':
+            self.update_connection_status(False)
+            if self.engine.streaming:
+                self.update_status("연결이 끊어졌습니다", 'warning')
+        elif event == 'reconnecting':
+            self.update_status(f"재연결 시도 {info['attempt']}회 ({info['delay']:.1f}초 후)", 'warning')
+        elif event == 'verdict' and self.live_mode:
+            self.display_predictions({sn: v['prediction'] for sn, v in info.items()},
+                                     verdicts=info, title="LIVE DRIFT (4s WINDOW)")
+            faulty = sum(1 for v in info.values() if v['is_faulty'])
+            self.measure_status.config(text=f"📡 LIVE: {faulty} FAULT" if faulty else "📡 LIVE: NORMAL",
+                                       fg=self.colors['danger'] if faulty else self.colors['success'])
 
     def setup_korean_font(self):
-        """한글 폰트 설정"""
-        system = platform.system()
-        
-        if system == 'Windows':
-            font_candidates = ['Malgun Gothic', 'Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        elif system == 'Darwin':
-            font_candidates = ['AppleGothic', 'Arial Unicode MS', 'DejaVu Sans']
-        else:
-            font_candidates = ['DejaVu Sans', 'Liberation Sans', 'Noto Sans CJK KR']
-        
-        available_fonts = [f.name for f in fm.fontManager.ttflist]
-        korean_font = None
-        
-        for font in font_candidates:
-            if font in available_fonts:
-                korean_font = font
-                break
+        """한글 폰트 설정 (찾은 폰트는 실행 간 캐시, rcParams 는 그래프 생성 시 적용)"""
+        korean_font, _ = resolve_font(default_candidates())
+        self.korean_font_found = korean_font is not None
         
         if korean_font:
-            plt.rcParams['font.family'] = korean_font
             self.font_family = korean_font
             print(f"✅ 한글 폰트 설정: {korean_font}")
         else:
-            plt.rcParams['axes.unicode_minus'] = False
             self.font_family = 'DejaVu Sans'
             print("⚠️ 한글 폰트를 찾을 수 없어 기본 폰트를 사용합니다.")
 
@@ -297,7 +236,7 @@ class IMUGUI:
                 fg=self.colors['text_secondary']).pack(side='left', padx=5)
         
         self.threshold_display = tk.Label(threshold_frame,
-                                         text=f"{self.threshold}°",
+                                         text=f"{self.engine.threshold}°",
                                          font=(self.font_family, 16, 'bold'),
                                          bg=self.colors['bg_light'],
                                          fg=self.colors['accent'])
@@ -366,6 +305,15 @@ class IMUGUI:
                                  **button_config)
         self.auto_btn.pack(fill='x', pady=3)
         
+        # 연속 진단 버튼 (번인 시험: 1초마다 최근 4초 창으로 판정)
+        self.live_btn = tk.Button(btn_frame,
+                                 text="📡 START LIVE DIAGNOSIS",
+                                 command=self.toggle_live_diagnosis,
+                                 bg=self.colors['accent'],
+                                 fg='white',
+                                 **button_config)
+        self.live_btn.pack(fill='x', pady=3)
+        
         # ML 모델 로드 버튼
         tk.Button(btn_frame,
                  text="🤖 LOAD AI MODEL",
@@ -405,7 +353,33 @@ class IMUGUI:
         plot_frame = tk.Frame(parent, bg=self.colors['bg_medium'])
         plot_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
-        # 그래프 생성
+        # matplotlib 은 창이 표시된 뒤 불러와 그래프 생성 (그 전까지 axes 는 비어 있음)
+        self.axes = []
+        self.canvas = None
+        self.plotter = None
+        # 그래프 갱신 주기는 측정한 그리기 시간으로 조절, 새 데이터가 없으면 그리지 않음
+        self.render = RenderGovernor()
+        self.plot_placeholder = tk.Label(plot_frame,
+                                         text="Loading charts...",
+                                         font=(self.font_family, 14),
+                                         bg=self.colors['bg_medium'],
+                                         fg=self.colors['text_secondary'])
+        self.plot_placeholder.pack(fill='both', expand=True)
+        self.root.after(100, lambda: self.build_plots(plot_frame))
+
+    def build_plots(self, plot_frame):
+        """그래프 생성"""
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
+        # 다크 테마 스타일 설정
+        plt.style.use('dark_background')
+        if self.korean_font_found:
+            plt.rcParams['font.family'] = self.font_family
+        else:
+            plt.rcParams['axes.unicode_minus'] = False
+        self.plot_placeholder.destroy()
+        
         self.fig, axs = plt.subplots(4, 2, figsize=(14, 10), facecolor=self.colors['bg_dark'])
         self.axes = axs.flatten()
         
@@ -423,15 +397,24 @@ class IMUGUI:
                 spine.set_edgecolor(self.colors['grid'])
         
         # X축 레이블은 하단 두 개만
-        self.axes[6].set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'], 
+        self.axes[6].set_xlabel("Time (s)", fontsize=10, color=self.colors['text_secondary'], 
                                 fontfamily=self.font_family)
-        self.axes[7].set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'], 
+        self.axes[7].set_xlabel("Time (s)", fontsize=10, color=self.colors['text_secondary'], 
                                 fontfamily=self.font_family)
         
         plt.tight_layout(pad=2.5)
         
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        
+        # 라인/범례는 한 번만 생성하고 이후에는 set_data + blit 으로 갱신
+        self.plotter = BlitPlotter(
+            self.canvas, self.axes,
+            line_colors=('#ff6b6b', '#4ecdc4', '#45b7d1'),
+            line_kw={'linewidth': 2, 'alpha': 0.9},
+            legend_kw={'loc': 'upper right', 'fontsize': 9, 'framealpha': 0.9,
+                       'facecolor': self.colors['bg_dark'], 'edgecolor': 'none',
+                       'prop': {'family': self.font_family}})
 
     def setup_statusbar(self):
         """하단 상태바 구성"""
@@ -456,6 +439,20 @@ class IMUGUI:
                 font=(self.font_family, 9),
                 bg=self.colors['bg_medium'],
                 fg=self.colors['text_secondary']).pack(side='right')
+        
+        # 그래프 갱신 FPS / 그리기 시간
+        self.render_label = tk.Label(info_frame,
+                                    text="",
+                                    font=(self.font_family, 9),
+                                    bg=self.colors['bg_medium'],
+                                    fg=self.colors['text_secondary'])
+        self.render_label.pack(side='right', padx=15)
+        # 클릭 또는 F12 → 단계별 처리 시간 성능 창
+        self.render_label.bind("<Button-1>", lambda e: self.open_metrics_panel())
+
+    def open_metrics_panel(self):
+        """단계별 처리 시간 / 카운터 성능 창 (JSON 저장 가능)"""
+        open_panel(self.root)
 
     def toggle_fullscreen(self, event=None):
         self.fullscreen = not self.fullscreen
@@ -500,7 +497,7 @@ class IMUGUI:
             )
             self.conn_indicator['label'].config(text="WebSocket: OFFLINE")
 
-    def update_model_status(self, loaded):
+    def update_model_status(self, loaded, version=None):
         """모델 상태 업데이트"""
         if loaded:
             self.model_indicator['canvas'].itemconfig(
@@ -508,7 +505,8 @@ class IMUGUI:
                 fill=self.colors['success'],
                 outline=self.colors['success']
             )
-            self.model_indicator['label'].config(text="ML Pipeline: READY")
+            self.model_indicator['label'].config(
+                text=f"ML Pipeline: READY ({version})" if version else "ML Pipeline: READY")
         else:
             self.model_indicator['canvas'].itemconfig(
                 self.model_indicator['led'],
@@ -520,11 +518,20 @@ class IMUGUI:
     def update_data_count(self):
         """데이터 카운트 업데이트"""
         with self.data_lock:
-            count = len(self.data_records)
-        self.data_count_label.config(text=f"Records: {count:,}")
-        
-        if self.session_id:
-            short_id = self.session_id[:8]
+            count = len(self.buffer)
+            dropped, loss = self.link.dropped, self.link.loss_rate
+            gap = self.link.gap_seconds
+        text = f"Records: {count:,}"
+        if dropped:
+            text += f" | Loss {dropped:,} ({loss:.1%})"
+        if gap:
+            text += f" | Gap {gap:.1f}s"
+        if self.stream_writer.rows_written:
+            text += f" (DB {self.stream_writer.rows_written:,})"
+        self.data_count_label.config(text=text)
+        
+        if self.engine.session_id:
+            short_id = self.engine.session_id[:8]
             self.session_label.config(text=f"Session: {short_id}...")
 
     def wait_for_connection(self, callback):
@@ -534,9 +541,9 @@ class IMUGUI:
         def check_connection():
             elapsed = (datetime.now() - start_time).total_seconds()
             
-            if self.ws_connected:
+            if self.engine.ws_connected:
                 callback(True)
-            elif elapsed >= self.connection_timeout:
+            elif elapsed >= self.engine.connection_timeout:
                 callback(False)
             else:
                 self.root.after(100, check_connection)
@@ -545,18 +552,16 @@ class IMUGUI:
 
     def start_auto_collection(self):
         """자동 측정 시작 - 5초 후 자동 종료 및 예측"""
-        if self.pipeline is None:
+        if self.engine.pipeline is None:
             messagebox.showerror("모델 오류", "먼저 AI 모델을 로드해주세요!")
             return
+        if self.live_mode:
+            messagebox.showwarning("경고", "연속 진단 중입니다. 먼저 연속 진단을 중지해주세요.")
+            return
             
         self.auto_mode = True
-        with self.data_lock:
-            self.data_records = []
-        self.predictions_data = {}
-        self.collection_start_time = datetime.now()
-        self.session_id = str(uuid.uuid4())
-        
-        self.save_session_info()
+        self.reset_plots()
+        self.engine.begin_session("자동", on_done=lambda _: self.update_data_count())
         
         self.measure_status.config(text="🔄 CONNECTING...", fg=self.colors['warning'])
         self.update_status("WebSocket 연결 중...", 'warning')
@@ -578,37 +583,32 @@ class IMUGUI:
         
         self.wait_for_connection(on_connection_result)
 
-    def save_session_info(self):
-        """측정 세션 정보를 데이터베이스에 저장"""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("BEGIN TRANSACTION")
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO measurement_sessions 
-                (session_id, start_time, session_type, operator_name, facility_location, equipment_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                self.session_id,
-                self.collection_start_time.isoformat(),
-                "자동",
-                "운영자",
-                "시설위치",
-                "IMU-001"
-            ))
-            
-            conn.commit()
-            self.update_data_count()
-            
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            print(f"세션 정보 저장 오류: {e}")
-        finally:
-            if conn:
-                conn.close()
+    def toggle_live_diagnosis(self):
+        """연속 진단 시작/중지 (수신을 유지하며 ROLLING_INTERVAL 마다 히스테리시스 판정)"""
+        if self.live_mode:
+            self.live_mode = False
+            self.engine.stop_rolling()
+            self.stop_stream()
+            self.live_btn.config(text="📡 START LIVE DIAGNOSIS")
+            self.measure_status.config(text="⏸ STANDBY", fg=self.colors['text_secondary'])
+            self.update_status("연속 진단 중지", 'info')
+            return
+        
+        if self.engine.pipeline is None:
+            messagebox.showerror("모델 오류", "먼저 AI 모델을 로드해주세요!")
+            return
+        if self.auto_mode or self.engine.streaming:
+            messagebox.showwarning("경고", "측정이 진행 중입니다. 끝난 뒤 다시 시도해주세요.")
+            return
+        
+        self.live_mode = True
+        self.reset_plots()
+        self.engine.reset_rolling()
+        self.start_stream()
+        self.engine.start_rolling()
+        self.live_btn.config(text="⏹ STOP LIVE DIAGNOSIS")
+        self.measure_status.config(text="📡 LIVE: WAITING", fg=self.colors['info'])
+        self.update_status(f"연속 진단 중 ({self.engine.ROLLING_INTERVAL:g}초 주기)", 'success')
 
     def start_countdown(self, seconds_left):
         if seconds_left > 0 and self.auto_mode:
@@ -622,106 +622,44 @@ class IMUGUI:
 
     def clear_data(self):
         """데이터 초기화"""
-        with self.data_lock:
-            self.data_records = []
-        self.predictions_data = {}
+        self.engine.clear()
         self.update_data_count()
-        
-        for ax in self.axes:
-            ax.cla()
-            ax.set_facecolor(self.colors['bg_medium'])
-            ax.set_title(f"🔧 SENSOR {self.axes.tolist().index(ax)}", fontsize=12, fontweight='bold',
-                        color=self.colors['text_primary'], fontfamily=self.font_family)
-            ax.set_ylabel("Angle (°)", fontsize=10, color=self.colors['text_secondary'],
-                         fontfamily=self.font_family)
-            ax.grid(True, alpha=0.2, color=self.colors['grid'])
-            ax.tick_params(colors=self.colors['text_secondary'])
-            
-            for spine in ax.spines.values():
-                spine.set_edgecolor(self.colors['grid'])
-        
-        self.canvas.draw()
+        self.reset_plots()
         self.measure_status.config(text="⏸ STANDBY", fg=self.colors['text_secondary'])
         self.update_status("데이터 초기화 완료", 'success')
 
-    def on_message(self, ws, message):
-        try:
-            msg = json.loads(message)
-            ts = datetime.now()
-            
-            with self.data_lock:
-                if 'sensors' in msg:
-                    for sensor in msg['sensors']:
-                        rec = sensor.copy()
-                        rec['SN'] = rec.get('id')
-                        rec['timestamp'] = ts
-                        self.data_records.append(rec)
-                else:
-                    msg['timestamp'] = ts
-                    self.data_records.append(msg)
-                
-                if len(self.data_records) > self.MAX_RECORDS:
-                    self.data_records = self.data_records[-self.MAX_RECORDS:]
-            
-            self.update_data_count()
-                    
-        except Exception as e:
-            print("메시지 파싱 오류:", e)
-
-    def on_error(self, ws, error):
-        print("WebSocket 오류:", error)
-        self.ws_connected = False
-        self.update_connection_status(False)
-        self.update_status("연결 오류 발생", 'danger')
-
-    def on_close(self, ws, close_status, close_msg):
-        print("WebSocket 연결 종료")
-        self.ws_connected = False
-        self.update_connection_status(False)
-        if self.streaming:
-            self.update_status("연결이 끊어졌습니다", 'warning')
-
-    def on_open(self, ws):
-        print("WebSocket 연결 성공")
-        self.ws_connected = True
-        self.update_connection_status(True)
-        self.update_status("데이터 수집 중", 'success')
+    def reset_plots(self):
+        """그래프 라인/예측 라벨 초기화"""
+        if self.plotter is None:
+            return
+        for ax in self.axes:
+            for txt in list(ax.texts):
+                txt.remove()
+        self.plotter.reset()
+        self.canvas.draw()
+        self.render.invalidate()
 
     def start_stream(self):
-        if self.streaming:
+        if self.engine.streaming:
             return
         
-        self.ws_connected = False
-        ws_url = "ws://10.200.246.81:81"
+        # 수동 수집/연속 진단도 연속 저장 시 별도 세션으로 기록
+        if self.engine.STREAM_TO_DB and not self.auto_mode:
+            self.engine.begin_session("연속" if self.live_mode else "수동", clear=False,
+                                      on_done=lambda _: self.update_data_count())
         
         try:
-            self.ws = websocket.WebSocketApp(
-                ws_url,
-                on_open=self.on_open,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close
-            )
-            self.wst = threading.Thread(target=self.ws.run_forever)
-            self.wst.daemon = True
-            self.streaming = True
-            self.wst.start()
+            self.engine.start_stream()
             self.root.after(100, self.update_plot)
         except Exception as e:
             print(f"WebSocket 시작 오류: {e}")
-            self.streaming = False
-            self.ws_connected = False
+            self.engine.streaming = False
+            self.engine.ws_connected = False
 
     def stop_stream(self):
-        if not self.streaming:
+        if not self.engine.stop_stream():
             return
-        self.streaming = False
-        self.ws_connected = False
         self.update_connection_status(False)
-        try:
-            self.ws.close()
-        except:
-            pass
         
         if self.auto_mode:
             self.countdown_label.config(text="")
@@ -730,66 +668,44 @@ class IMUGUI:
             self.update_status("데이터 수집 중지", 'info')
 
     def update_plot(self):
-        if not self.streaming:
+        if not self.engine.streaming:
             return
         
         try:
-            with self.data_lock:
-                if self.data_records:
-                    df = pd.DataFrame(self.data_records.copy())
-            
-            if 'df' in locals() and not df.empty:
-                if 'timestamp' not in df.columns:
-                    self.root.after(100, self.update_plot)
-                    return
-                    
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                
-                for ax in self.axes:
-                    ax.cla()
-                    ax.set_facecolor(self.colors['bg_medium'])
-                    ax.grid(True, alpha=0.2, color=self.colors['grid'])
-                    ax.tick_params(colors=self.colors['text_secondary'])
-                    
-                    for spine in ax.spines.values():
-                        spine.set_edgecolor(self.colors['grid'])
-                    
-                for sn in range(8):
-                    ax = self.axes[sn]
-                    ax.set_title(f"🔧 SENSOR {sn}", fontsize=12, fontweight='bold',
-                               color=self.colors['text_primary'], fontfamily=self.font_family)
-                    
-                    if 'SN' in df.columns:
-                        sub = df[df['SN'] == sn]
-                        if not sub.empty and all(col in sub.columns for col in ['ROLL', 'PITCH', 'YAW']):
-                            ax.plot(sub['timestamp'], sub['ROLL'], '#ff6b6b', linewidth=2, label='Roll', alpha=0.9)
-                            ax.plot(sub['timestamp'], sub['PITCH'], '#4ecdc4', linewidth=2, label='Pitch', alpha=0.9)
-                            ax.plot(sub['timestamp'], sub['YAW'], '#45b7d1', linewidth=2, label='Yaw', alpha=0.9)
-                            ax.legend(loc='upper right', fontsize=9, framealpha=0.9,
-                                    facecolor=self.colors['bg_dark'], edgecolor='none',
-                                    prop={'family': self.font_family})
-                    
-                    ax.set_ylabel("Angle (°)", fontsize=10, color=self.colors['text_secondary'],
-                                 fontfamily=self.font_family)
-                    if sn >= 6:
-                        ax.set_xlabel("Time", fontsize=10, color=self.colors['text_secondary'],
-                                     fontfamily=self.font_family)
-                
-                plt.tight_layout(pad=2.0)
-                self.canvas.draw()
+            series = {}
+            with metrics.locked(self.data_lock):
+                # 지난 그리기 이후 새 샘플이 없으면 복사/그리기 생략
+                if self.plotter is not None and self.render.changed(self.buffer):
+                    for sn in range(8):
+                        if self.buffer.count(sn):
+                            cols = self.buffer.sensor(sn)
+                            series[sn] = (cols['timestamp'].copy(), cols['ROLL'].copy(),
+                                          cols['PITCH'].copy(), cols['YAW'].copy())
+            
+            # 변경된 센서의 라인만 set_data + blit (그리기 시간 측정)
+            if series:
+                t0 = time.perf_counter()
+                self.plotter.update(series)
+                self.render.record(time.perf_counter() - t0)
+                metrics.observe('plot', time.perf_counter() - t0)
+                # 수신 스레드 대신 화면 갱신 주기에 맞춰 카운트 표시
+                self.update_data_count()
                 
         except Exception as e:
             print(f"플롯 업데이트 오류: {e}")
         
-        self.root.after(100, self.update_plot)
+        # 다음 주기 = 그리기 시간 기준 (느린 PC 에서는 늘어남)
+        interval = self.render.interval_ms()
+        self.render_label.config(text=self.render.summary())
+        self.root.after(interval, self.update_plot)
 
     def save_data(self):
         with self.data_lock:
-            if not self.data_records:
+            if not len(self.buffer):
                 messagebox.showwarning("경고", "저장할 데이터가 없습니다")
                 return
             
-            df = pd.DataFrame(self.data_records.copy())
+            df = self.buffer.to_dataframe()
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
@@ -806,110 +722,34 @@ class IMUGUI:
 
     def save_to_database(self):
         """수집된 데이터와 예측 결과를 데이터베이스에 저장"""
-        with self.data_lock:
-            if not self.data_records:
-                messagebox.showwarning("경고", "저장할 데이터가 없습니다")
-                return
-            
-            data_to_save = self.data_records.copy()
+        if not self.engine.sample_count():
+            messagebox.showwarning("경고", "저장할 데이터가 없습니다")
+            return
         
-        if not self.predictions_data:
+        if not self.engine.predictions_data:
             messagebox.showwarning("경고", "예측 결과가 없습니다. 먼저 자동 측정을 실행해주세요.")
             return
         
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("BEGIN TRANSACTION")
-            cursor = conn.cursor()
-            
-            df = pd.DataFrame(data_to_save)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            raw_data_count = 0
-            for _, row in df.iterrows():
-                if all(col in row for col in ['SN', 'ROLL', 'PITCH', 'YAW', 'X_DEL_ANG', 'Y_DEL_ANG', 'Z_DEL_ANG']):
-                    cursor.execute('''
-                        INSERT INTO imu_raw_data 
-                        (session_id, sensor_id, timestamp, roll, pitch, yaw, x_del_ang, y_del_ang, z_del_ang)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        self.session_id,
-                        int(row['SN']),
-                        row['timestamp'].isoformat(),
-                        float(row['ROLL']),
-                        float(row['PITCH']),
-                        float(row['YAW']),
-                        float(row['X_DEL_ANG']),
-                        float(row['Y_DEL_ANG']),
-                        float(row['Z_DEL_ANG'])
-                    ))
-                    raw_data_count += 1
-            
-            measurement_time = self.collection_start_time
-            end_time = datetime.now()
-            duration = (end_time - self.collection_start_time).total_seconds()
-            
-            diagnosis_count = 0
-            for sensor_id, pred_info in self.predictions_data.items():
-                cursor.execute('''
-                    INSERT INTO diagnosis_results 
-                    (session_id, sensor_id, measurement_date, measurement_time, data_collection_duration,
-                     predicted_roll_drift, predicted_pitch_drift, predicted_yaw_drift,
-                     max_drift_axis, max_drift_value, max_drift_signed,
-                     is_faulty, fault_threshold, diagnosis_status, model_version, data_quality_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.session_id,
-                    sensor_id,
-                    measurement_time.date().isoformat(),
-                    measurement_time.time().isoformat(),
-                    duration,
-                    pred_info.get('roll_drift'),
-                    pred_info.get('pitch_drift'),
-                    pred_info.get('yaw_drift'),
-                    pred_info.get('max_drift_axis'),
-                    pred_info.get('max_drift_value'),
-                    pred_info.get('max_drift_signed'),
-                    pred_info.get('is_faulty', False),
-                    self.threshold,
-                    pred_info.get('status', '정상'),
-                    "v1.0",
-                    1.0
-                ))
-                diagnosis_count += 1
-            
-            active_sensors = len(set(df['SN'])) if 'SN' in df.columns else 0
-            cursor.execute('''
-                UPDATE measurement_sessions 
-                SET end_time = ?, total_duration = ?, sensor_count = ?, total_data_points = ?
-                WHERE session_id = ?
-            ''', (
-                end_time.isoformat(),
-                duration,
-                active_sensors,
-                len(df),
-                self.session_id
-            ))
-            
-            conn.commit()
-            
+        session_id = self.engine.session_id
+        
+        def on_done(counts):
+            raw_data_count, diagnosis_count = counts
             self.update_status("데이터베이스 저장 완료", 'success')
             messagebox.showinfo("성공", 
                 f"데이터베이스에 저장 완료!\n"
                 f"- 원시 데이터: {raw_data_count:,}개\n"
                 f"- 진단 결과: {diagnosis_count}개\n"
-                f"- 세션 ID: {self.session_id[:8]}...")
-            
-        except Exception as e:
-            if conn:
-                conn.rollback()
+                f"- 세션 ID: {session_id[:8]}...")
+        
+        def on_error(e):
             self.update_status("데이터베이스 저장 실패", 'danger')
             messagebox.showerror("오류", f"데이터베이스 저장 실패:\n{e}")
             print(f"DB 저장 오류: {e}")
-        finally:
-            if conn:
-                conn.close()
+        
+        if self.engine.save_results(on_done, on_error):
+            self.update_status("데이터베이스 저장 중...", 'info')
+        else:
+            self.update_status("DB 쓰기 대기열이 가득 찼습니다", 'warning')
 
     def load_model(self):
         file_path = filedialog.askopenfilename(
@@ -919,153 +759,43 @@ class IMUGUI:
         if not file_path:
             return
         
-        try:
-            self.pipeline = joblib.load(file_path)
-            self.update_model_status(True)
-            self.update_status("AI 모델 로드 완료", 'success')
-            messagebox.showinfo("성공", "AI 모델이 성공적으로 로드되었습니다")
-        except Exception as e:
-            self.update_model_status(False)
+        # 로드 + 워밍업은 백그라운드에서, 끝나면 교체 (수집 중에도 가능, 기존 모델은 교체 전까지 계속 사용)
+        def on_done(model):
+            self.update_model_status(True, model.version)
+            self.update_status(f"AI 모델 로드 완료 ({model.version})", 'success')
+            messagebox.showinfo("성공", f"AI 모델이 성공적으로 로드되었습니다\n버전: {model.version}")
+        
+        def on_error(e):
+            self.update_model_status(self.engine.pipeline is not None, self.engine.model_version)
             self.update_status("모델 로드 실패", 'danger')
             messagebox.showerror("오류", f"모델 로드 실패:\n{e}")
+        
+        self.engine.load_model_async(file_path, on_done, on_error)
+        self.update_status("AI 모델 로드 중...", 'info')
+
+    def restore_model(self):
+        """마지막으로 사용한 모델을 백그라운드로 다시 로드 (기록이 없으면 아무것도 하지 않음)"""
+        def on_done(model):
+            self.update_model_status(True, model.version)
+            self.update_status(f"마지막 AI 모델 로드 완료 ({model.version})", 'success')
+        
+        def on_error(e):
+            self.update_status("마지막 AI 모델을 불러오지 못했습니다", 'warning')
+        
+        if self.engine.models.restore(on_done, on_error) is not None:
+            self.update_status("마지막 AI 모델 로드 중...", 'info')
 
     def predict(self):
-        if self.pipeline is None:
+        if self.engine.pipeline is None:
             messagebox.showerror("오류", "AI 모델이 로드되지 않았습니다")
             return
         
-        with self.data_lock:
-            if not self.data_records:
-                messagebox.showwarning("경고", "예측할 데이터가 없습니다")
-                return
-            
-            data_for_prediction = self.data_records.copy()
+        if not self.engine.sample_count():
+            messagebox.showwarning("경고", "예측할 데이터가 없습니다")
+            return
 
         try:
-            df = pd.DataFrame(data_for_prediction)
-            
-            required_cols = ['timestamp', 'SN', 'ROLL', 'PITCH', 'YAW', 'X_DEL_ANG', 'Y_DEL_ANG', 'Z_DEL_ANG']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                messagebox.showerror("오류", f"필수 데이터 컬럼이 없습니다: {missing_cols}")
-                return
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            predictions = {}
-            self.predictions_data = {}
-
-            for sn in range(8):
-                sub = df[df['SN'] == sn].sort_values('timestamp')
-                if len(sub) < 2:
-                    continue
-
-                t0 = sub['timestamp'].iloc[0]
-                start_time = t0 + timedelta(seconds=1)
-                end_time = start_time + timedelta(seconds=4)
-                window = sub[(sub['timestamp'] >= start_time) & (sub['timestamp'] <= end_time)]
-                
-                if len(window) < 2:
-                    continue
-
-                p5 = (-window['X_DEL_ANG']).mean()
-                q5 = (-window['Z_DEL_ANG']).mean()
-                r5 = ( window['Y_DEL_ANG']).mean()
-
-                dt = (window['timestamp'].iloc[-1] - window['timestamp'].iloc[0]).total_seconds()
-                if dt == 0:
-                    continue
-                    
-                Rd5 = (window['ROLL'].iloc[-1] - window['ROLL'].iloc[0]) / dt
-                Pd5 = (window['PITCH'].iloc[-1] - window['PITCH'].iloc[0]) / dt
-                Yd5 = (window['YAW'].iloc[-1] - window['YAW'].iloc[0]) / dt
-
-                R = window['ROLL'].values
-                P = window['PITCH'].values
-                p = -window['X_DEL_ANG'].values
-                q = -window['Z_DEL_ANG'].values
-                r = window['Y_DEL_ANG'].values
-
-                R_rad = np.deg2rad(R)
-                P_rad = np.deg2rad(P)
-                
-                cos_P = np.cos(P_rad)
-                cos_P = np.where(np.abs(cos_P) < 1e-10, 1e-10 * np.sign(cos_P), cos_P)
-                
-                sin_R = np.sin(R_rad)
-                cos_R = np.cos(R_rad)
-                tan_P = np.tan(P_rad)
-                tan_P = np.clip(tan_P, -100, 100)
-                
-                Rdot = p + (q * sin_R + r * cos_R) * tan_P
-                Pdot = q * cos_R - r * sin_R
-                Ydot = (q * sin_R + r * cos_R) / cos_P
-                
-                Rdot = np.nan_to_num(Rdot, nan=0.0, posinf=0.0, neginf=0.0)
-                Pdot = np.nan_to_num(Pdot, nan=0.0, posinf=0.0, neginf=0.0)
-                Ydot = np.nan_to_num(Ydot, nan=0.0, posinf=0.0, neginf=0.0)
-
-                Rdot5 = Rdot.mean()
-                Pdot5 = Pdot.mean()
-                Ydot5 = Ydot.mean()
-
-                X_feat = pd.DataFrame([[p5, q5, r5, Rd5, Pd5, Yd5, Rdot5, Pdot5, Ydot5]],
-                                      columns=['p5','q5','r5','Rd5','Pd5','Yd5','Rdot5','Pdot5','Ydot5'])
-                
-                if X_feat.isnull().any().any():
-                    print(f"센서 {sn}: 특성 계산 중 NaN 발생, 건너뜀")
-                    continue
-                
-                try:
-                    raw_pred = self.pipeline.predict(X_feat)
-                    pred_vals = raw_pred[0] if hasattr(raw_pred[0], '__len__') else [raw_pred[0]]
-                except Exception as e:
-                    print(f"센서 {sn} 예측 오류: {e}")
-                    continue
-
-                predictions[sn] = pred_vals
-                
-                if len(pred_vals) == 3:
-                    r_pred, p_pred, y_pred = pred_vals
-                    drift_values = {'Roll': abs(r_pred), 'Pitch': abs(p_pred), 'Yaw': abs(y_pred)}
-                    max_drift_axis = max(drift_values, key=drift_values.get)
-                    max_drift_value = max(drift_values.values())
-                    
-                    if max_drift_axis == 'Roll':
-                        max_drift_signed = r_pred
-                    elif max_drift_axis == 'Pitch':
-                        max_drift_signed = p_pred
-                    else:
-                        max_drift_signed = y_pred
-                    
-                    is_faulty = max_drift_value > self.threshold
-                    status = "고장" if is_faulty else "정상"
-                    
-                    self.predictions_data[sn] = {
-                        'roll_drift': float(r_pred),
-                        'pitch_drift': float(p_pred),
-                        'yaw_drift': float(y_pred),
-                        'max_drift_axis': max_drift_axis,
-                        'max_drift_value': float(max_drift_value),
-                        'max_drift_signed': float(max_drift_signed),
-                        'is_faulty': is_faulty,
-                        'status': status
-                    }
-                else:
-                    val = pred_vals[0]
-                    is_faulty = abs(val) > self.threshold
-                    status = "고장" if is_faulty else "정상"
-                    
-                    self.predictions_data[sn] = {
-                        'roll_drift': None,
-                        'pitch_drift': None,
-                        'yaw_drift': None,
-                        'max_drift_axis': 'Unknown',
-                        'max_drift_value': float(abs(val)),
-                        'max_drift_signed': float(val),
-                        'is_faulty': is_faulty,
-                        'status': status
-                    }
-
+            predictions = self.engine.predict()
             self.display_predictions(predictions)
             
             if self.auto_mode:
@@ -1079,8 +809,12 @@ class IMUGUI:
             messagebox.showerror("오류", f"예측 중 오류 발생:\n{e}")
             print(f"예측 오류 상세: {e}")
 
-    def display_predictions(self, predictions):
-        """예측 결과를 그래프에 표시"""
+    def display_predictions(self, predictions, verdicts=None, title="100s DRIFT PREDICTION"):
+        """예측 결과를 그래프에 표시 (verdicts: 센서별 판정 dict, 없으면 엔진의 predictions_data)"""
+        if self.canvas is None:
+            return
+        if verdicts is None:
+            verdicts = self.engine.predictions_data
         for sn, ax in enumerate(self.axes):
             pred = predictions.get(sn)
             
@@ -1106,16 +840,20 @@ class IMUGUI:
                     else:
                         max_drift_signed = y_pred
                     
-                    fail = max_drift_value > self.threshold
+                    # 연속 진단은 히스테리시스가 적용된 판정을 그대로 표시
+                    fail = verdicts.get(sn, {}).get('is_faulty', max_drift_value > self.engine.threshold)
                     status = "⚠️ FAULT" if fail else "✅ NORMAL"
                     color = self.colors['text_primary']
                     bgcolor = self.colors['danger'] if fail else self.colors['success']
                     border_color = '#ff0000' if fail else '#00ff00'
                     
-                    label = f"100s DRIFT PREDICTION\n{max_drift_axis}: {max_drift_signed:.2f}°\n{status}"
+                    label = f"{title}\n{max_drift_axis}: {max_drift_signed:.2f}°\n{status}"
+                    # 측정 창에 연결 끊김이 있던 센서 표시
+                    if verdicts.get(sn, {}).get('gap_seconds'):
+                        label += "\n(연결 끊김 포함)"
                 else:
                     val = pred[0]
-                    fail = abs(val) > self.threshold
+                    fail = verdicts.get(sn, {}).get('is_faulty', abs(val) > self.engine.threshold)
                     status = "⚠️ FAULT" if fail else "✅ NORMAL"
                     color = self.colors['text_primary']
                     bgcolor = self.colors['danger'] if fail else self.colors['success']
@@ -1131,7 +869,21 @@ class IMUGUI:
         self.canvas.draw()
 
 if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="IMU 고장진단 GUI")
+    ap.add_argument("--url", help="WebSocket 주소 (예: 시뮬레이터 ws://127.0.0.1:8081)")
+    ap.add_argument("--replay", help="장비 대신 녹화 파일(.imurec) 재생")
+    ap.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 = 최대 속도)")
+    ap.add_argument("--record", help="수신 프레임을 녹화할 파일 (.imurec)")
+    args = ap.parse_args()
+    
     root = tk.Tk()
     root.state('zoomed')
     app = IMUGUI(root)
+    if args.url:
+        app.engine.ws_url = args.url
+    app.engine.replay_path = args.replay
+    app.engine.replay_speed = args.speed
+    if args.record:
+        app.engine.recorder = FrameRecorder(args.record)
     root.mainloop()
\ No newline at end of file
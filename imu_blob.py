@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+# imu_blob.py
+"""
+원시 IMU 데이터 압축 저장 (imu_raw_blob: 세션 × 센서 × 조각 한 행)
+
+imu_raw_data 는 샘플마다 한 행 (ISO 시각 문자열 + UUID 세션 문자열 포함 150바이트 이상).
+imu_raw_blob 은 센서 하나의 연속 구간을 컬럼 배열로 묶어 한 BLOB 으로 저장:
+- 각도/각속도 6개: float32 비트 패턴 → 이전 샘플과의 차분(uint32) → 바이트 평면 분리(shuffle)
+- timestamp / device_time: 정수 µs → 차분(int64) → 바이트 평면 분리 (NaN 은 INT64_MIN)
+- seq: 정수 → 차분(int64) → 바이트 평면 분리 (없으면 INT64_MIN)
+- 전체를 zlib 로 한 번 압축 (codec 컬럼에 형식 기록)
+float32 로 줄이는 것 외에는 무손실 (timestamp 는 imu_raw_data 와 같은 µs 단위)
+
+- insert_raw_blobs(cursor, session_id, cols): 링 버퍼 columns() → 센서별 한 행씩 INSERT (조각 번호는 이어서 증가)
+- read_session(conn, session_id): 세션 전체를 columns() 형식 NumPy 배열 dict 로 (센서별 조각을 순서대로 이어 붙임)
+- session_counts(conn, session_id): (샘플 수, 센서 수) - BLOB 을 풀지 않고 n_samples 합계
+
+비교 / 변환
+    python imu_blob.py imu_analysis.db --convert SESSION_ID   (imu_raw_data → imu_raw_blob 복사)
+    python imu_blob.py imu_analysis.db --compare SESSION_ID
+"""
+import zlib
+
+import numpy as np
+
+from imu_buffer import FIELDS, from_datetime64
+
+BLOB_CODEC = 'delta-shuffle-zlib/1'
+NAN_INT = np.iinfo(np.int64).min
+
+BLOB_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS imu_raw_blob (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        sensor_id INTEGER NOT NULL,
+        chunk INTEGER NOT NULL,
+        n_samples INTEGER NOT NULL,
+        t_start REAL NOT NULL,
+        t_end REAL NOT NULL,
+        codec TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (session_id, sensor_id, chunk)
+    )
+    ''',
+]
+
+BLOB_INSERT_SQL = '''
+    INSERT INTO imu_raw_blob (session_id, sensor_id, chunk, n_samples, t_start, t_end, codec, data)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _shuffle(arr):
+    """(n,) 배열 → 바이트 평면별로 모은 bytes (상위 바이트가 대부분 0 이라 압축이 잘 됨)"""
+    return np.ascontiguousarray(arr.view(np.uint8).reshape(-1, arr.itemsize).T).tobytes()
+
+
+def _unshuffle(buf, dtype, n):
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(buf, dtype=np.uint8).reshape(itemsize, n)
+    return np.ascontiguousarray(planes.T).view(dtype).reshape(n)
+
+
+def _delta(arr):
+    out = arr.copy()
+    out[1:] = arr[1:] - arr[:-1]    # 정수 오버플로는 wrap-around (복원 시 cumsum 이 되돌림)
+    return out
+
+
+def _to_int(values, scale):
+    """float → 정수 (scale 배 후 반올림), 비유한 값은 NAN_INT"""
+    values = np.asarray(values, dtype=np.float64)
+    ok = np.isfinite(values)
+    out = np.full(values.shape, NAN_INT, dtype=np.int64)
+    out[ok] = np.round(values[ok] * scale).astype(np.int64)
+    return out
+
+
+def _from_int(ints, scale):
+    out = ints.astype(np.float64) / scale
+    out[ints == NAN_INT] = np.nan
+    return out
+
+
+def encode_columns(cols):
+    """
+    센서 하나의 컬럼 dict (timestamp, FIELDS, device_time/seq 선택) → 압축 bytes
+    배열 길이는 모두 같아야 함 (n_samples 는 행에 따로 저장)
+    """
+    n = len(cols['timestamp'])
+    planes = [_shuffle(_delta(_to_int(cols['timestamp'], 1e6)))]
+    for f in FIELDS:
+        bits = np.asarray(cols[f], dtype=np.float32).view(np.uint32)
+        planes.append(_shuffle(_delta(bits)))
+    nan_col = np.full(n, np.nan)
+    planes.append(_shuffle(_delta(_to_int(cols.get('device_time', nan_col), 1e6))))
+    planes.append(_shuffle(_delta(_to_int(cols.get('seq', nan_col), 1))))
+    return zlib.compress(b''.join(planes), 6)
+
+
+def decode_columns(data, n, codec=BLOB_CODEC):
+    """encode_columns 역변환 → timestamp(epoch 초), FIELDS(float64), device_time, seq(float64, 없으면 NaN)"""
+    if codec != BLOB_CODEC:
+        raise ValueError(f"지원하지 않는 BLOB 형식: {codec}")
+    raw = zlib.decompress(data)
+    cols = {}
+    pos = 0
+
+    def take(dtype):
+        nonlocal pos
+        size = np.dtype(dtype).itemsize * n
+        arr = np.cumsum(_unshuffle(raw[pos:pos + size], dtype, n), dtype=dtype)
+        pos += size
+        return arr
+
+    cols['timestamp'] = _from_int(take(np.int64), 1e6)
+    for f in FIELDS:
+        cols[f] = take(np.uint32).view(np.float32).astype(np.float64)
+    cols['device_time'] = _from_int(take(np.int64), 1e6)
+    cols['seq'] = _from_int(take(np.int64), 1)
+    return cols
+
+
+# ----------------- 쓰기 / 읽기 -----------------
+def insert_raw_blobs(cursor, session_id, cols):
+    """
+    columns() 형식 dict → 센서별 imu_raw_blob 한 행 (같은 세션/센서의 다음 조각 번호)
+    timestamp 가 비유한 샘플만 제외 (각도 NaN 은 그대로 보존). 저장한 샘플 수 반환
+    """
+    sn = np.asarray(cols['SN']).astype(np.int64)
+    ts = np.asarray(cols['timestamp'], dtype=np.float64)
+    keep = np.isfinite(ts)
+    total = 0
+    for s in np.unique(sn[keep]):
+        m = keep & (sn == s)
+        part = {name: np.asarray(cols[name])[m] for name in ('timestamp',) + FIELDS + ('device_time', 'seq')
+                if name in cols}
+        order = np.argsort(part['timestamp'], kind='stable')
+        part = {name: v[order] for name, v in part.items()}
+        n = int(m.sum())
+        chunk = cursor.execute("SELECT COALESCE(MAX(chunk) + 1, 0) FROM imu_raw_blob "
+                               "WHERE session_id = ? AND sensor_id = ?", (session_id, int(s))).fetchone()[0]
+        cursor.execute(BLOB_INSERT_SQL, (session_id, int(s), chunk, n, float(part['timestamp'][0]),
+                                         float(part['timestamp'][-1]), BLOB_CODEC, encode_columns(part)))
+        total += n
+    return total
+
+
+def read_session(conn, session_id, sensors=None):
+    """
+    세션 전체 → columns() 형식 dict (SN, timestamp, FIELDS, device_time, seq), 시각순 정렬
+    sensors: 읽을 센서 번호 목록 (None 이면 전부)
+    """
+    sql = "SELECT sensor_id, n_samples, codec, data FROM imu_raw_blob WHERE session_id = ?"
+    params = [session_id]
+    if sensors is not None:
+        sensors = [int(s) for s in sensors]
+        sql += f" AND sensor_id IN ({','.join('?' * len(sensors))})"
+        params += sensors
+    sql += " ORDER BY sensor_id, chunk"
+    parts = []
+    for sensor_id, n, codec, data in conn.execute(sql, params):
+        cols = decode_columns(data, n, codec)
+        cols['SN'] = np.full(n, sensor_id, dtype=np.int64)
+        parts.append(cols)
+    names = ('SN', 'timestamp') + FIELDS + ('device_time', 'seq')
+    if not parts:
+        cols = {name: np.empty(0) for name in names}
+        cols['SN'] = np.empty(0, dtype=np.int64)
+        return cols
+    cols = {name: np.concatenate([p[name] for p in parts]) for name in names}
+    order = np.lexsort((cols['SN'], cols['timestamp']))
+    return {name: v[order] for name, v in cols.items()}
+
+
+def session_counts(conn, session_id):
+    """(샘플 수, 센서 수)"""
+    n, sensors = conn.execute("SELECT COALESCE(SUM(n_samples), 0), COUNT(DISTINCT sensor_id) FROM imu_raw_blob "
+                              "WHERE session_id = ?", (session_id,)).fetchone()
+    return int(n), int(sensors)
+
+
+def blob_sessions(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT session_id FROM imu_raw_blob")]
+
+
+# ----------------- imu_raw_data 호환 -----------------
+def read_rows_session(conn, session_id):
+    """imu_raw_data 의 세션 → read_session 과 같은 형식 (비교/변환용)"""
+    names = ('sensor_id', 'timestamp', 'roll', 'pitch', 'yaw', 'x_del_ang', 'y_del_ang', 'z_del_ang')
+    has_meta = {row[1] for row in conn.execute("PRAGMA table_info(imu_raw_data)")} >= {'device_time', 'seq'}
+    sql = f"SELECT {', '.join(names)}{', device_time, seq' if has_meta else ''} FROM imu_raw_data WHERE session_id = ?"
+    rows = conn.execute(sql, (session_id,)).fetchall()
+    n = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * (len(names) + (2 if has_meta else 0))
+    cols = {'SN': np.array(columns[0], dtype=np.int64),
+            'timestamp': from_datetime64(columns[1]) if n else np.empty(0)}
+    for i, f in enumerate(FIELDS):
+        cols[f] = np.array(columns[2 + i], dtype=np.float64)
+    for i, m in enumerate(('device_time', 'seq')):
+        cols[m] = np.array(columns[8 + i], dtype=np.float64) if has_meta else np.full(n, np.nan)
+    order = np.lexsort((cols['SN'], cols['timestamp']))
+    return {name: v[order] for name, v in cols.items()}
+
+
+def _main():
+    import argparse
+    import sqlite3
+    import time
+
+    from imu_schema import create_analysis_schema
+
+    ap = argparse.ArgumentParser(description="imu_raw_blob 변환 / 비교")
+    ap.add_argument("db")
+    ap.add_argument("--convert", metavar="SESSION_ID", help="imu_raw_data 세션을 imu_raw_blob 으로 복사")
+    ap.add_argument("--compare", metavar="SESSION_ID", help="두 형식의 크기/읽기 시간/값 비교")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        create_analysis_schema(conn)
+        if args.convert:
+            cols = read_rows_session(conn, args.convert)
+            with conn:
+                conn.execute("DELETE FROM imu_raw_blob WHERE session_id = ?", (args.convert,))
+                n = insert_raw_blobs(conn.cursor(), args.convert, cols)
+            print(f"✅ {n:,}개 샘플 변환: {args.convert}")
+        if args.compare:
+            sid = args.compare
+            t0 = time.perf_counter()
+            rows = read_rows_session(conn, sid)
+            t1 = time.perf_counter()
+            blob = read_session(conn, sid)
+            t2 = time.perf_counter()
+            blob_bytes = conn.execute("SELECT COALESCE(SUM(length(data)), 0) FROM imu_raw_blob WHERE session_id = ?",
+                                      (sid,)).fetchone()[0]
+            print(f"샘플: imu_raw_data {len(rows['SN']):,} / imu_raw_blob {len(blob['SN']):,}")
+            print(f"읽기: imu_raw_data {t1 - t0:.3f}초 / imu_raw_blob {t2 - t1:.3f}초")
+            print(f"BLOB 크기: {blob_bytes:,} 바이트 ({blob_bytes / max(len(blob['SN']), 1):.1f} 바이트/샘플)")
+            if len(rows['SN']) == len(blob['SN']):
+                err = max((float(np.nanmax(np.abs(rows[f] - blob[f]))) for f in FIELDS), default=0.0)
+                print(f"최대 오차 (float32): {err:.3g}")
+                ts_err = float(np.max(np.abs(rows['timestamp'] - blob['timestamp']))) if len(blob['SN']) else 0.0
+                print(f"최대 시각 오차: {ts_err * 1e6:.0f} µs{'' if ts_err < 1e-5 else '  ⚠️ 시각 불일치'}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+# imu_buffer.py
+"""
+센서별/필드별 float64 링 버퍼
+
+- 8개 센서 × (timestamp + ROLL/PITCH/YAW/X/Y/Z_DEL_ANG + device_time/seq) 를 미리 할당된 배열에 보관
+  (timestamp = PC 수신 시각, device_time = 장치 micros 기준 초, seq = 프레임 번호. 없으면 NaN)
+- append 는 O(1) (센서당 2회 쓰기), 읽기는 복사 없는 ndarray view
+- 저장 공간을 2배로 잡고 같은 값을 두 위치에 기록(mirror)하므로
+  최신 N개 샘플이 항상 하나의 연속 구간으로 존재함
+"""
+import time
+
+import numpy as np
+
+FIELDS = ('ROLL', 'PITCH', 'YAW', 'X_DEL_ANG', 'Y_DEL_ANG', 'Z_DEL_ANG')
+META = ('device_time', 'seq')
+
+
+OFFSET_STEP = 900   # 서머타임 전환은 UTC 기준 15분 단위 시각에만 일어남
+
+
+def utc_offset(ts):
+    """epoch 초 배열 → 각 시각의 로컬 UTC 오프셋(초) 배열 (서머타임 전환을 걸친 배열도 원소별로)"""
+    ts = np.asarray(ts, dtype=np.float64)
+    offset = np.zeros(ts.shape)
+    finite = np.isfinite(ts)
+    if not finite.any():
+        return offset
+    # 15분 구간마다 localtime 한 번 (세션 하나는 수십 개 구간)
+    steps, inverse = np.unique(np.floor(ts[finite] / OFFSET_STEP), return_inverse=True)
+    table = np.array([time.localtime(s * OFFSET_STEP).tm_gmtoff for s in steps.tolist()], dtype=np.float64)
+    offset[finite] = table[inverse.reshape(-1)]
+    return offset
+
+
+def to_datetime64(ts):
+    """epoch 초(float) 배열 → 로컬 시각 기준 naive datetime64[us] (샘플마다 그 시각의 UTC 오프셋 적용)"""
+    ts = np.asarray(ts, dtype=np.float64)
+    return ((ts + utc_offset(ts)) * 1e6).astype('int64').astype('datetime64[us]')
+
+
+def from_datetime64(dt):
+    """
+    to_datetime64 의 역변환: 로컬 시각 naive datetime64 (또는 ISO 문자열) 배열 → epoch 초(float)
+    오프셋은 원소별로 (로컬 시각을 UTC 로 본 추정 시각의 오프셋 → 그 결과 시각의 오프셋).
+    서머타임 해제로 두 번 나오는 한 시간은 구분할 수 없어 그중 하나로 정함
+    """
+    local = np.asarray(dt, dtype='datetime64[us]').astype(np.int64) / 1e6
+    guess = local - utc_offset(local)
+    return local - utc_offset(guess)
+
+
+class IMURingBuffer:
+    def __init__(self, n_sensors=8, capacity=1250, fields=FIELDS):
+        self.n_sensors = int(n_sensors)
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        # 행 0 = timestamp, 행 1.. = fields, 마지막 = META
+        self._index = {'timestamp': 0}
+        self._index.update({f: i + 1 for i, f in enumerate(self.fields + META)})
+        self._data = np.full((len(self._index), self.n_sensors, 2 * self.capacity), np.nan)
+        self._head = np.zeros(self.n_sensors, dtype=np.int64)    # 다음 쓰기 위치 [0, capacity)
+        self._count = np.zeros(self.n_sensors, dtype=np.int64)   # 보관 중인 샘플 수
+        self._total = np.zeros(self.n_sensors, dtype=np.int64)   # 누적 append 수(단조 증가, clear 후에도 유지)
+        self._base = np.zeros(self.n_sensors, dtype=np.int64)    # 마지막 clear 시점의 _total
+
+    def __len__(self):
+        return int(self._count.sum())
+
+    @property
+    def dropped(self):
+        """용량 초과로 덮어써진 샘플 수 (전체 센서 합)"""
+        return int((self._total - self._base - self._count).sum())
+
+    def clear(self):
+        """샘플 비우기. _total 은 그대로 두어 totals() 커서가 계속 유효함"""
+        self._data.fill(np.nan)
+        self._head.fill(0)
+        self._count.fill(0)
+        self._base[:] = self._total
+
+    def count(self, sn):
+        return int(self._count[sn])
+
+    def totals(self):
+        """센서별 누적 append 수 (columns(since=...) / pending() 용 커서)"""
+        return self._total.copy()
+
+    def pending(self, since):
+        """커서 이후 추가된 샘플 수 (센서별, 이미 덮어써진 것 포함)"""
+        return self._total - np.asarray(since, dtype=np.int64)
+
+    # ----------------- 쓰기 -----------------
+    def append(self, sn, ts, values, device_time=np.nan, seq=np.nan):
+        """센서 하나의 샘플 한 개 추가 (values 는 fields 순서)"""
+        h = self._head[sn]
+        row = (ts,) + tuple(values) + (device_time, seq)
+        self._data[:, sn, h] = row
+        self._data[:, sn, h + self.capacity] = row
+        self._advance(sn)
+
+    def append_block(self, sensor_ids, ts, values, device_time=np.nan, seq=np.nan):
+        """
+        한 프레임(센서 여러 개)을 한 번에 기록
+        - sensor_ids: (k,) 정수, 프레임 안에서 중복 없음
+        - ts, device_time, seq: 스칼라 또는 (k,)
+        - values: (k, len(fields))
+        """
+        ids = np.asarray(sensor_ids, dtype=np.int64)
+        if ids.size == 0:
+            return
+        h = self._head[ids]
+        nf = len(self.fields)
+        block = np.empty((len(self._index), ids.size))
+        block[0] = ts
+        block[1:nf + 1] = np.asarray(values, dtype=np.float64).T
+        block[nf + 1] = device_time
+        block[nf + 2] = seq
+        self._data[:, ids, h] = block
+        self._data[:, ids, h + self.capacity] = block
+        self._advance(ids)
+
+    def append_records(self, records, ts):
+        """JSON 프레임의 sensors 리스트({id, ROLL, ...} dict) 를 기록. 기록한 센서 수 반환"""
+        ids, rows = [], []
+        for rec in records:
+            sn = rec.get('id', rec.get('SN'))
+            if sn is None:
+                continue
+            sn = int(sn)
+            if not 0 <= sn < self.n_sensors:
+                continue
+            ids.append(sn)
+            rows.append([rec.get(f, np.nan) for f in self.fields])
+        if ids:
+            self.append_block(ids, ts, np.array(rows, dtype=np.float64))
+        return len(ids)
+
+    def _advance(self, sn):
+        self._head[sn] = (self._head[sn] + 1) % self.capacity
+        self._count[sn] = np.minimum(self._count[sn] + 1, self.capacity)
+        self._total[sn] += 1
+
+    # ----------------- 읽기 -----------------
+    def _span(self, sn):
+        end = int(self._head[sn]) + self.capacity
+        return end - int(self._count[sn]), end
+
+    def column(self, sn, name):
+        """센서 sn 의 필드 하나(오래된 것 → 최신 순) view. 다음 append 전까지만 유효"""
+        start, end = self._span(sn)
+        return self._data[self._index[name], sn, start:end]
+
+    def sensor(self, sn):
+        """센서 sn 의 전체 필드 view dict ('timestamp' 포함)"""
+        start, end = self._span(sn)
+        block = self._data[:, sn, start:end]
+        return {name: block[i] for name, i in self._index.items()}
+
+    def columns(self, since=None):
+        """
+        전체 센서 샘플을 시간순으로 합친 컬럼 dict (복사본)
+        - 'SN' 과 'timestamp'(epoch 초) 포함
+        - since: totals() 커서. 주면 그 이후 추가되어 아직 남아 있는 샘플만
+        """
+        parts = []
+        for sn in range(self.n_sensors):
+            start, end = self._span(sn)
+            if since is not None:
+                start = max(start, end - int(self._total[sn] - since[sn]))
+            if end > start:
+                parts.append((sn, self._data[:, sn, start:end]))
+        names = list(self._index)
+        if not parts:
+            cols = {name: np.empty(0) for name in names}
+            cols['SN'] = np.empty(0, dtype=np.int64)
+            return cols
+        data = np.concatenate([p[1] for p in parts], axis=1)
+        sn_col = np.concatenate([np.full(p[1].shape[1], p[0], dtype=np.int64) for p in parts])
+        order = np.lexsort((sn_col, data[0]))
+        cols = {name: data[i, order] for name, i in self._index.items()}
+        cols['SN'] = sn_col[order]
+        return cols
+
+    def to_dataframe(self):
+        """기존 data_records 컬럼 + device_time/seq 구성의 DataFrame (엑셀/DB 저장용)"""
+        import pandas as pd
+        cols = self.columns()
+        df = pd.DataFrame({'id': cols['SN']})
+        for f in self.fields:
+            df[f] = cols[f]
+        df['SN'] = cols['SN']
+        df['timestamp'] = pd.to_datetime(to_datetime64(cols['timestamp']))
+        for m in META:
+            df[m] = cols[m]
+        return df
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+# imu_db.py
+"""
+분석용 SQLite(imu_analysis.db) 쓰기 유틸
+
+- DBWriter: 장기 연결(WAL, synchronous=NORMAL)을 소유한 전용 쓰기 스레드 + bounded queue
+  작업 완료/실패는 dispatch(예: root.after) 로 UI 스레드에 전달
+- insert_raw_samples: 링 버퍼 컬럼 배열 → executemany 로 imu_raw_data 일괄 INSERT
+  (행 단위 Python 반복/Series 박싱 없이 tuple 제너레이터를 chunk 단위로 공급)
+- RawSampleStreamer: 수집 중 새 샘플을 N ms / M 행마다 DBWriter 로 흘려보냄
+  (링 버퍼 용량과 무관하게 장시간 측정 전체가 imu_raw_data 또는 imu_raw_blob 에 남음)
+- allocate_imu_codes: 레거시 smartfactory.db 의 imurecord.code 를 imu_code_seq 카운터로 묶음 예약
+  (행마다 MAX(CAST(code)) 전체 스캔 대신 저장 한 번에 카운터 갱신 1회)
+"""
+import queue
+import sqlite3
+import threading
+import time
+from itertools import islice, repeat
+
+import numpy as np
+
+from imu_blob import insert_raw_blobs
+from imu_buffer import FIELDS, to_datetime64
+from imu_metrics import metrics
+from imu_schema import IMU_CODE_SEQ_SCHEMA
+
+
+class DBWriter:
+    """
+    SQLite 전용 쓰기 스레드
+
+    - submit(job, on_done, on_error): job(conn) 을 writer 스레드에서 하나의 트랜잭션으로 실행
+      (정상 종료 시 commit, 예외 시 rollback)
+    - on_done(result) / on_error(exc) 는 dispatch 를 통해 호출 (GUI 에서는 root.after(0, fn))
+    - 대기열이 가득 차면 block=False 호출은 queue.Full 을 발생시킴
+    - 대기 시간(db_queue_wait) / 실행+commit 시간(db_commit) 을 metrics 에 기록
+    """
+    def __init__(self, db_path, dispatch=None, maxsize=64, name="db-writer"):
+        self.db_path = db_path
+        self.dispatch = dispatch or (lambda fn: fn())
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, job, on_done=None, on_error=None, block=False, timeout=None):
+        self._queue.put((job, on_done, on_error, self.dispatch, time.perf_counter()), block=block, timeout=timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """대기 중인 작업이 모두 끝날 때까지 대기 (timeout 초과 시 False)"""
+        done = threading.Event()
+        # 완료 신호는 UI 루프를 거치지 않고 writer 스레드에서 바로 set
+        signal = lambda _: done.set()
+        try:
+            self._queue.put((lambda conn: None, signal, signal, lambda fn: fn(), time.perf_counter()),
+                            timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """남은 작업을 처리한 뒤 연결 종료"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        conn, conn_error = None, None
+        try:
+            conn = self._connect()
+        except Exception as e:
+            conn_error = e
+            print(f"❌ DB 연결 실패({self.db_path}): {e}")
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, on_done, on_error, dispatch, submitted = item
+            started = time.perf_counter()
+            metrics.observe('db_queue_wait', started - submitted)
+            try:
+                if conn is None:
+                    raise conn_error
+                with conn:
+                    result = job(conn)
+                metrics.observe('db_commit', time.perf_counter() - started)
+            except Exception as e:
+                callback = (lambda cb=on_error, e=e: cb(e)) if on_error is not None else None
+                if callback is None:
+                    print(f"DB 작업 오류: {e}")
+            else:
+                callback = (lambda cb=on_done, r=result: cb(r)) if on_done is not None else None
+            if callback is not None:
+                # 콜백 전달 실패(예: 창 종료 후)로 writer 스레드가 죽지 않도록 보호
+                try:
+                    dispatch(callback)
+                except Exception as e:
+                    print(f"DB 작업 결과 전달 실패: {e}")
+
+        if conn is not None:
+            # 종료 시 통계 갱신이 필요한 인덱스만 분석 (SQLite 권장: 연결 닫기 전 PRAGMA optimize)
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            conn.close()
+
+
+RAW_INSERT_SQL = '''
+    INSERT INTO imu_raw_data
+    (session_id, sensor_id, timestamp, roll, pitch, yaw, x_del_ang, y_del_ang, z_del_ang,
+     device_time, seq)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+RAW_INSERT_CHUNK = 5000
+
+
+def iter_raw_rows(session_id, cols):
+    """
+    columns() 형태의 dict → imu_raw_data 행 tuple 제너레이터
+    NaN 이 섞인 샘플(NOT NULL 위반)은 제외. device_time/seq 는 없으면 NULL
+    """
+    values = np.vstack([np.asarray(cols[f], dtype=np.float64) for f in FIELDS])
+    mask = np.all(np.isfinite(values), axis=0)
+    ts = np.asarray(cols['timestamp'], dtype=np.float64)
+    mask &= np.isfinite(ts)
+    ts_iso = np.datetime_as_string(to_datetime64(ts[mask]), unit='us')
+    values = values[:, mask]
+    n = int(mask.sum())
+    meta = []
+    for name, cast in (('device_time', float), ('seq', int)):
+        col = np.asarray(cols[name], dtype=np.float64)[mask] if name in cols else np.full(n, np.nan)
+        meta.append([cast(v) if v == v else None for v in col.tolist()])
+    return zip(repeat(session_id),
+               np.asarray(cols['SN'])[mask].astype(int).tolist(),
+               ts_iso.tolist(),
+               *(row.tolist() for row in values),
+               *meta)
+
+
+def insert_raw_samples(cursor, session_id, cols, chunk_size=RAW_INSERT_CHUNK):
+    """imu_raw_data 에 chunk_size 행씩 executemany. 저장한 행 수 반환 (트랜잭션은 호출 측 관리)"""
+    rows = iter_raw_rows(session_id, cols)
+    total = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        cursor.executemany(RAW_INSERT_SQL, chunk)
+        total += len(chunk)
+    return total
+
+
+class RawSampleStreamer:
+    """
+    링 버퍼 → imu_raw_data 연속 저장
+
+    - 센서별 커서(buffer.totals()) 이후 샘플만 읽어 한 트랜잭션으로 INSERT
+    - flush_ms 경과 또는 flush_rows 이상 쌓이면 maybe_flush() 가 기록 작업을 제출
+    - writer 대기열이 가득 차면 커서를 유지하고 다음 호출에서 재시도 (stop 의 마지막 플러시는 막힘 대기)
+    - 플러시 전에 링 버퍼에서 덮어써진 샘플 수는 lost 로 집계
+    - fmt: 'rows' = imu_raw_data 행 단위, 'blob' = imu_raw_blob 압축 조각 (플러시마다 센서별 한 행)
+    """
+    def __init__(self, writer, buffer, buffer_lock, flush_ms=500, flush_rows=2000,
+                 chunk_size=RAW_INSERT_CHUNK, force_timeout=10.0):
+        self.writer = writer
+        self.buffer = buffer
+        self.buffer_lock = buffer_lock
+        self.flush_ms = flush_ms
+        self.flush_rows = flush_rows
+        self.chunk_size = chunk_size
+        self.force_timeout = force_timeout
+        self.session_id = None      # 마지막으로 스트리밍한 세션 (stop 후에도 유지)
+        self.fmt = 'rows'
+        self.active = False
+        self.rows_written = 0       # writer 스레드에서 갱신
+        self.lost = 0
+        self._cursors = None
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, session_id, fmt='rows'):
+        self.stop()
+        with self._lock, self.buffer_lock:
+            self._cursors = self.buffer.totals()
+        self.session_id = session_id
+        self.fmt = fmt
+        self.rows_written = 0
+        self.lost = 0
+        self._last_flush = time.monotonic()
+        self.active = True
+
+    def stop(self):
+        """남은 샘플을 기록하고 중지 (대기열이 가득 차 있으면 자리가 날 때까지 기다림)"""
+        if self.active:
+            self.maybe_flush(force=True)
+            self.active = False
+
+    def covers(self, session_id):
+        return session_id is not None and session_id == self.session_id
+
+    def maybe_flush(self, force=False):
+        """
+        조건을 만족하면 새 샘플 기록 작업 제출. 제출한 행 수 반환
+        force=True 이면 writer 대기열에 자리가 날 때까지 최대 force_timeout 초 기다림 (그래도 가득 차면 유실로 집계)
+        """
+        if not self.active:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            with self.buffer_lock:
+                pending = int(self.buffer.pending(self._cursors).sum())
+                if pending == 0:
+                    return 0
+                if not force and pending < self.flush_rows and (now - self._last_flush) * 1000 < self.flush_ms:
+                    return 0
+                cols = self.buffer.columns(since=self._cursors)
+                cursors = self.buffer.totals()
+
+            session_id, chunk_size, fmt = self.session_id, self.chunk_size, self.fmt
+            def job(conn):
+                if fmt == 'blob':
+                    n = insert_raw_blobs(conn.cursor(), session_id, cols)
+                else:
+                    n = insert_raw_samples(conn.cursor(), session_id, cols, chunk_size=chunk_size)
+                self.rows_written += n
+                return n
+            try:
+                self.writer.submit(job, on_error=lambda e: print(f"원시 데이터 스트리밍 저장 오류: {e}"),
+                                   block=force, timeout=self.force_timeout if force else None)
+            except queue.Full:
+                if force:
+                    self.lost += pending
+                    self._cursors = cursors
+                    print(f"⚠️ DB 쓰기 대기열이 가득 차 마지막 {pending}개 샘플 저장 실패 (누적 유실 {self.lost})")
+                return 0
+
+            rows = len(cols['SN'])
+            if pending > rows:
+                self.lost += pending - rows
+                print(f"⚠️ 스트리밍 저장 지연으로 {pending - rows}개 샘플 유실 (누적 {self.lost})")
+            self._cursors = cursors
+            self._last_flush = now
+            return rows
+
+
+# ----------------- 레거시 smartfactory.db: imurecord.code 채번 -----------------
+def format_imu_code(n):
+    """imurecord.code 형식 (1000 미만은 3자리 0 채움: 001, 042, 1234)"""
+    width = 3 if n < 1000 else len(str(n))
+    return str(n).zfill(width)
+
+
+def _max_imu_code(conn):
+    # CAST 때문에 code UNIQUE 인덱스를 못 씀 → 전체 스캔 (카운터 초기화/재동기화 때만)
+    cur = conn.execute("SELECT COALESCE(MAX(CAST(code AS INTEGER)), 0) FROM imurecord WHERE code GLOB '[0-9]*'")
+    return int(cur.fetchone()[0] or 0)
+
+
+def _imu_codes_in_use(conn, start, end):
+    """[start, end] 구간에 이미 있는 코드가 있는지 (자릿수가 같은 구간마다 UNIQUE 인덱스 범위 조회 1회)"""
+    while start <= end:
+        width = len(format_imu_code(start))
+        seg_end = min(end, 10 ** width - 1)
+        # 0 채움 고정 폭이라 같은 길이 안에서는 문자열 순서 = 숫자 순서
+        if conn.execute("SELECT 1 FROM imurecord WHERE code BETWEEN ? AND ? AND length(code) = ? LIMIT 1",
+                        (format_imu_code(start), format_imu_code(seg_end), width)).fetchone() is not None:
+            return True
+        start = seg_end + 1
+    return False
+
+
+def allocate_imu_codes(conn, count, attempts=3):
+    """
+    imurecord.code count 개를 한 번에 예약 → 코드 문자열 목록
+    - imu_code_seq 카운터를 UPDATE 로 먼저 올려 쓰기 잠금을 잡은 뒤 읽음 (다른 프로세스와 겹치지 않음)
+    - 카운터가 없으면 기존 MAX(code) 로 한 번만 초기화
+    - 예약 구간 전체를 범위 조회로 확인, 카운터를 거치지 않고 들어온 코드(다른 프로그램)와 겹치면
+      MAX 로 재동기화 후 다시 예약. attempts 번 안에 빈 구간을 못 얻으면 sqlite3.IntegrityError
+    - 호출 측 트랜잭션 안에서 실행 → 롤백되면 예약도 취소. 삽입 실패한 행의 코드는 빈 번호로 남음
+    """
+    if count <= 0:
+        return []
+    conn.execute(IMU_CODE_SEQ_SCHEMA)
+    for _ in range(attempts):
+        cur = conn.execute("UPDATE imu_code_seq SET value = value + ? WHERE name = 'imurecord'", (count,))
+        if cur.rowcount == 0:
+            conn.execute("INSERT INTO imu_code_seq (name, value) VALUES ('imurecord', ?)",
+                         (_max_imu_code(conn) + count,))
+        end = conn.execute("SELECT value FROM imu_code_seq WHERE name = 'imurecord'").fetchone()[0]
+        if not _imu_codes_in_use(conn, end - count + 1, end):
+            return [format_imu_code(n) for n in range(end - count + 1, end + 1)]
+        conn.execute("UPDATE imu_code_seq SET value = ? WHERE name = 'imurecord'", (_max_imu_code(conn),))
+    raise sqlite3.IntegrityError(f"imurecord.code 예약 실패: {attempts}회 재동기화 후에도 코드 {count}개 구간이 겹침")
@@ -0,0 +1,822 @@
+# -*- coding: utf-8 -*-
+
+# imu_engine.py
+"""
+IMU 수집·진단 엔진 (Tkinter / matplotlib 없이 동작)
+
+- WebSocket(또는 녹화 재생) 수신 → 링 버퍼, 측정 세션, 특성 추출 + 일괄 추론, imu_analysis.db 저장
+- GUI(IMU고장진단_GUI__claude.py)는 이 엔진 위의 화면 클라이언트
+- 화면이 없는 라인 서버에서는 CLI 로 자동 측정 주기(연결 → 5초 수집 → 분석 → 저장)를 반복
+- 모델은 ModelManager 로 백그라운드 로드 + 워밍업 후 교체 (수신 중에도 교체 가능), 진단 결과에 모델 버전 기록
+- 연속 진단(start_rolling): 센서별 최근 4초 창 특성을 새 샘플만으로 갱신해 ROLLING_INTERVAL 마다 재예측,
+  고장 판정은 히스테리시스 적용 (번인 시험용 실시간 판정)
+- 연결이 끊기면 지수 backoff + jitter 로 자동 재연결 (버퍼 유지), 끊긴 구간은 link.gaps 에 기록되어
+  예측 시 특성 창과 겹치는 센서를 표시(GAP_POLICY='flag') 하거나 제외('exclude')
+
+사용 예)
+    python imu_engine.py --model model.pkl --url ws://10.200.246.81:81
+    python imu_engine.py --model model.pkl --url ws://127.0.0.1:8081 --cycles 0 --interval 60 --station LINE1-ST3 --keep-connected
+    python imu_engine.py --model model.pkl --replay capture.imurec --speed 0
+    python imu_engine.py --model model.pkl --url ws://127.0.0.1:8081 --rolling --duration 3600
+"""
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from imu_blob import insert_raw_blobs, session_counts
+from imu_buffer import IMURingBuffer
+from imu_db import DBWriter, RawSampleStreamer, insert_raw_samples
+from imu_features import FEATURE_COLUMNS, extract_features, window_gaps
+from imu_metrics import metrics
+from imu_model import ModelManager
+from imu_rolling import FaultHysteresis, RollingFeatures
+from imu_protocol import LinkTracker, parse_message
+from imu_replay import FrameRecorder, ReplaySource
+from imu_schema import create_analysis_schema
+from imu_ws import Backoff
+
+# 모델 버전을 알 수 없을 때 diagnosis_results.model_version 에 기록하는 값
+MODEL_VERSION = "v1.0"
+
+
+def summarize_prediction(pred_vals, threshold):
+    """센서 하나의 예측값(3축 또는 단일값) → diagnosis_results 저장용 dict"""
+    if len(pred_vals) == 3:
+        r_pred, p_pred, y_pred = pred_vals
+        drift_values = {'Roll': abs(r_pred), 'Pitch': abs(p_pred), 'Yaw': abs(y_pred)}
+        max_drift_axis = max(drift_values, key=drift_values.get)
+        max_drift_value = max(drift_values.values())
+        max_drift_signed = {'Roll': r_pred, 'Pitch': p_pred, 'Yaw': y_pred}[max_drift_axis]
+        is_faulty = bool(max_drift_value > threshold)
+        return {
+            'roll_drift': float(r_pred),
+            'pitch_drift': float(p_pred),
+            'yaw_drift': float(y_pred),
+            'max_drift_axis': max_drift_axis,
+            'max_drift_value': float(max_drift_value),
+            'max_drift_signed': float(max_drift_signed),
+            'is_faulty': is_faulty,
+            'status': "고장" if is_faulty else "정상"
+        }
+    val = pred_vals[0]
+    is_faulty = bool(abs(val) > threshold)
+    return {
+        'roll_drift': None,
+        'pitch_drift': None,
+        'yaw_drift': None,
+        'max_drift_axis': 'Unknown',
+        'max_drift_value': float(abs(val)),
+        'max_drift_signed': float(val),
+        'is_faulty': is_faulty,
+        'status': "고장" if is_faulty else "정상"
+    }
+
+
+class IMUEngine:
+    """
+    수집·진단 엔진
+
+    - on_event(event, info): 'connected' / 'disconnected' / 'error' / 'reconnecting' 알림 (수신 스레드에서 호출),
+      연속 진단 중에는 'verdict' ({센서: 판정 dict}, 연속 진단 스레드에서 호출)
+    - dispatch: DB 작업 / 모델 로드 완료 콜백 전달 방식 (GUI 는 root.after, 헤드리스는 작업 스레드에서 바로 호출)
+    - run_cycle(): 자동 측정 한 주기를 블록 방식으로 실행 (헤드리스용)
+    """
+    def __init__(self, ws_url="ws://10.200.246.81:81", db_path="imu_analysis.db", threshold=3.3,
+                 n_sensors=8, max_records=10000, dispatch=None, on_event=None, model_state_path=None):
+        self.ws_url = ws_url
+        self.db_path = db_path
+        self.threshold = threshold
+        self.n_sensors = n_sensors
+        self.on_event = on_event
+
+        # 예측 모델 (models.current 를 교체하는 방식이라 수신/예측 중에도 새 모델로 바꿀 수 있음)
+        self.models = ModelManager(state_path=model_state_path, dispatch=dispatch)
+        self.streaming = False
+        self.ws_connected = False
+        self.connection_timeout = 5
+        self.session_id = None
+        self.collection_start_time = None
+        self.predictions_data = {}
+
+        # 세션 정보 (measurement_sessions)
+        self.operator_name = "운영자"
+        self.facility_location = "시설위치"
+        self.equipment_id = "IMU-001"
+
+        # 스레드 안전성을 위한 Lock
+        self.data_lock = threading.Lock()
+
+        # 최대 레코드 수 제한 (센서 합계, 센서별 링 버퍼로 보관)
+        self.MAX_RECORDS = max_records
+        self.buffer = IMURingBuffer(n_sensors=n_sensors, capacity=max_records // n_sensors)
+        # 프레임 번호/장치 시각 추적 (패킷 손실률 측정)
+        self.link = LinkTracker(n_sensors=n_sensors)
+
+        # 수신원: 장비 WebSocket 또는 녹화 파일 재생 (replay_path), 수신 프레임 녹화 (recorder)
+        self.replay_path = None
+        self.replay_speed = 1.0
+        self.recorder = None
+        self.ws = None
+        self.wst = None
+        self.ingest_enabled = True
+        self._stop_event = threading.Event()
+
+        # 연결 끊김 시 자동 재연결 (RECONNECT_MIN 초부터 2배씩, 최대 RECONNECT_MAX 초, jitter 50%)
+        self.AUTO_RECONNECT = True
+        self.RECONNECT_MIN = 0.5
+        self.RECONNECT_MAX = 10.0
+        self.reconnects = 0
+        # 응답 없는 연결(Wi-Fi 단절 등) 감지용 ping 주기/대기 (초)
+        self.PING_INTERVAL = 5
+        self.PING_TIMEOUT = 3
+        # 특성 창이 끊긴 구간과 겹친 센서: 'flag' = 예측하고 notes 에 기록, 'exclude' = 진단에서 제외
+        self.GAP_POLICY = 'flag'
+
+        # 연속 진단: 재예측 주기(초), 고장 해제 히스테리시스(°), 상태 변경에 필요한 연속 판정 수,
+        # 창이 이 비율 이상 채워진 센서만 판정
+        self.ROLLING_INTERVAL = 1.0
+        self.ROLLING_HYSTERESIS = 0.3
+        self.ROLLING_CONFIRM = 2
+        self.ROLLING_MIN_COVERAGE = 0.9
+        self.rolling_features = RollingFeatures(n_sensors=n_sensors)
+        self.fault_hysteresis = FaultHysteresis(threshold, self.ROLLING_HYSTERESIS, self.ROLLING_CONFIRM)
+        self.live_verdicts = {}
+        # rolling_step 과 reset_rolling(GUI 스레드) 이 창/히스테리시스 상태를 동시에 건드리지 않도록
+        self._rolling_lock = threading.Lock()
+        self._rolling_stop = None
+        self._rolling_thread = None
+
+        # 원시 데이터 일괄 INSERT 시 executemany 한 번에 넘길 행 수
+        self.DB_CHUNK_SIZE = 5000
+        # DB 쓰기 작업 대기열 최대 길이 (가득 차면 새 작업은 거절)
+        self.DB_QUEUE_SIZE = 32
+
+        # 수집 중 원시 데이터 연속 저장 (STREAM_FLUSH_MS 경과 또는 STREAM_FLUSH_ROWS 행마다)
+        self.STREAM_TO_DB = True
+        self.STREAM_FLUSH_MS = 500
+        self.STREAM_FLUSH_ROWS = 2000
+        # 원시 데이터 저장 형식: 'rows' = imu_raw_data (샘플당 한 행), 'blob' = imu_raw_blob (센서별 압축 조각)
+        # blob 은 조각이 클수록 압축률이 높으므로 연속 저장 주기를 BLOB_FLUSH_MS 로 늘림
+        self.RAW_STORAGE = 'rows'
+        self.BLOB_FLUSH_MS = 5000
+
+        self.db_writer = DBWriter(self.db_path, dispatch=dispatch, maxsize=self.DB_QUEUE_SIZE)
+        self.stream_writer = RawSampleStreamer(self.db_writer, self.buffer, self.data_lock,
+                                               flush_ms=self.STREAM_FLUSH_MS,
+                                               flush_rows=self.STREAM_FLUSH_ROWS,
+                                               chunk_size=self.DB_CHUNK_SIZE)
+
+        # 조회 시점에 읽는 성능 지표 (imu_metrics)
+        metrics.gauge('buffer_overwritten', lambda: self.buffer.dropped)
+        metrics.gauge('frames_lost', lambda: self.link.dropped)
+        metrics.gauge('db_queue', self.db_writer.pending)
+        metrics.gauge('stream_lost', lambda: self.stream_writer.lost)
+
+    # ----------------- 공통 -----------------
+    def _emit(self, event, info=None):
+        if self.on_event is not None:
+            try:
+                self.on_event(event, info)
+            except Exception as e:
+                print(f"이벤트 처리 오류({event}): {e}")
+
+    def init_database(self, on_done=None, on_error=None):
+        return self.submit_db_job(create_analysis_schema, on_done, on_error)
+
+    def submit_db_job(self, job, on_done=None, on_error=None, block=False):
+        """DB 쓰기 작업을 writer 스레드에 넘김. 대기열이 가득 차면 False"""
+        try:
+            self.db_writer.submit(job, on_done, on_error, block=block)
+            return True
+        except queue.Full:
+            print("⚠️ DB 쓰기 대기열 초과 - 작업을 건너뜀")
+            return False
+
+    def close(self):
+        """수신 중지 후 남은 DB 작업을 마무리"""
+        self.stop_rolling()
+        self.stop_stream()
+        self.stream_writer.stop()
+        self.db_writer.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    @property
+    def pipeline(self):
+        return self.models.pipeline
+
+    @property
+    def model_version(self):
+        return self.models.version
+
+    def load_model(self, path):
+        """모델 로드 + 워밍업 후 교체 (현재 스레드에서 블록)"""
+        self.models.load(path)
+        return self.pipeline
+
+    def load_model_async(self, path, on_done=None, on_error=None):
+        """백그라운드 로드 + 워밍업 후 교체. on_done(LoadedModel) / on_error(예외) 는 dispatch 로 전달"""
+        return self.models.load_async(path, on_done, on_error)
+
+    def sample_count(self):
+        with self.data_lock:
+            return len(self.buffer)
+
+    def clear(self):
+        """버퍼 초기화 (아직 기록되지 않은 샘플은 비우기 전에 저장)"""
+        self.stream_writer.maybe_flush(force=True)
+        with self.data_lock:
+            self.buffer.clear()
+            self.link.reset()
+        self.predictions_data = {}
+        self.reset_rolling()
+
+    # ----------------- 측정 세션 -----------------
+    def begin_session(self, session_type="자동", clear=True, on_done=None):
+        """새 측정 세션 시작 (세션 정보 저장 + 연속 저장 시작)"""
+        self.stream_writer.stop()
+        if clear:
+            with self.data_lock:
+                self.buffer.clear()
+                self.link.reset()
+            self.predictions_data = {}
+            self.reset_rolling()
+        self.collection_start_time = datetime.now()
+        self.session_id = str(uuid.uuid4())
+        self.save_session_info(session_type, on_done=on_done)
+        if self.STREAM_TO_DB:
+            self.stream_writer.flush_ms = self.BLOB_FLUSH_MS if self.RAW_STORAGE == 'blob' else self.STREAM_FLUSH_MS
+            self.stream_writer.start(self.session_id, fmt=self.RAW_STORAGE)
+        return self.session_id
+
+    def save_session_info(self, session_type="자동", on_done=None):
+        """측정 세션 정보를 데이터베이스에 저장"""
+        params = (
+            self.session_id,
+            self.collection_start_time.isoformat(),
+            session_type,
+            self.operator_name,
+            self.facility_location,
+            self.equipment_id
+        )
+
+        def job(conn):
+            conn.execute('''
+                INSERT INTO measurement_sessions
+                (session_id, start_time, session_type, operator_name, facility_location, equipment_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', params)
+
+        return self.submit_db_job(job, on_done=on_done,
+                                  on_error=lambda e: print(f"세션 정보 저장 오류: {e}"))
+
+    # ----------------- 수신 -----------------
+    def on_message(self, ws, message):
+        if not self.ingest_enabled:
+            return
+        try:
+            # 재생 중에는 녹화 당시 수신 간격을 유지한 시각 사용
+            ts = getattr(ws, 'recv_time', None) or time.time()
+            if self.recorder is not None:
+                self.recorder.write(message, ts)
+            # JSON/바이너리 공통 Frame → 프레임 번호(손실 집계)·장치 시각과 함께 링 버퍼에 기록
+            t0 = time.perf_counter()
+            frame = parse_message(message)
+            t1 = time.perf_counter()
+            with metrics.locked(self.data_lock):
+                t2 = time.perf_counter()
+                prev_rx = self.link.last_rx
+                samples = self.link.ingest(self.buffer, frame, ts)
+            metrics.observe('parse', t1 - t0)
+            metrics.observe('append', time.perf_counter() - t2)
+            if prev_rx is not None:
+                metrics.observe('frame_interval', ts - prev_rx)
+            metrics.count('frames')
+            metrics.count('samples', samples)
+
+            self.stream_writer.maybe_flush()
+        except Exception as e:
+            print("메시지 파싱 오류:", e)
+
+    def on_error(self, ws, error):
+        print("WebSocket 오류:", error)
+        self.ws_connected = False
+        self._emit('error', error)
+
+    def on_close(self, ws, close_status, close_msg):
+        print("WebSocket 연결 종료")
+        self.ws_connected = False
+        if self.streaming:
+            with self.data_lock:
+                self.link.disconnected(time.time())
+        self._emit('disconnected', self.streaming)
+
+    def on_open(self, ws):
+        print("WebSocket 연결 성공")
+        self.ws_connected = True
+        self._emit('connected')
+
+    def start_stream(self):
+        """수신 스레드 시작 (이미 수신 중이면 False)"""
+        if self.streaming:
+            return False
+
+        self.ws_connected = False
+        self.ingest_enabled = True
+        # 수신 스레드마다 별도 중지 신호 (이전 스레드가 늦게 끝나도 새 수신 상태를 건드리지 않음)
+        self._stop_event = threading.Event()
+        self.streaming = True
+        self.wst = threading.Thread(target=self._run_supervised, args=(self._stop_event,), daemon=True)
+        self.wst.start()
+        return True
+
+    def _connect_source(self):
+        if self.replay_path:
+            return ReplaySource(self.replay_path, on_open=self.on_open, on_message=self.on_message,
+                                on_error=self.on_error, on_close=self.on_close,
+                                speed=self.replay_speed)
+        import websocket
+        return websocket.WebSocketApp(self.ws_url, on_open=self.on_open, on_message=self.on_message,
+                                      on_error=self.on_error, on_close=self.on_close)
+
+    def _run_supervised(self, stop_event):
+        """연결이 끊기면 stop_stream 전까지 backoff 후 재연결 (재생 파일은 한 번만 재생)"""
+        backoff = Backoff(self.RECONNECT_MIN, self.RECONNECT_MAX)
+        while not stop_event.is_set():
+            ws = self._connect_source()
+            self.ws = ws
+            if stop_event.is_set():
+                break
+            started = time.monotonic()
+            ws.run_forever(ping_interval=self.PING_INTERVAL, ping_timeout=self.PING_TIMEOUT)
+            if stop_event.is_set() or not self.AUTO_RECONNECT or self.replay_path:
+                break
+            # 한동안 유지된 연결이 끊긴 경우는 짧은 지연부터 다시 시작
+            if time.monotonic() - started > self.RECONNECT_MAX:
+                backoff.reset()
+            delay = backoff.next()
+            self.reconnects += 1
+            print(f"🔄 {delay:.1f}초 후 재연결 ({backoff.attempt}회째)")
+            self._emit('reconnecting', {'attempt': backoff.attempt, 'delay': delay})
+            if stop_event.wait(delay):
+                break
+
+    def stop_stream(self):
+        """수신 중지 + 남은 원시 데이터 기록 (수신 중이 아니었으면 False)"""
+        if not self.streaming:
+            return False
+        self.streaming = False
+        self.ws_connected = False
+        self._stop_event.set()
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        self.stream_writer.stop()
+        return True
+
+    def wait_connected(self, timeout=None):
+        """연결될 때까지 대기 (헤드리스용). 연결 실패/시간 초과 시 False"""
+        deadline = time.monotonic() + (self.connection_timeout if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            if self.ws_connected:
+                return True
+            if self.wst is None or not self.wst.is_alive():
+                return False
+            time.sleep(0.05)
+        return self.ws_connected
+
+    # ----------------- 분석 -----------------
+    def predict_batch(self, X_feat, sensor_ids, pipeline=None):
+        """
+        (센서 수 × 9) 특성 행렬을 한 번에 추론하고 {센서: 예측값} 으로 돌려줌
+        배치 호출이 실패하면 문제 센서만 건너뛰도록 행 단위로 재시도
+        """
+        if len(X_feat) == 0:
+            return {}
+        if pipeline is None:
+            pipeline = self.pipeline
+        try:
+            with metrics.timer('predict'):
+                raw_pred = pipeline.predict(X_feat)
+            return dict(zip(sensor_ids, raw_pred))
+        except Exception as e:
+            print(f"일괄 예측 오류, 센서별로 재시도: {e}")
+
+        results = {}
+        for i, sn in enumerate(sensor_ids):
+            try:
+                row = X_feat.iloc[[i]] if hasattr(X_feat, 'iloc') else X_feat[[i]]
+                results[sn] = pipeline.predict(row)[0]
+            except Exception as e:
+                print(f"센서 {sn} 예측 오류: {e}")
+        return results
+
+    def predict(self):
+        """
+        버퍼 전체로 센서별 예측. {센서: 예측값 배열} 반환, predictions_data 갱신
+        모델이 없으면 RuntimeError, 데이터가 없으면 ValueError
+        """
+        # 예측 도중 모델이 교체되어도 예측값과 버전이 같은 모델에서 나오도록 한 번만 읽음
+        model = self.models.current
+        if model is None:
+            raise RuntimeError("AI 모델이 로드되지 않았습니다")
+        with self.data_lock:
+            if not len(self.buffer):
+                raise ValueError("예측할 데이터가 없습니다")
+            cols = self.buffer.columns()
+
+        import pandas as pd
+
+        # 전체 센서 특성을 한 번에 계산 → 한 번의 pipeline.predict 로 추론
+        with metrics.timer('features'):
+            feature_sns, feature_rows = extract_features(cols)
+        X_feat = pd.DataFrame(feature_rows, columns=FEATURE_COLUMNS)
+        raw_preds = self.predict_batch(X_feat, feature_sns.tolist(), model.pipeline)
+
+        # 특성 창과 겹치는 연결 끊김 구간 (센서별 초)
+        with self.data_lock:
+            gaps = self.link.gap_intervals(time.time())
+        gap_sns, overlap = window_gaps(cols, gaps)
+        gap_seconds = {sn: sec for sn, sec in zip(gap_sns.tolist(), overlap.tolist()) if sec > 0}
+
+        predictions = {}
+        self.predictions_data = {}
+        for sn, raw_pred in raw_preds.items():
+            if sn in gap_seconds and self.GAP_POLICY == 'exclude':
+                print(f"⚠️ 센서 {sn}: 측정 창에 연결 끊김 {gap_seconds[sn]:.1f}초 포함 - 진단 제외")
+                continue
+            pred_vals = raw_pred if hasattr(raw_pred, '__len__') else [raw_pred]
+            predictions[sn] = pred_vals
+            self.predictions_data[sn] = summarize_prediction(pred_vals, self.threshold)
+            self.predictions_data[sn]['model_version'] = model.version
+            if sn in gap_seconds:
+                self.predictions_data[sn]['gap_seconds'] = gap_seconds[sn]
+                self.predictions_data[sn]['notes'] = f"측정 창에 연결 끊김 {gap_seconds[sn]:.1f}초 포함"
+        return predictions
+
+    # ----------------- 연속 진단 -----------------
+    def start_rolling(self, interval=None):
+        """연속 진단 스레드 시작 (수신은 start_stream 으로 별도 시작). 이미 실행 중이면 False"""
+        if self._rolling_thread is not None and self._rolling_thread.is_alive():
+            return False
+        interval = self.ROLLING_INTERVAL if interval is None else interval
+        self.fault_hysteresis.threshold = self.threshold
+        self.fault_hysteresis.hysteresis = self.ROLLING_HYSTERESIS
+        self.fault_hysteresis.confirm = max(1, int(self.ROLLING_CONFIRM))
+        stop_event = threading.Event()
+        self._rolling_stop = stop_event
+
+        def run():
+            next_at = time.monotonic()
+            while not stop_event.is_set():
+                try:
+                    verdicts = self.rolling_step()
+                except Exception as e:
+                    print(f"연속 진단 오류: {e}")
+                else:
+                    if verdicts:
+                        self._emit('verdict', verdicts)
+                # 예측 시간과 관계없이 일정한 주기 유지 (밀리면 건너뜀)
+                next_at = max(next_at + interval, time.monotonic())
+                stop_event.wait(next_at - time.monotonic())
+
+        self._rolling_thread = threading.Thread(target=run, name="imu-rolling", daemon=True)
+        self._rolling_thread.start()
+        return True
+
+    def stop_rolling(self):
+        if self._rolling_stop is None:
+            return False
+        self._rolling_stop.set()
+        self._rolling_stop = None
+        return True
+
+    def reset_rolling(self):
+        """창/히스테리시스 초기화 (진행 중인 rolling_step 이 끝난 뒤 적용)"""
+        with self._rolling_lock:
+            self.rolling_features.reset()
+            self.fault_hysteresis.reset()
+            self.live_verdicts = {}
+
+    def rolling_step(self):
+        """
+        새 샘플만 창 특성에 반영 → 창이 채워진 센서 재예측 → 히스테리시스 판정
+        {센서: 판정 dict (summarize_prediction + raw_faulty/coverage/model_version)} 반환, live_verdicts 갱신
+        """
+        with self._rolling_lock:
+            return self._rolling_step()
+
+    def _rolling_step(self):
+        with metrics.timer('rolling_features'):
+            self.rolling_features.update(self.buffer, self.data_lock)
+        model = self.models.current
+        if model is None:
+            return {}
+        sensor_ids, X, coverage = self.rolling_features.features()
+        ready = coverage >= self.ROLLING_MIN_COVERAGE
+        if not ready.any():
+            return {}
+        sensor_ids, X, coverage = sensor_ids[ready], X[ready], coverage[ready]
+        raw_preds = self.predict_batch(self._model_input(model.pipeline, X), sensor_ids.tolist(), model.pipeline)
+
+        # 최근 창(수신 시각 기준)과 겹치는 연결 끊김
+        now = time.time()
+        with self.data_lock:
+            gaps = self.link.gap_intervals(now)
+        lo = now - self.rolling_features.length
+        gap = sum(max(0.0, min(now, end) - max(lo, start)) for start, end in gaps)
+
+        verdicts = {}
+        for sn, cover in zip(sensor_ids.tolist(), coverage.tolist()):
+            if sn not in raw_preds:
+                continue
+            raw_pred = raw_preds[sn]
+            pred_vals = raw_pred if hasattr(raw_pred, '__len__') else [raw_pred]
+            info = summarize_prediction(pred_vals, self.threshold)
+            info['raw_faulty'] = info['is_faulty']
+            info['is_faulty'] = self.fault_hysteresis.update(sn, info['max_drift_value'])
+            info['status'] = "고장" if info['is_faulty'] else "정상"
+            info['prediction'] = pred_vals
+            info['coverage'] = cover
+            info['model_version'] = model.version
+            if gap > 0:
+                info['gap_seconds'] = gap
+                info['notes'] = f"측정 창에 연결 끊김 {gap:.1f}초 포함"
+            verdicts[sn] = info
+        self.live_verdicts = verdicts
+        return verdicts
+
+    @staticmethod
+    def _model_input(pipeline, X):
+        """특성 이름으로 학습된 모델에만 (센서 수 × 9) 작은 DataFrame 을 만들어 넘김"""
+        if getattr(pipeline, 'feature_names_in_', None) is None:
+            return X
+        import pandas as pd
+        return pd.DataFrame(X, columns=FEATURE_COLUMNS)
+
+    # ----------------- 저장 -----------------
+    def save_results(self, on_done=None, on_error=None, block=False):
+        """
+        수집된 데이터와 예측 결과를 imu_analysis.db 에 저장하는 작업 제출
+        on_done((원시 데이터 수, 진단 결과 수)). 대기열이 가득 차면 False
+        """
+        with self.data_lock:
+            if not len(self.buffer):
+                raise ValueError("저장할 데이터가 없습니다")
+            cols = self.buffer.columns()
+            # 데이터 품질 = 1 - 패킷 손실률 (프레임 번호 기준, 이전 펌웨어는 1.0)
+            quality = 1.0 - self.link.loss_rate
+        if not self.predictions_data:
+            raise ValueError("예측 결과가 없습니다")
+
+        session_id = self.session_id
+        measurement_time = self.collection_start_time
+        end_time = datetime.now()
+        duration = (end_time - self.collection_start_time).total_seconds()
+        predictions = list(self.predictions_data.items())
+        threshold = self.threshold
+        chunk_size = self.DB_CHUNK_SIZE
+        # 연속 저장된 세션은 원시 데이터가 이미 DB 에 있으므로 다시 넣지 않음
+        streamed = self.stream_writer.covers(session_id)
+        if streamed:
+            self.stream_writer.maybe_flush(force=True)
+        raw_format = self.stream_writer.fmt if streamed else self.RAW_STORAGE
+
+        def job(conn):
+            cursor = conn.cursor()
+
+            if streamed and raw_format == 'blob':
+                raw_data_count, active_sensors = session_counts(conn, session_id)
+            elif streamed:
+                raw_data_count, active_sensors = cursor.execute(
+                    "SELECT COUNT(*), COUNT(DISTINCT sensor_id) FROM imu_raw_data WHERE session_id = ?",
+                    (session_id,)).fetchone()
+            elif raw_format == 'blob':
+                raw_data_count = insert_raw_blobs(cursor, session_id, cols)
+                active_sensors = len(np.unique(cols['SN']))
+            else:
+                # 원시 데이터: 컬럼 배열 → executemany (DB_CHUNK_SIZE 행 단위)
+                raw_data_count = insert_raw_samples(cursor, session_id, cols, chunk_size=chunk_size)
+                active_sensors = len(np.unique(cols['SN']))
+
+            cursor.executemany('''
+                INSERT INTO diagnosis_results
+                (session_id, sensor_id, measurement_date, measurement_time, data_collection_duration,
+                 predicted_roll_drift, predicted_pitch_drift, predicted_yaw_drift,
+                 max_drift_axis, max_drift_value, max_drift_signed,
+                 is_faulty, fault_threshold, diagnosis_status, model_version, data_quality_score, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                session_id,
+                int(sensor_id),
+                measurement_time.date().isoformat(),
+                measurement_time.time().isoformat(),
+                duration,
+                pred_info.get('roll_drift'),
+                pred_info.get('pitch_drift'),
+                pred_info.get('yaw_drift'),
+                pred_info.get('max_drift_axis'),
+                pred_info.get('max_drift_value'),
+                pred_info.get('max_drift_signed'),
+                pred_info.get('is_faulty', False),
+                threshold,
+                pred_info.get('status', '정상'),
+                pred_info.get('model_version') or MODEL_VERSION,
+                quality,
+                pred_info.get('notes')
+            ) for sensor_id, pred_info in predictions])
+
+            cursor.execute('''
+                UPDATE measurement_sessions
+                SET end_time = ?, total_duration = ?, sensor_count = ?, total_data_points = ?
+                WHERE session_id = ?
+            ''', (
+                end_time.isoformat(),
+                duration,
+                active_sensors,
+                raw_data_count if streamed else len(cols['SN']),
+                session_id
+            ))
+            return raw_data_count, len(predictions)
+
+        return self.submit_db_job(job, on_done, on_error, block=block)
+
+    # ----------------- 헤드리스 자동 측정 -----------------
+    def run_cycle(self, duration=5.0, stop_event=None, keep_connected=False):
+        """
+        자동 측정 한 주기: 세션 시작 → 연결 → duration 초 수집 → 분석 → 저장 (저장 완료까지 블록)
+        keep_connected 이면 주기 사이에 연결을 유지 (수집 창 밖의 프레임은 버림) → 다음 주기 연결 대기 없음
+        결과 요약 dict 반환. 연결 실패 시 ConnectionError
+        """
+        if self.pipeline is None:
+            raise RuntimeError("AI 모델이 로드되지 않았습니다")
+        stop_event = stop_event or threading.Event()
+
+        self.ingest_enabled = False
+        self.begin_session("자동")
+        self.ingest_enabled = True
+        self.start_stream()
+        if not self.wait_connected():
+            self.stop_stream()
+            raise ConnectionError(f"WebSocket 서버에 연결할 수 없습니다: {self.replay_path or self.ws_url}")
+        stop_event.wait(duration)
+        if keep_connected and not self.replay_path:
+            self.ingest_enabled = False
+            self.stream_writer.stop()
+        else:
+            self.stop_stream()
+
+        self.predict()
+        done = threading.Event()
+        saved = {}
+
+        def on_done(counts):
+            saved['raw'], saved['diagnosis'] = counts
+            done.set()
+
+        def on_error(e):
+            saved['error'] = e
+            done.set()
+
+        self.save_results(on_done, on_error, block=True)
+        done.wait()
+        if 'error' in saved:
+            raise saved['error']
+        with self.data_lock:
+            samples, loss, gap = len(self.buffer), self.link.loss_rate, self.link.gap_seconds
+        return {
+            'session_id': self.session_id,
+            'samples': samples,
+            'loss_rate': loss,
+            'gap_seconds': gap,
+            'raw_rows': saved['raw'],
+            'predictions': dict(self.predictions_data),
+        }
+
+
+def _main():
+    import argparse
+    import signal
+
+    ap = argparse.ArgumentParser(description="IMU 자동 측정 (헤드리스)")
+    ap.add_argument("--model", required=True, help="AI 모델 파일 (.pkl)")
+    ap.add_argument("--url", default="ws://10.200.246.81:81", help="WebSocket 주소")
+    ap.add_argument("--replay", help="장비 대신 녹화 파일(.imurec) 재생")
+    ap.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 = 최대 속도)")
+    ap.add_argument("--record", help="수신 프레임을 녹화할 파일 (.imurec)")
+    ap.add_argument("--db", default="imu_analysis.db")
+    ap.add_argument("--duration", type=float, default=5.0, help="수집 시간(초). --rolling 이면 전체 실행 시간 (0 = 중지할 때까지)")
+    ap.add_argument("--cycles", type=int, default=1, help="반복 횟수 (0 = 중지할 때까지)")
+    ap.add_argument("--interval", type=float, default=0.0, help="주기 시작 간격(초)")
+    ap.add_argument("--threshold", type=float, default=3.3)
+    ap.add_argument("--station", help="장비 ID (measurement_sessions.equipment_id)")
+    ap.add_argument("--keep-connected", action="store_true", help="주기 사이에도 연결 유지")
+    ap.add_argument("--gap-policy", choices=("flag", "exclude"), default="flag",
+                    help="측정 창에 연결 끊김이 있는 센서 처리")
+    ap.add_argument("--rolling", action="store_true", help="연속 진단 (최근 4초 창으로 주기마다 판정)")
+    ap.add_argument("--rolling-interval", type=float, default=1.0, help="연속 진단 판정 주기(초)")
+    ap.add_argument("--hysteresis", type=float, default=0.3, help="연속 진단 고장 해제 히스테리시스(°)")
+    ap.add_argument("--confirm", type=int, default=2, help="연속 진단 상태 변경에 필요한 연속 판정 수")
+    ap.add_argument("--metrics", help="종료 시 단계별 처리 시간/카운터를 저장할 JSON 파일")
+    ap.add_argument("--raw-format", choices=("rows", "blob"), default="rows",
+                    help="원시 데이터 저장 형식 (blob = 센서별 압축 조각, imu_raw_blob)")
+    args = ap.parse_args()
+
+    engine = IMUEngine(ws_url=args.url, db_path=args.db, threshold=args.threshold)
+    engine.replay_path = args.replay
+    engine.replay_speed = args.speed
+    if args.station:
+        engine.equipment_id = args.station
+    engine.GAP_POLICY = args.gap_policy
+    engine.RAW_STORAGE = args.raw_format
+    if args.record:
+        engine.recorder = FrameRecorder(args.record)
+    engine.init_database(on_error=lambda e: print(f"❌ 데이터베이스 초기화 오류: {e}"))
+    engine.load_model(args.model)
+    print(f"✅ AI 모델 로드 완료: {args.model} ({engine.model_version})")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *a: stop.set())
+    if args.rolling:
+        engine.ROLLING_INTERVAL = args.rolling_interval
+        engine.ROLLING_HYSTERESIS = args.hysteresis
+        engine.ROLLING_CONFIRM = args.confirm
+        code = _run_rolling(engine, args.duration, stop)
+        _dump_metrics(args.metrics)
+        raise SystemExit(code)
+    failures = 0
+    cycle = 0
+    try:
+        while not stop.is_set() and (args.cycles == 0 or cycle < args.cycles):
+            cycle += 1
+            started = time.monotonic()
+            try:
+                result = engine.run_cycle(args.duration, stop_event=stop, keep_connected=args.keep_connected)
+            except (ConnectionError, ValueError) as e:
+                failures += 1
+                print(f"❌ [{cycle}] {e}")
+            else:
+                faulty = [sn for sn, p in result['predictions'].items() if p['is_faulty']]
+                print(f"✅ [{cycle}] 세션 {result['session_id'][:8]} / 샘플 {result['samples']:,} "
+                      f"(DB {result['raw_rows']:,}) / 손실 {result['loss_rate']:.1%} / "
+                      f"끊김 {result['gap_seconds']:.1f}초 / 고장 {len(faulty)}/{len(result['predictions'])}")
+                for sn, p in sorted(result['predictions'].items()):
+                    print(f"   센서 {sn}: {p['max_drift_axis']} {p['max_drift_signed']:+.2f}° {p['status']}"
+                          + (f" ({p['notes']})" if p.get('notes') else ""))
+            stop.wait(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+    _dump_metrics(args.metrics)
+    raise SystemExit(1 if failures and failures == cycle else 0)
+
+
+def _dump_metrics(path):
+    if not path:
+        return
+    snap = metrics.dump_json(path)
+    print(metrics.report(snap))
+    print(f"✅ 성능 지표 저장: {path}")
+
+
+def _run_rolling(engine, duration, stop):
+    """연속 진단 CLI: 판정마다 한 줄 출력, 센서 상태가 바뀌면 따로 표시"""
+    previous = {}
+
+    def on_event(event, info):
+        if event != 'verdict':
+            return
+        stamp = datetime.now().strftime('%H:%M:%S')
+        print(f"[{stamp}] " + " ".join(
+            f"{sn}:{'F' if v['is_faulty'] else '.'}{v['max_drift_signed']:+.2f}" for sn, v in sorted(info.items())))
+        for sn, v in sorted(info.items()):
+            if previous.get(sn, False) != v['is_faulty']:
+                print(f"   ⚠️ 센서 {sn}: {'고장' if v['is_faulty'] else '정상 복귀'} "
+                      f"({v['max_drift_axis']} {v['max_drift_signed']:+.2f}°)")
+            previous[sn] = v['is_faulty']
+
+    engine.on_event = on_event
+    engine.begin_session("연속")
+    engine.start_stream()
+    if not engine.wait_connected():
+        print(f"❌ WebSocket 서버에 연결할 수 없습니다: {engine.replay_path or engine.ws_url}")
+        engine.close()
+        return 1
+    engine.start_rolling()
+    try:
+        stop.wait(duration if duration > 0 else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+# imu_features.py
+"""
+드리프트 예측 모델 입력 특성 (p5/q5/r5/Rd5/Pd5/Yd5/Rdot5/Pdot5/Ydot5) 계산
+
+- 전체 센서를 한 번에 처리: (SN, timestamp) 로 한 번 정렬 → searchsorted 로 창 경계 → 누적합 기반 구간 평균
+- GUI(링 버퍼 columns()), 학습용/과거 세션 재채점(DataFrame) 어디서든 같은 코드 사용
+- 창: 센서별 첫 샘플 +1초 ~ +5초 (양 끝 포함)
+- 시간축: 센서의 모든 샘플에 device_time(장치 micros 기준)이 있으면 그것을, 없으면 수신 timestamp 사용
+  (Wi-Fi 지연/몰림이 Rd5/Pd5/Yd5 의 dt 를 왜곡하지 않도록)
+
+사용 예) 과거 세션 특성 추출 (imu_raw_data 와 imu_raw_blob 세션 모두)
+    python imu_features.py imu_analysis.db -o features.csv
+"""
+import numpy as np
+
+FEATURE_COLUMNS = ['p5', 'q5', 'r5', 'Rd5', 'Pd5', 'Yd5', 'Rdot5', 'Pdot5', 'Ydot5']
+REQUIRED_COLUMNS = ['SN', 'timestamp', 'ROLL', 'PITCH', 'YAW', 'X_DEL_ANG', 'Y_DEL_ANG', 'Z_DEL_ANG']
+
+WINDOW_SKIP = 1.0     # 첫 샘플 이후 버리는 구간(초)
+WINDOW_LENGTH = 4.0   # 특성 계산 구간 길이(초)
+
+
+def _seconds(ts):
+    """datetime64 / pandas datetime / epoch 초 → float64 초"""
+    ts = np.asarray(ts)
+    if ts.dtype.kind == 'M':
+        return ts.astype('datetime64[us]').astype(np.int64) / 1e6
+    return ts.astype(np.float64)
+
+
+def feature_time(sn, data):
+    """센서별로 device_time 을 쓸 수 있으면 device_time, 아니면 timestamp (초)"""
+    t = _seconds(data['timestamp'])
+    if 'device_time' not in data:
+        return t
+    dev = np.asarray(data['device_time'], dtype=np.float64)
+    _, group = np.unique(sn, return_inverse=True)
+    missing = np.bincount(group, weights=~np.isfinite(dev)) > 0
+    return np.where(missing[group], t, dev)
+
+
+def _segment_mean(values, lo, hi):
+    """정렬된 배열의 [lo, hi) 구간 평균 (NaN 제외, pandas mean 과 동일)"""
+    ok = ~np.isnan(values)
+    cs = np.concatenate(([0.0], np.cumsum(np.where(ok, values, 0.0))))
+    cnt = np.concatenate(([0], np.cumsum(ok)))
+    n = cnt[hi] - cnt[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, (cs[hi] - cs[lo]) / np.maximum(n, 1), np.nan)
+
+
+def euler_rates(roll, pitch, x_del, y_del, z_del):
+    """
+    Euler 각 변화율 (Rdot, Pdot, Ydot)
+    p = -X_DEL_ANG, q = -Z_DEL_ANG, r = Y_DEL_ANG (센서 장착 축 변환)
+    """
+    p = -x_del; q = -z_del; r = y_del
+    R_rad = np.deg2rad(roll); P_rad = np.deg2rad(pitch)
+    cos_P = np.cos(P_rad)
+    cos_P = np.where(np.abs(cos_P) < 1e-10, 1e-10 * np.sign(cos_P), cos_P)
+    sin_R = np.sin(R_rad); cos_R = np.cos(R_rad)
+    tan_P = np.clip(np.tan(P_rad), -100, 100)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Rdot = p + (q * sin_R + r * cos_R) * tan_P
+        Pdot = q * cos_R - r * sin_R
+        Ydot = (q * sin_R + r * cos_R) / cos_P
+    return (np.nan_to_num(Rdot, nan=0.0, posinf=0.0, neginf=0.0),
+            np.nan_to_num(Pdot, nan=0.0, posinf=0.0, neginf=0.0),
+            np.nan_to_num(Ydot, nan=0.0, posinf=0.0, neginf=0.0))
+
+
+def extract_features(data, skip=WINDOW_SKIP, length=WINDOW_LENGTH, min_samples=2):
+    """
+    data: REQUIRED_COLUMNS 키를 가진 dict/DataFrame (센서가 섞여 있어도 됨, device_time 선택)
+    반환: (sensor_ids (k,), X (k, 9))  — 창 내 샘플 부족/dt=0/비유한 특성 센서는 제외
+    """
+    sn = np.asarray(data['SN']).astype(np.int64)
+    if sn.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(FEATURE_COLUMNS)))
+    t = feature_time(sn, data)
+
+    # 1) (SN, t) 로 한 번만 정렬
+    order = np.lexsort((t, sn))
+    sn = sn[order]; t = t[order]
+    cols = {c: np.asarray(data[c], dtype=np.float64)[order]
+            for c in ('ROLL', 'PITCH', 'YAW', 'X_DEL_ANG', 'Y_DEL_ANG', 'Z_DEL_ANG')}
+
+    # 2) 센서 구간 + 창 경계 (센서 번호를 큰 오프셋으로 얹은 단조 키에서 searchsorted)
+    sensors, starts, group = np.unique(sn, return_index=True, return_inverse=True)
+    rel = t - t[starts][group]
+    stride = np.ceil(rel.max() + skip + length + 1.0)
+    key = group * stride + rel
+    base = np.arange(sensors.size) * stride
+    lo = np.searchsorted(key, base + skip, side='left')
+    hi = np.searchsorted(key, base + skip + length, side='right')
+    valid = (hi - lo) >= min_samples
+    last = np.maximum(hi - 1, lo)
+
+    # 3) 구간 리덕션
+    p5 = _segment_mean(-cols['X_DEL_ANG'], lo, hi)
+    q5 = _segment_mean(-cols['Z_DEL_ANG'], lo, hi)
+    r5 = _segment_mean(cols['Y_DEL_ANG'], lo, hi)
+
+    lo_c = np.minimum(lo, sn.size - 1); last_c = np.minimum(last, sn.size - 1)
+    dt = t[last_c] - t[lo_c]
+    valid &= dt != 0
+    dt_safe = np.where(dt != 0, dt, 1.0)
+    Rd5 = (cols['ROLL'][last_c] - cols['ROLL'][lo_c]) / dt_safe
+    Pd5 = (cols['PITCH'][last_c] - cols['PITCH'][lo_c]) / dt_safe
+    Yd5 = (cols['YAW'][last_c] - cols['YAW'][lo_c]) / dt_safe
+
+    Rdot, Pdot, Ydot = euler_rates(cols['ROLL'], cols['PITCH'],
+                                   cols['X_DEL_ANG'], cols['Y_DEL_ANG'], cols['Z_DEL_ANG'])
+    n = np.maximum(hi - lo, 1)
+    def seg_sum(v):
+        cs = np.concatenate(([0.0], np.cumsum(v)))
+        return cs[hi] - cs[lo]
+    Rdot5 = seg_sum(Rdot) / n; Pdot5 = seg_sum(Pdot) / n; Ydot5 = seg_sum(Ydot) / n
+
+    X = np.column_stack([p5, q5, r5, Rd5, Pd5, Yd5, Rdot5, Pdot5, Ydot5])
+    valid &= np.all(np.isfinite(X), axis=1)
+    return sensors[valid], X[valid]
+
+
+def window_gaps(data, gaps, skip=WINDOW_SKIP, length=WINDOW_LENGTH):
+    """
+    센서별 특성 창(수신 시각 기준)과 겹치는 연결 끊김 구간 길이(초)
+    gaps: [(시작, 끝)] epoch 초 (LinkTracker.gaps). 반환: (sensor_ids (k,), overlap (k,))
+    """
+    sn = np.asarray(data['SN']).astype(np.int64)
+    sensors, group = np.unique(sn, return_inverse=True)
+    overlap = np.zeros(sensors.size)
+    if sn.size == 0 or not gaps:
+        return sensors, overlap
+    t0 = np.full(sensors.size, np.inf)
+    np.minimum.at(t0, group, _seconds(data['timestamp']))
+    lo = t0 + skip
+    hi = lo + length
+    for start, end in gaps:
+        overlap += np.clip(np.minimum(hi, end) - np.maximum(lo, start), 0.0, None)
+    return sensors, overlap
+
+
+def feature_frame(data, **kwargs):
+    """extract_features 결과를 SN 인덱스를 가진 DataFrame 으로 (학습/재채점용)"""
+    import pandas as pd
+    sensors, X = extract_features(data, **kwargs)
+    return pd.DataFrame(X, columns=FEATURE_COLUMNS, index=pd.Index(sensors, name='SN'))
+
+
+def _main():
+    import argparse
+    import sqlite3
+    import pandas as pd
+    from imu_blob import blob_sessions, read_session
+
+    ap = argparse.ArgumentParser(description="imu_raw_data / imu_raw_blob 세션별 특성 추출")
+    ap.add_argument("db", help="SQLite 파일 (imu_analysis.db)")
+    ap.add_argument("--session", help="특정 session_id 만 처리")
+    ap.add_argument("-o", "--output", default="features.csv")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        # device_time 컬럼이 없는 이전 DB 파일은 수신 시각만 사용
+        has_device_time = any(row[1] == 'device_time' for row in conn.execute("PRAGMA table_info(imu_raw_data)"))
+        query = ("SELECT session_id, sensor_id AS SN, timestamp, roll AS ROLL, pitch AS PITCH, yaw AS YAW, "
+                 "x_del_ang AS X_DEL_ANG, y_del_ang AS Y_DEL_ANG, z_del_ang AS Z_DEL_ANG"
+                 + (", device_time" if has_device_time else "") + " FROM imu_raw_data")
+        params = ()
+        if args.session:
+            query += " WHERE session_id = ?"
+            params = (args.session,)
+        raw = pd.read_sql_query(query, conn, params=params)
+        # 압축 저장(imu_raw_blob) 세션은 columns() 형식 배열로 바로 읽음
+        has_blob = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='imu_raw_blob'").fetchone()
+        blob_ids = ([args.session] if args.session else blob_sessions(conn)) if has_blob else []
+        blobs = [(sid, read_session(conn, sid)) for sid in blob_ids]
+    finally:
+        conn.close()
+    raw['timestamp'] = pd.to_datetime(raw['timestamp'])
+
+    frames = []
+    for session_id, df in raw.groupby('session_id', sort=False):
+        feats = feature_frame(df).reset_index()
+        feats.insert(0, 'session_id', session_id)
+        frames.append(feats)
+    row_sessions = set(raw['session_id'].unique())
+    for session_id, cols in blobs:
+        # imu_blob.py --convert 로 두 형식에 모두 있는 세션은 한 번만
+        if len(cols['SN']) == 0 or session_id in row_sessions:
+            continue
+        feats = feature_frame(cols).reset_index()
+        feats.insert(0, 'session_id', session_id)
+        frames.append(feats)
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['session_id', 'SN'] + FEATURE_COLUMNS)
+    out.to_csv(args.output, index=False)
+    print(f"✅ {len(frames)}개 세션, {len(out)}개 센서 특성 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# imu_font.py
+"""
+GUI 한글 폰트 결정 + 실행 간 캐시
+
+- 후보 목록 중 설치된 첫 폰트를 matplotlib 폰트 목록에서 찾고 (family, 파일 경로) 를 캐시 파일에 저장
+- 다음 실행부터는 캐시의 파일이 남아 있으면 matplotlib 을 불러오지 않고 바로 사용
+  (창을 먼저 띄우고 그래프는 나중에 만드는 GUI 시작 경로용)
+- 캐시 위치: %LOCALAPPDATA%\\imu_gui\\font.json (Windows) / ~/.cache/imu_gui/font.json
+"""
+import json
+import os
+import platform
+
+FALLBACK_FONT = 'DejaVu Sans'
+
+
+def cache_path(name='font.json'):
+    """GUI 실행 간 캐시 파일 경로 (폰트, 마지막 모델 등)"""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'imu_gui', name)
+
+
+def default_candidates():
+    system = platform.system()
+    if system == 'Windows':
+        return ['Malgun Gothic', 'Microsoft YaHei', 'SimHei', 'DejaVu Sans']
+    if system == 'Darwin':
+        return ['AppleGothic', 'Arial Unicode MS', 'DejaVu Sans']
+    return ['DejaVu Sans', 'Liberation Sans', 'Noto Sans CJK KR']
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cache(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"폰트 캐시 저장 실패: {e}")
+
+
+def resolve_font(candidates=None, path=None):
+    """
+    설치된 첫 후보 폰트 → (family, 파일 경로). 없으면 (None, None)
+    찾은 결과만 캐시 (나중에 폰트를 설치하면 다음 실행에서 다시 검색)
+    """
+    candidates = list(candidates or default_candidates())
+    path = path or cache_path()
+    cached = _load_cache(path)
+    if (cached and cached.get('candidates') == candidates
+            and cached.get('path') and os.path.exists(cached['path'])):
+        return cached['family'], cached['path']
+
+    import matplotlib.font_manager as fm
+    files = {}
+    for entry in fm.fontManager.ttflist:
+        files.setdefault(entry.name, entry.fname)
+    for name in candidates:
+        if name in files:
+            _save_cache(path, {'candidates': candidates, 'family': name, 'path': files[name]})
+            return name, files[name]
+    return None, None
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+# imu_ingest.py
+"""
+다중 장비 동시 수신 (asyncio 이벤트 루프 하나)
+
+- 장비(ESP8266 지그)마다 WebSocketApp + run_forever 스레드를 두는 대신,
+  스레드 하나의 이벤트 루프에서 N 개 연결을 모두 처리 (16대 × 8 IMU = 128채널 이상)
+- 장비별 DeviceStream 이 자체 링 버퍼 / LinkTracker / lock 을 가짐 (device_id 로 구분)
+- 수신 처리 경로(parse_message → LinkTracker.ingest)는 GUI/엔진과 동일
+- 연결이 끊기거나 idle_timeout 동안 수신이 없으면 backoff + jitter 후 재연결 (버퍼 유지, 끊긴 구간은 link.gaps)
+
+사용 예)
+    python imu_simulator.py --devices 16 --rate 100 --port 9000
+    python imu_ingest.py ws://127.0.0.1:9000 --devices 16 --duration 10
+    python imu_ingest.py rig1=ws://10.200.246.81:81 rig2=ws://10.200.246.82:81 --model model.pkl
+"""
+import asyncio
+import threading
+import time
+
+from imu_buffer import IMURingBuffer
+from imu_protocol import LinkTracker, parse_message
+from imu_ws import Backoff, ConnectionClosed, WSConnection
+
+
+class DeviceStream:
+    """장비 하나의 연결 상태 + 수신 버퍼"""
+    def __init__(self, device_id, url, n_sensors=8, capacity=1250):
+        self.device_id = device_id
+        self.url = url
+        self.data_lock = threading.Lock()
+        self.buffer = IMURingBuffer(n_sensors=n_sensors, capacity=capacity)
+        self.link = LinkTracker(n_sensors=n_sensors)
+        self.connected = False
+        self.frames = 0
+        self.samples = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.last_rx = None
+
+    def on_message(self, message, ts):
+        try:
+            frame = parse_message(message)
+            with self.data_lock:
+                self.samples += self.link.ingest(self.buffer, frame, ts)
+            self.frames += 1
+            self.last_rx = ts
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+
+    def disconnected(self):
+        with self.data_lock:
+            self.link.disconnected(time.time())
+
+    def clear(self):
+        with self.data_lock:
+            self.buffer.clear()
+            self.link.reset()
+
+    def to_dataframe(self):
+        """수신 버퍼 DataFrame (device_id 컬럼 포함)"""
+        with self.data_lock:
+            df = self.buffer.to_dataframe()
+        df.insert(0, 'device_id', self.device_id)
+        return df
+
+    def stats(self):
+        with self.data_lock:
+            count, dropped, loss = len(self.buffer), self.link.dropped, self.link.loss_rate
+            gap = self.link.gap_seconds
+        return {'device_id': self.device_id, 'connected': self.connected, 'frames': self.frames,
+                'samples': self.samples, 'records': count, 'dropped': dropped, 'loss_rate': loss,
+                'gap_seconds': gap, 'reconnects': self.reconnects, 'errors': self.errors}
+
+
+class IngestManager:
+    """
+    N 개 장비를 이벤트 루프 하나로 수신
+
+    - start(): 루프 전용 스레드 하나에서 모든 장비 수신 시작 (GUI/엔진에서 사용)
+    - stop(): 모든 연결을 닫고 스레드 종료
+    - run(duration): 현재 스레드에서 duration 초 동안 수신 (CLI)
+    - on_message(device, message, ts): 설정하면 장비별 버퍼 기록 후 추가로 호출 (녹화 등)
+    """
+    def __init__(self, n_sensors=8, capacity=1250, connect_timeout=5.0, idle_timeout=5.0,
+                 reconnect=True, reconnect_min=0.5, reconnect_max=10.0):
+        self.n_sensors = n_sensors
+        self.capacity = capacity
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.reconnect = reconnect
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.devices = {}
+        self.on_message = None
+        self._loop = None
+        self._stop = None
+        self._thread = None
+
+    def add_device(self, device_id, url):
+        if device_id in self.devices:
+            raise ValueError(f"이미 등록된 장비: {device_id}")
+        device = DeviceStream(device_id, url, n_sensors=self.n_sensors, capacity=self.capacity)
+        self.devices[device_id] = device
+        return device
+
+    # ----------------- 실행 -----------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._stop = asyncio.Event()
+            ready.set()
+            try:
+                self._loop.run_until_complete(self._run_all())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="imu-ingest", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._stop.set)
+            except RuntimeError:
+                pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run(self, duration=None):
+        async def main():
+            self._stop = asyncio.Event()
+            if duration is not None:
+                asyncio.get_running_loop().call_later(duration, self._stop.set)
+            await self._run_all()
+        asyncio.run(main())
+
+    async def _run_all(self):
+        tasks = [asyncio.create_task(self._device_task(d)) for d in self.devices.values()]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _device_task(self, device):
+        backoff = Backoff(self.reconnect_min, self.reconnect_max)
+        while True:
+            started = time.monotonic()
+            await self._receive(device)
+            if not self.reconnect:
+                return
+            if time.monotonic() - started > self.reconnect_max:
+                backoff.reset()
+            delay = backoff.next()
+            device.reconnects += 1
+            print(f"🔄 [{device.device_id}] {delay:.1f}초 후 재연결 ({backoff.attempt}회째)")
+            await asyncio.sleep(delay)
+
+    async def _receive(self, device):
+        """연결 하나의 수신 루프 (끊기면 반환, 취소는 그대로 전파)"""
+        conn = None
+        try:
+            conn = await WSConnection.connect(device.url, timeout=self.connect_timeout)
+            device.connected = True
+            print(f"✅ [{device.device_id}] 연결: {device.url}")
+            on_message = self.on_message
+            while True:
+                message = await asyncio.wait_for(conn.recv(), self.idle_timeout)
+                ts = time.time()
+                device.on_message(message, ts)
+                if on_message is not None:
+                    on_message(device, message, ts)
+        except ConnectionClosed:
+            print(f"[{device.device_id}] 연결 종료")
+        except asyncio.TimeoutError:
+            print(f"[{device.device_id}] {'수신 없음' if device.connected else '연결 시간 초과'}")
+        except (OSError, ValueError, EOFError, asyncio.LimitOverrunError) as e:
+            # EOFError: 핸드셰이크 중 끊김 (asyncio.IncompleteReadError)
+            device.last_error = e
+            print(f"❌ [{device.device_id}] 연결 실패: {e!r}")
+        except Exception as e:
+            # 예상 못 한 오류도 재연결 루프는 계속 돌아야 한다
+            device.last_error = e
+            print(f"❌ [{device.device_id}] 수신 오류: {e!r}")
+        finally:
+            if device.connected:
+                device.connected = False
+                device.disconnected()
+            if conn is not None:
+                await conn.close()
+
+    # ----------------- 조회 -----------------
+    def stats(self):
+        return [device.stats() for device in self.devices.values()]
+
+
+def parse_device_args(targets, devices=1):
+    """['id=ws://...', 'ws://host:port'] → [(device_id, url)]. devices>1 이면 포트를 하나씩 늘려 확장"""
+    result = []
+    for target in targets:
+        device_id, sep, url = target.partition('=')
+        if not sep:
+            device_id, url = None, target
+        if devices > 1:
+            head, _, port = url.rstrip('/').rpartition(':')
+            for i in range(devices):
+                result.append((f"{device_id or 'rig'}{i + 1}", f"{head}:{int(port) + i}"))
+        else:
+            result.append((device_id or f"rig{len(result) + 1}", url))
+    return result
+
+
+def _main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="다중 IMU 장비 동시 수신")
+    ap.add_argument("targets", nargs="+", help="ws://host:port 또는 장비ID=ws://host:port")
+    ap.add_argument("--devices", type=int, default=1, help="주소 하나를 연속 포트 N 대로 확장 (시뮬레이터 --devices 와 함께)")
+    ap.add_argument("--duration", type=float, default=10.0, help="수신 시간(초)")
+    ap.add_argument("--capacity", type=int, default=1250, help="센서별 링 버퍼 용량")
+    ap.add_argument("--model", help="수신 후 장비별 예측에 사용할 모델(.pkl)")
+    ap.add_argument("--no-reconnect", action="store_true", help="연결이 끊겨도 재연결하지 않음")
+    args = ap.parse_args()
+
+    manager = IngestManager(capacity=args.capacity, reconnect=not args.no_reconnect)
+    for device_id, url in parse_device_args(args.targets, args.devices):
+        manager.add_device(device_id, url)
+
+    t0 = time.perf_counter()
+    try:
+        manager.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - t0
+
+    stats = manager.stats()
+    for st in stats:
+        print(f"[{st['device_id']}] 프레임 {st['frames']:,} ({st['frames'] / elapsed:,.0f}/s) / "
+              f"샘플 {st['samples']:,} / 손실 {st['dropped']:,} ({st['loss_rate']:.1%}) / "
+              f"끊김 {st['gap_seconds']:.1f}초 (재연결 {st['reconnects']}) / 오류 {st['errors']}")
+    total = sum(st['samples'] for st in stats)
+    print(f"합계: 장비 {len(stats)}대 / 샘플 {total:,} ({total / elapsed:,.0f}/s)")
+
+    if args.model:
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from imu_features import FEATURE_COLUMNS, extract_features
+
+        pipeline = joblib.load(args.model)
+        for device in manager.devices.values():
+            with device.data_lock:
+                cols = device.buffer.columns()
+            sensor_ids, X = extract_features(cols)
+            if not len(X):
+                continue
+            pred = pipeline.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+            for sn, p in zip(sensor_ids.tolist(), pred):
+                print(f"  [{device.device_id}] 센서 {sn}: {np.round(np.ravel(p), 3).tolist()}")
+
+
+if __name__ == "__main__":
+    _main()
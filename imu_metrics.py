@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+# imu_metrics.py
+"""
+단계별 처리 시간 히스토그램 + 카운터 (프로세스 공용 metrics)
+
+- observe(stage, 초) / timer(stage): 단계별 지연 히스토그램 (로그 간격 버킷, p50/p95/p99/max)
+- count(name, n): 누적 카운터 + 최근 초당 비율 (frames/s 등)
+- gauge(name, fn): 조회 시점에 읽는 값 (링 버퍼 덮어쓰기 수, DB 대기열 길이 등)
+- locked(lock): lock 획득 대기 시간을 'lock_wait' 로 기록하며 lock 보유
+- snapshot() → dict, dump_json(path), report() → 표 문자열
+- open_panel(root): Tk 성능 창 (1초마다 갱신, JSON 저장/초기화)
+
+단계 이름
+    frame_interval  프레임 수신 간격 (Wi-Fi 지연/몰림)
+    parse           메시지 → Frame
+    lock_wait       data_lock 획득 대기
+    append          LinkTracker.ingest (링 버퍼 기록)
+    plot            그래프 갱신 (그리기 포함)
+    features        특성 추출
+    predict         pipeline.predict
+    db_queue_wait   DB 작업 제출 → writer 스레드 시작
+    db_commit       DB 작업 실행 + commit
+    upload          API 업로드 요청 1건
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# 버킷 상한 (ms)
+BUCKETS_MS = (0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        """q (0~100) 분위수 근사 (ms, 해당 버킷 안에서 선형 보간, 최댓값을 넘지 않음)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen, lower = 0, 0.0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            if n and seen + n >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max,
+            'buckets': {('inf' if b == float('inf') else f'{b:g}'): n
+                        for b, n in zip(BUCKETS_MS, self.counts) if n},
+        }
+
+
+class Metrics:
+    def __init__(self, rate_window=1.0):
+        self.enabled = True
+        self.rate_window = rate_window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._hist = {}
+        self._counters = {}
+        self._gauges = {}
+        self._rate_base = (time.monotonic(), {})
+        self._rates = {}
+
+    # ----------------- 기록 -----------------
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._hist.get(stage)
+            if hist is None:
+                hist = self._hist[stage] = Histogram()
+            hist.record(seconds * 1000.0)
+
+    @contextmanager
+    def timer(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, fn):
+        """조회 시점에 fn() 을 읽는 값 등록 (같은 이름이면 교체)"""
+        self._gauges[name] = fn
+
+    @contextmanager
+    def locked(self, lock, stage='lock_wait'):
+        t0 = time.perf_counter()
+        lock.acquire()
+        self.observe(stage, time.perf_counter() - t0)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self._counters.clear()
+            self._rates = {}
+            self._rate_base = (time.monotonic(), {})
+            self.started = time.time()
+
+    # ----------------- 조회 -----------------
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            stages = {name: hist.to_dict() for name, hist in self._hist.items()}
+            counters = dict(self._counters)
+            # 초당 비율: rate_window 이상 지난 기준점과의 차이 (조회하는 곳이 여럿이어도 같은 값)
+            base_t, base = self._rate_base
+            if now - base_t >= self.rate_window:
+                self._rates = {k: (v - base.get(k, 0)) / (now - base_t) for k, v in counters.items()}
+                self._rate_base = (now, counters)
+            rates = dict(self._rates)
+        gauges = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = f"오류: {e}"
+        return {
+            'started': self.started,
+            'uptime_s': time.time() - self.started,
+            'stages': stages,
+            'counters': {k: {'total': v, 'per_s': rates.get(k, 0.0)} for k, v in counters.items()},
+            'gauges': gauges,
+        }
+
+    def dump_json(self, path):
+        snap = self.snapshot()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snap, f, ensure_ascii=False, indent=2, default=str)
+        return snap
+
+    def report(self, snap=None):
+        snap = snap or self.snapshot()
+        lines = [f"{'stage':<15}{'count':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for name, st in sorted(snap['stages'].items()):
+            lines.append(f"{name:<15}{st['count']:>9,}{st['mean_ms']:>9.2f}{st['p50_ms']:>9.2f}"
+                         f"{st['p95_ms']:>9.2f}{st['p99_ms']:>9.2f}{st['max_ms']:>9.1f}")
+        if snap['counters']:
+            lines.append("")
+            lines.append(f"{'counter':<22}{'total':>12}{'per s':>10}")
+            for name, c in sorted(snap['counters'].items()):
+                lines.append(f"{name:<22}{c['total']:>12,}{c['per_s']:>10.1f}")
+        if snap['gauges']:
+            lines.append("")
+            for name, value in sorted(snap['gauges'].items()):
+                lines.append(f"{name:<22}{value!s:>12}")
+        return "\n".join(lines)
+
+
+# 프로세스 공용 (엔진, GUI, DB writer 가 같은 객체에 기록)
+metrics = Metrics()
+
+
+def open_panel(root, source=None, font=('Consolas', 10), interval_ms=1000):
+    """성능 창 열기 (이미 열려 있으면 앞으로). source 기본값은 공용 metrics"""
+    import tkinter as tk
+    from tkinter import filedialog
+
+    source = source or metrics
+    existing = getattr(root, '_imu_metrics_panel', None)
+    if existing is not None and existing.winfo_exists():
+        existing.lift()
+        return existing
+
+    win = tk.Toplevel(root)
+    win.title("Performance")
+    root._imu_metrics_panel = win
+    text = tk.Text(win, width=80, height=32, font=font, bg='#111827', fg='#e5e7eb', relief='flat')
+    text.pack(fill='both', expand=True, padx=6, pady=6)
+    buttons = tk.Frame(win)
+    buttons.pack(fill='x', padx=6, pady=(0, 6))
+
+    def save():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".json",
+                                            filetypes=[("JSON 파일", "*.json")])
+        if path:
+            source.dump_json(path)
+
+    tk.Button(buttons, text="Save JSON", command=save).pack(side='left')
+    tk.Button(buttons, text="Reset", command=source.reset).pack(side='left', padx=6)
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        snap = source.snapshot()
+        text.config(state='normal')
+        text.delete('1.0', 'end')
+        text.insert('end', f"uptime {snap['uptime_s']:.0f}s\n\n" + source.report(snap))
+        text.config(state='disabled')
+        win.after(interval_ms, refresh)
+
+    refresh()
+    return win
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# imu_model.py
+"""
+드리프트 예측 모델 로드 / 워밍업 / 교체
+
+- 백그라운드 스레드에서 joblib.load(mmap_mode='r') → 비압축으로 저장된 모델의 numpy 배열은 메모리 맵으로 읽음
+  (compress 로 저장된 모델은 joblib 이 mmap 을 무시하고 전부 읽음)
+- 로드 직후 0 특성 1행으로 predict 한 번 (첫 예측의 지연 초기화 비용을 로드 단계에서 처리)
+- 준비가 끝난 모델로 한 번에 교체 → 수신 중에도 교체 가능, 진행 중인 예측은 이전 모델로 끝남
+- 마지막 모델 경로 + SHA-256 을 state_path(JSON) 에 기록 → 다음 실행 시 restore() 로 바로 다시 로드
+- 모델 버전: 파이프라인의 model_version 속성(학습 시 지정) → 없으면 '파일명@해시 앞 8자리'
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+LoadedModel = namedtuple('LoadedModel', ['pipeline', 'path', 'sha256', 'version', 'load_seconds', 'warmup_seconds'])
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def model_version(pipeline, path, sha256):
+    """diagnosis_results.model_version 에 기록할 버전 문자열"""
+    version = getattr(pipeline, 'model_version', None)
+    if version:
+        return str(version)
+    return f"{os.path.splitext(os.path.basename(path))[0]}@{sha256[:8]}"
+
+
+def warm_up(pipeline):
+    """0 특성 1행 예측 (결과는 버림)"""
+    import numpy as np
+    import pandas as pd
+    from imu_features import FEATURE_COLUMNS
+
+    pipeline.predict(pd.DataFrame(np.zeros((1, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS))
+
+
+def load_model_file(path, mmap=True, warmup=True):
+    """
+    모델 파일 하나 로드 + 워밍업 → LoadedModel (현재 스레드에서 블록)
+    메모리 맵 배열(읽기 전용)로 워밍업이 실패하면 mmap 없이 다시 로드
+    """
+    import joblib
+
+    sha256 = file_sha256(path)
+    t0 = time.perf_counter()
+    pipeline = joblib.load(path, mmap_mode='r' if mmap else None)
+    t1 = time.perf_counter()
+    if warmup:
+        try:
+            warm_up(pipeline)
+        except Exception as e:
+            if not mmap:
+                raise
+            print(f"메모리 맵 모델 워밍업 실패, 전체 로드로 재시도: {e}")
+            pipeline = joblib.load(path)
+            t1 = time.perf_counter()
+            warm_up(pipeline)
+    t2 = time.perf_counter()
+    return LoadedModel(pipeline, os.path.abspath(path), sha256, model_version(pipeline, path, sha256),
+                       t1 - t0, t2 - t1)
+
+
+class ModelManager:
+    """
+    현재 모델 하나를 관리 (current 는 LoadedModel 또는 None)
+
+    - load(path): 현재 스레드에서 로드 후 교체 (CLI)
+    - load_async(path, on_done, on_error): 백그라운드 로드 후 교체, 콜백은 dispatch 로 전달 (GUI 는 root.after)
+    - restore(): state_path 에 기록된 마지막 모델을 백그라운드로 다시 로드
+    - 예측 코드는 current 를 한 번 읽어 pipeline 과 version 을 함께 사용 (도중에 교체되어도 섞이지 않음)
+    """
+    def __init__(self, state_path=None, dispatch=None, mmap=True, warmup=True):
+        self.state_path = state_path
+        self.dispatch = dispatch
+        self.mmap = mmap
+        self.warmup = warmup
+        self.current = None
+        self.loading = None
+        self._lock = threading.Lock()
+        self._request = 0
+
+    @property
+    def pipeline(self):
+        model = self.current
+        return model.pipeline if model is not None else None
+
+    @property
+    def version(self):
+        model = self.current
+        return model.version if model is not None else None
+
+    def load(self, path):
+        with self._lock:
+            self._request += 1
+            request = self._request
+        return self._load(path, request)
+
+    def load_async(self, path, on_done=None, on_error=None):
+        """백그라운드 로드. 나중에 요청한 로드가 있으면 먼저 끝난 이전 요청은 교체하지 않고 버림"""
+        with self._lock:
+            self._request += 1
+            request = self._request
+        self.loading = path
+
+        def run():
+            try:
+                model = self._load(path, request)
+            except Exception as e:
+                print(f"❌ 모델 로드 실패: {path}: {e}")
+                self._deliver(on_error, e)
+            else:
+                if model is not None:
+                    self._deliver(on_done, model)
+            finally:
+                if self._request == request:
+                    self.loading = None
+
+        thread = threading.Thread(target=run, name="imu-model-load", daemon=True)
+        thread.start()
+        return thread
+
+    def restore(self, on_done=None, on_error=None):
+        """마지막 모델 다시 로드 (기록이 없거나 파일이 없으면 None). 파일 내용이 바뀌었으면 알림"""
+        state = self._read_state()
+        path = state.get('path')
+        if not path or not os.path.exists(path):
+            return None
+
+        def done(model):
+            if state.get('sha256') and state['sha256'] != model.sha256:
+                print(f"⚠️ 마지막 모델 파일이 변경됨: {path} → {model.version}")
+            if on_done is not None:
+                on_done(model)
+
+        return self.load_async(path, done, on_error)
+
+    def _load(self, path, request):
+        model = load_model_file(path, mmap=self.mmap, warmup=self.warmup)
+        with self._lock:
+            if request != self._request:
+                return None
+            self.current = model
+        self._write_state(model)
+        print(f"✅ 모델 준비: {model.version} (로드 {model.load_seconds:.2f}초, 워밍업 {model.warmup_seconds:.2f}초)")
+        return model
+
+    def _deliver(self, callback, arg):
+        if callback is None:
+            return
+        if self.dispatch is not None:
+            self.dispatch(lambda: callback(arg))
+        else:
+            callback(arg)
+
+    # ----------------- 마지막 모델 기록 -----------------
+    def _read_state(self):
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, model):
+        if not self.state_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp = self.state_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'path': model.path, 'sha256': model.sha256, 'version': model.version}, f,
+                          ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"모델 기록 저장 실패: {e}")
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+# imu_outbox.py
+"""
+API 업로드 대기열 (로컬 SQLite upload_outbox 테이블 + 백그라운드 전송 스레드)
+
+- 진단 결과는 먼저 upload_outbox 에 기록 (enqueue_job 을 DBWriter 로 실행) → API 서버가 내려가 있어도 기록이 남음
+- OutboxDrainer: 전송 시각이 된 pending 행을 UploadClient 로 보내고 결과를 같은 테이블에 반영
+  - 2xx → sent / 409 → sent (서버에 이미 있음)
+  - 연결 실패, 타임아웃, 408/425/429/5xx → 지수 백오프(+지터) 후 재시도 (횟수 제한 없음, 기록을 버리지 않음)
+  - 401/403 → 토큰 만료로 보고 시도 횟수를 늘리지 않고 멈춤 (set_client 로 새 토큰을 주면 재개)
+  - 그 밖의 4xx (400/422 등) → dead (같은 요청을 다시 보내도 실패하므로 보관만, requeue_dead 로 되살림)
+  - payload 를 JSON 으로 풀 수 없는 행 → failed (보내지 않고 보관만)
+  - DB 오류(잠김 등)나 예기치 않은 예외는 기록 후 백오프하고 계속 (전송 스레드가 죽지 않음)
+- 행마다 Idempotency-Key 헤더 (payload 내용의 SHA-256) → 응답을 못 받고 재전송해도 서버에서 중복 등록되지 않음
+  같은 결과를 두 번 저장해도 대기열에는 한 행만 남음 (INSERT OR IGNORE)
+- 한 묶음이 전부 연결 실패면 서버 다운으로 보고 대기열 전체를 백오프 (나머지 행으로 타임아웃을 반복하지 않음)
+
+상태 확인 / 되살리기
+    python imu_outbox.py imu_analysis.db
+    python imu_outbox.py imu_analysis.db --requeue-dead
+"""
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from imu_metrics import metrics
+
+OUTBOX_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS upload_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        path TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        label TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        last_status INTEGER,
+        last_error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        sent_at DATETIME
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_upload_outbox_due ON upload_outbox (status, next_attempt_at)
+    ''',
+]
+
+RETRY_STATUS = {408, 425, 429}
+AUTH_STATUS = {401, 403}
+
+
+def create_outbox_schema(conn):
+    for ddl in OUTBOX_SCHEMA:
+        conn.execute(ddl)
+
+
+def idempotency_key(path, payload):
+    """경로 + payload(키 정렬 JSON) 의 SHA-256"""
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(f"{path}\n{body}".encode('utf-8')).hexdigest()
+
+
+def enqueue_job(items, path='/imu'):
+    """
+    items: [(label, payload)] 을 upload_outbox 에 넣는 DBWriter 작업
+    결과: 새로 들어간 행 수 (이미 대기열에 있는 같은 payload 는 건너뜀)
+    """
+    rows = [(idempotency_key(path, payload), path, json.dumps(payload, ensure_ascii=False), str(label))
+            for label, payload in items]
+
+    def job(conn):
+        create_outbox_schema(conn)
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO upload_outbox (idempotency_key, path, payload, label) "
+                         "VALUES (?, ?, ?, ?)", rows)
+        return conn.total_changes - before
+    return job
+
+
+def outbox_counts(conn):
+    """{'pending': n, 'sent': n, 'dead': n, 'failed': n}"""
+    counts = {'pending': 0, 'sent': 0, 'dead': 0, 'failed': 0}
+    counts.update(dict(conn.execute("SELECT status, COUNT(*) FROM upload_outbox GROUP BY status")))
+    return counts
+
+
+def requeue_dead(conn):
+    """dead 행을 pending 으로 되돌림 (서버 쪽 검증 규칙을 고친 뒤 등). 되돌린 행 수"""
+    cur = conn.execute("UPDATE upload_outbox SET status='pending', attempts=0, next_attempt_at=0 "
+                       "WHERE status='dead'")
+    return cur.rowcount
+
+
+def classify(result):
+    """UploadResult → 'sent' | 'retry' | 'auth' | 'dead'"""
+    if result.ok or result.status == 409:
+        return 'sent'
+    if result.status is None or result.status in RETRY_STATUS or result.status >= 500:
+        return 'retry'
+    if result.status in AUTH_STATUS:
+        return 'auth'
+    return 'dead'
+
+
+class OutboxDrainer:
+    """
+    upload_outbox 전송 스레드 (자체 SQLite 연결 사용)
+
+    - set_client(UploadClient 또는 None): 로그인/로그아웃 시 호출 (None 이면 전송하지 않고 쌓아 둠)
+    - wake(): 새 행이 들어왔을 때 바로 전송 시도
+    - on_change(summary) 는 dispatch 로 전달 (GUI 는 root.after)
+      summary: pending/sent/dead 누적 수 + 이번 묶음의 sent_now/retry_now/dead_now, failures, auth_required
+    """
+    def __init__(self, db_path, client=None, dispatch=None, on_change=None, batch_size=32,
+                 base_delay=2.0, max_delay=300.0, idle_wait=30.0, keep_sent_days=30):
+        self.db_path = db_path
+        self.client = client
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.on_change = on_change
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_wait = idle_wait
+        self.keep_sent_days = keep_sent_days
+        self.counts = {'pending': 0, 'sent': 0, 'dead': 0, 'failed': 0}
+        self.auth_required = False
+        self._errors = 0
+        self._down_since = None
+        self._down_failures = 0
+        self._backoff_until = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        metrics.gauge('outbox_pending', lambda: self.counts['pending'])
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="imu-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def set_client(self, client):
+        self.client = client
+        self.auth_required = False
+        self._backoff_until = 0.0
+        self.wake()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def backoff(self, attempts):
+        """attempts 번째 실패 뒤 대기 시간 (지수 증가, 상한 max_delay, 50~100% 지터)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    # ----------------- 전송 스레드 -----------------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            create_outbox_schema(conn)
+            if self.keep_sent_days:
+                conn.execute("DELETE FROM upload_outbox WHERE status='sent' AND sent_at < datetime('now', ?)",
+                             (f"-{int(self.keep_sent_days)} days",))
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"❌ 업로드 대기열 DB 열기 실패: {e}")
+            return
+        try:
+            self._publish(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️ 업로드 대기열 상태 조회 실패: {e}")
+        try:
+            while not self._stop.is_set():
+                try:
+                    wait = self._step(conn)
+                    self._errors = 0
+                except sqlite3.Error as e:
+                    # database is locked 등 - 잠시 뒤 같은 연결로 다시 시도
+                    self._errors += 1
+                    wait = self.backoff(self._errors)
+                    print(f"⚠️ 업로드 대기열 DB 오류 ({self._errors}회째, {wait:.1f}초 후 재시도): {e}")
+                except Exception as e:
+                    self._errors += 1
+                    wait = self.backoff(self._errors)
+                    print(f"❌ 업로드 대기열 전송 오류 ({self._errors}회째, {wait:.1f}초 후 재시도): {e!r}")
+                if wait is None:
+                    continue
+                self._wake.wait(wait)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+    def _step(self, conn):
+        """한 번 처리 → 다음 시도까지 대기 시간 (None 이면 바로 다음 묶음)"""
+        wait = self.idle_wait
+        client = self.client
+        if client is None or self.auth_required:
+            return wait
+        now = time.time()
+        if now < self._backoff_until:
+            return self._backoff_until - now
+        rows = conn.execute(
+            "SELECT id, idempotency_key, path, payload, label, attempts FROM upload_outbox "
+            "WHERE status='pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (now, self.batch_size)).fetchall()
+        if rows:
+            self._send(conn, client, rows)
+            return None
+        nxt = conn.execute("SELECT MIN(next_attempt_at) FROM upload_outbox "
+                           "WHERE status='pending'").fetchone()[0]
+        if nxt is not None:
+            wait = min(wait, max(0.0, nxt - now))
+        return wait
+
+    def _send(self, conn, client, rows):
+        by_path = {}
+        broken = []
+        for row in rows:
+            try:
+                payload = json.loads(row[3])
+            except ValueError as e:
+                broken.append((f"payload 해석 실패: {e}", row[0]))
+                continue
+            by_path.setdefault(row[2], []).append((row, payload, {'Idempotency-Key': row[1]}))
+        if broken:
+            with conn:
+                conn.executemany("UPDATE upload_outbox SET status='failed', last_error=? WHERE id=?", broken)
+            print(f"⚠️ 업로드 대기열: payload 가 손상된 {len(broken)}개 행을 failed 로 표시")
+        results = []
+        for path, items in by_path.items():
+            results.extend(client.upload_all(items, path))
+
+        now = time.time()
+        outcome = {'sent': [], 'retry': [], 'dead': [], 'auth': []}
+        for r in results:
+            outcome[classify(r)].append(r)
+        with conn:
+            conn.executemany("UPDATE upload_outbox SET status='sent', attempts=attempts+1, last_status=?, "
+                             "last_error=NULL, sent_at=CURRENT_TIMESTAMP WHERE id=?",
+                             [(r.status, r.key[0]) for r in outcome['sent']])
+            conn.executemany("UPDATE upload_outbox SET attempts=?, next_attempt_at=?, last_status=?, last_error=? "
+                             "WHERE id=?",
+                             [(r.key[5] + 1, now + self.backoff(r.key[5] + 1), r.status, r.detail, r.key[0])
+                              for r in outcome['retry']])
+            conn.executemany("UPDATE upload_outbox SET status='dead', attempts=attempts+1, last_status=?, "
+                             "last_error=? WHERE id=?",
+                             [(r.status, r.detail, r.key[0]) for r in outcome['dead']])
+            conn.executemany("UPDATE upload_outbox SET last_status=?, last_error=? WHERE id=?",
+                             [(r.status, r.detail, r.key[0]) for r in outcome['auth']])
+        metrics.count('outbox_sent', len(outcome['sent']))
+        metrics.count('outbox_retry', len(outcome['retry']))
+
+        if outcome['auth']:
+            self.auth_required = True
+            print("⚠️ API 인증 실패 - 다시 로그인할 때까지 업로드 대기열 전송 중지")
+        # 묶음 전체가 연결 실패 → 서버 다운으로 보고 대기열 전체 백오프
+        if results and all(r.status is None for r in results):
+            self._down_failures += 1
+            self._backoff_until = now + self.backoff(self._down_failures)
+            if self._down_since is None:
+                self._down_since = now
+                print(f"⚠️ API 서버 연결 실패 - 업로드 대기열 재시도 대기 ({results[0].detail})")
+        elif self._down_since is not None:
+            print(f"✅ API 서버 연결 복구 ({now - self._down_since:.0f}초 만)")
+            self._down_since = None
+            self._down_failures = 0
+
+        failures = [f"{r.key[4]}: {r.status} {r.detail}" for r in outcome['dead']]
+        self._publish(conn, sent_now=len(outcome['sent']), retry_now=len(outcome['retry']),
+                      dead_now=len(outcome['dead']), failures=failures)
+
+    def _publish(self, conn, **batch):
+        self.counts = outbox_counts(conn)
+        if self.on_change is None:
+            return
+        summary = dict(self.counts, auth_required=self.auth_required, server_down=self._down_since is not None,
+                       sent_now=0, retry_now=0, dead_now=0, failures=[])
+        summary.update(batch)
+        self.dispatch(lambda: self.on_change(summary))
+
+
+def _main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="API 업로드 대기열 상태 확인")
+    ap.add_argument("db", nargs="?", default="imu_analysis.db")
+    ap.add_argument("--requeue-dead", action="store_true", help="dead 행을 다시 전송 대상으로")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    with conn:
+        create_outbox_schema(conn)
+        if args.requeue_dead:
+            print(f"되돌린 행: {requeue_dead(conn)}")
+    print(outbox_counts(conn))
+    for row in conn.execute("SELECT id, label, attempts, last_status, last_error FROM upload_outbox "
+                            "WHERE status != 'sent' ORDER BY id LIMIT 20"):
+        print(row)
+    conn.close()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+# imu_plot.py
+"""
+8개 센서 대시보드용 증분(blit) 플로터
+
+- Roll/Pitch/Yaw 라인 24개와 범례는 최초 1회만 생성
+- 매 주기마다 set_data 로 데이터만 교체하고, 변경된 축만 배경 복원 → 라인 draw → blit
+- 축 범위가 데이터를 벗어날 때만 전체 canvas.draw() (여유분을 두고 확장하므로 드묾)
+- 라인 데이터는 축 픽셀 폭 정도로 줄여서 전달 (구간별 min/max 를 남겨 스파이크/피크 유지)
+  → 버퍼 용량(MAX_RECORDS)이 커져도 프레임당 그리는 점 수는 일정
+- RenderGovernor: 그리기 시간을 재서 갱신 주기를 정하고, 새 데이터가 없으면 그리지 않음
+"""
+import time
+
+import numpy as np
+
+AXES_LABELS = ('Roll', 'Pitch', 'Yaw')
+
+
+def minmax_indices(y, n_bins):
+    """
+    y 를 n_bins 개 구간으로 나눠 구간마다 최소/최대 위치만 남긴 인덱스 (시간순)
+    줄일 필요가 없으면 None. 구간은 최신 샘플 기준으로 맞추고 남는 가장 오래된 몇 개는 그대로 둠
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    n_bins = int(n_bins)
+    if n_bins < 1 or n <= 2 * n_bins:
+        return None
+    k = n // n_bins
+    off = n - n_bins * k
+    block = y[off:].reshape(n_bins, k)
+    nan = np.isnan(block)
+    i_min = np.argmin(np.where(nan, np.inf, block), axis=1)
+    i_max = np.argmax(np.where(nan, -np.inf, block), axis=1)
+    base = off + np.arange(n_bins) * k
+    pairs = np.column_stack((base + np.minimum(i_min, i_max), base + np.maximum(i_min, i_max)))
+    idx = np.concatenate((np.arange(off), pairs.ravel()))
+    # 현재 값(마지막 샘플)은 항상 표시
+    if idx[-1] != n - 1:
+        idx = np.append(idx, n - 1)
+    return idx
+
+
+class BlitPlotter:
+    def __init__(self, canvas, axes, line_colors, line_kw=None, legend_kw=None, decimate=True):
+        self.canvas = canvas
+        self.axes = list(axes)
+        # 라인당 최대 점 수 ≈ 축 픽셀 폭 (구간 = 2픽셀, 구간마다 min/max 2점)
+        self.decimate = decimate
+        line_kw = dict(line_kw or {})
+        # blit 미지원 백엔드에서는 일반 아티스트로 두고 매번 전체 draw
+        self.blit = bool(canvas.supports_blit)
+        self.lines = []
+        for ax in self.axes:
+            lines = [ax.plot([], [], color=c, label=lbl, animated=self.blit, **line_kw)[0]
+                     for c, lbl in zip(line_colors, AXES_LABELS)]
+            self.lines.append(lines)
+            if legend_kw is not None:
+                ax.legend(handles=lines, **legend_kw)
+        self._backgrounds = [None] * len(self.axes)
+        self._last = [None] * len(self.axes)
+        self.t0 = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    # ----------------- 공개 API -----------------
+    def reset(self):
+        """데이터/축 범위 초기화 (다음 draw 에서 배경 재캡처)"""
+        self.t0 = None
+        self._last = [None] * len(self.axes)
+        for ax, lines in zip(self.axes, self.lines):
+            for ln in lines:
+                ln.set_data([], [])
+            ax.set_xlim(0, 1)
+            ax.set_ylim(-1, 1)
+
+    def update(self, series):
+        """
+        series: {sn: (t, roll, pitch, yaw)}  t 는 epoch 초 배열
+        변경된 센서만 다시 그림. 실제로 그린 센서 수 반환
+        """
+        if not series:
+            return 0
+        if self.t0 is None:
+            self.t0 = min(float(s[0][0]) for s in series.values() if len(s[0]))
+
+        changed, relimit = [], False
+        for sn, (t, *ys) in series.items():
+            if sn >= len(self.axes) or not len(t):
+                continue
+            key = (len(t), float(t[-1]))
+            if key == self._last[sn]:
+                continue
+            self._last[sn] = key
+            x = t - self.t0
+            n_bins = int(self.axes[sn].bbox.width) // 2 if self.decimate else 0
+            for ln, y in zip(self.lines[sn], ys):
+                idx = minmax_indices(y, n_bins) if n_bins else None
+                if idx is None:
+                    ln.set_data(x, y)
+                else:
+                    ln.set_data(x[idx], y[idx])
+            relimit |= self._ensure_limits(self.axes[sn], x, ys)
+            changed.append(sn)
+
+        if not changed:
+            return 0
+        if relimit or not self.blit or any(bg is None for bg in self._backgrounds):
+            # 전체 다시 그리기 → draw_event 에서 배경 캡처 + 라인 그리기
+            self.canvas.draw()
+        else:
+            for sn in changed:
+                self._blit_axes(sn)
+            self.canvas.flush_events()
+        return len(changed)
+
+    # ----------------- 내부 -----------------
+    @staticmethod
+    def _ensure_limits(ax, x, ys):
+        """데이터가 현재 범위를 벗어나면 여유를 두고 확장. 변경 여부 반환"""
+        changed = False
+        x_lo, x_hi = float(x[0]), float(x[-1])
+        cur_lo, cur_hi = ax.get_xlim()
+        if x_lo < cur_lo or x_hi > cur_hi:
+            span = max(x_hi - x_lo, 1.0)
+            ax.set_xlim(x_lo, x_hi + 0.25 * span)
+            changed = True
+
+        stacked = np.concatenate([np.asarray(y, dtype=np.float64) for y in ys])
+        finite = stacked[np.isfinite(stacked)]
+        if finite.size:
+            y_lo, y_hi = float(finite.min()), float(finite.max())
+            cur_lo, cur_hi = ax.get_ylim()
+            if y_lo < cur_lo or y_hi > cur_hi:
+                pad = max(0.2 * (y_hi - y_lo), 1.0)
+                ax.set_ylim(y_lo - pad, y_hi + pad)
+                changed = True
+        return changed
+
+    def _on_draw(self, event):
+        if not self.blit:
+            return
+        for i, ax in enumerate(self.axes):
+            self._backgrounds[i] = self.canvas.copy_from_bbox(ax.bbox)
+            for ln in self.lines[i]:
+                ax.draw_artist(ln)
+
+    def _blit_axes(self, sn):
+        ax = self.axes[sn]
+        self.canvas.restore_region(self._backgrounds[sn])
+        for ln in self.lines[sn]:
+            ax.draw_artist(ln)
+        self.canvas.blit(ax.bbox)
+
+
+class RenderGovernor:
+    """
+    그래프 갱신 주기 조절 (GUI update_plot 의 root.after 간격)
+
+    - 그리기 시간(지수 평균)의 1/budget 배를 다음 주기로 사용 → UI 스레드에서 그리기가 차지하는 비율 ≤ budget
+      (min_interval ~ max_interval 초 범위, 느린 PC 에서는 주기가 늘어나 입력/버튼이 계속 반응)
+    - changed(buffer): 버퍼 커서/샘플 수가 지난 그리기 이후 그대로면 False (복사·그리기 생략)
+    - summary(): 상태바 표시용 'FPS | draw ms'
+    """
+    def __init__(self, min_interval=0.05, max_interval=1.0, budget=0.3, smoothing=0.2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        self.smoothing = smoothing
+        self.draw_time = None
+        self.fps = 0.0
+        self.skipped = 0
+        self._key = None
+        self._frames = 0
+        self._window_start = time.monotonic()
+
+    def changed(self, buffer):
+        """buffer lock 안에서 호출"""
+        key = (buffer.totals().tobytes(), len(buffer))
+        if key == self._key:
+            self.skipped += 1
+            return False
+        self._key = key
+        return True
+
+    def invalidate(self):
+        """다음 주기에 데이터가 그대로여도 다시 그림 (그래프 초기화 후)"""
+        self._key = None
+
+    def record(self, seconds):
+        """실제로 그린 프레임 하나의 소요 시간"""
+        if self.draw_time is None:
+            self.draw_time = seconds
+        else:
+            self.draw_time += self.smoothing * (seconds - self.draw_time)
+        self._frames += 1
+
+    def interval_ms(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._frames / elapsed
+            self._frames = 0
+            self._window_start = now
+        if self.draw_time is None:
+            return int(self.min_interval * 1000)
+        interval = min(self.max_interval, max(self.min_interval, self.draw_time / self.budget))
+        return int(interval * 1000)
+
+    def summary(self):
+        draw_ms = 0.0 if self.draw_time is None else self.draw_time * 1000
+        return f"{self.fps:.1f} FPS | draw {draw_ms:.0f} ms"
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+# imu_protocol.py
+"""
+IMU_connect.ino 전송 프레임 (JSON / 바이너리) 파싱과 링크 상태 추적
+
+바이너리 프레임 (BINARY_FRAMES=1) = 16바이트 헤더 [+ 채널별 t_us] + 채널 × 필드 값 (little-endian)
+    magic    2s   b'IM'
+    version  u8   1 = t_us 없음, 2 = 헤더 뒤에 채널별 u32 t_us
+    format   u8   0 = float32, 1 = int16 고정소수점 (값 × scale)
+    nch      u8   채널 수 (채널 id = 0..nch-1)
+    nfields  u8   6 (ROLL, PITCH, YAW, X_DEL_ANG, Y_DEL_ANG, Z_DEL_ANG)
+    scale    u16  int16 형식의 배율 (float32 는 1)
+    seq      u32  프레임 번호 (전송마다 +1)
+    micros   u32  전송 시점 micros()
+
+JSON 프레임: {"seq": N, "t_us": M, "sensors": [{"id":.., "t_us":.., "ROLL":.., ...}, ...]}
+(seq / t_us 가 없는 이전 펌웨어 형식도 그대로 처리)
+
+encode_frame 은 펌웨어 없이 GUI/테스트를 돌리기 위한 기준 구현
+"""
+import json
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from imu_buffer import FIELDS
+
+MAGIC = b'IM'
+VERSION = 2
+FMT_F32 = 0
+FMT_I16 = 1
+I16_SCALE = 100     # 0.01 단위 (JSON 전송의 소수 둘째 자리와 동일)
+
+HEADER = struct.Struct('<2sBBBBHII')
+_DTYPES = {FMT_F32: np.dtype('<f4'), FMT_I16: np.dtype('<i2')}
+_TUS = np.dtype('<u4')
+
+# ids: (k,) 센서 id, values: (k, 6) FIELDS 순서, t_us: (k,) 채널별 마지막 샘플 micros 또는 None
+Frame = namedtuple('Frame', ['seq', 'micros', 'ids', 'values', 't_us'])
+
+
+class FrameError(ValueError):
+    pass
+
+
+def is_binary(message):
+    return isinstance(message, (bytes, bytearray, memoryview))
+
+
+def encode_frame(values, seq=0, micros=0, t_us=None, fmt=FMT_F32, scale=I16_SCALE, version=VERSION):
+    """values: (nch, 6) FIELDS 순서 → 바이너리 프레임 bytes (t_us 생략 시 micros 사용)"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2 or values.shape[1] != len(FIELDS):
+        raise FrameError(f"values 형태 오류: {values.shape}")
+    if fmt == FMT_F32:
+        scale = 1
+        payload = values.astype('<f4')
+    elif fmt == FMT_I16:
+        # 펌웨어와 동일하게 범위를 넘는 값은 포화
+        payload = np.clip(np.rint(values * scale), -32768, 32767).astype('<i2')
+    else:
+        raise FrameError(f"알 수 없는 format: {fmt}")
+    header = HEADER.pack(MAGIC, version, fmt, values.shape[0], values.shape[1], scale,
+                         seq & 0xFFFFFFFF, micros & 0xFFFFFFFF)
+    if version == 1:
+        return header + payload.tobytes()
+    if t_us is None:
+        t_us = np.full(values.shape[0], micros)
+    stamps = (np.asarray(t_us, dtype=np.int64) & 0xFFFFFFFF).astype(_TUS)
+    return header + stamps.tobytes() + payload.tobytes()
+
+
+def decode_frame(buf):
+    """바이너리 프레임 → Frame (values 는 float64)"""
+    if len(buf) < HEADER.size:
+        raise FrameError(f"프레임 길이 부족: {len(buf)}")
+    magic, version, fmt, nch, nfields, scale, seq, micros = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise FrameError(f"magic 불일치: {magic!r}")
+    if version not in (1, 2):
+        raise FrameError(f"지원하지 않는 버전: {version}")
+    dtype = _DTYPES.get(fmt)
+    if dtype is None:
+        raise FrameError(f"알 수 없는 format: {fmt}")
+    offset = HEADER.size
+    t_us = None
+    if version >= 2:
+        if len(buf) < offset + nch * _TUS.itemsize:
+            raise FrameError(f"t_us 길이 부족: {len(buf)}")
+        t_us = np.frombuffer(buf, dtype=_TUS, count=nch, offset=offset).astype(np.int64)
+        offset += nch * _TUS.itemsize
+    count = nch * nfields
+    if len(buf) < offset + count * dtype.itemsize:
+        raise FrameError(f"페이로드 길이 부족: {len(buf)}")
+    raw = np.frombuffer(buf, dtype=dtype, count=count, offset=offset).reshape(nch, nfields)
+    values = raw.astype(np.float64)
+    if fmt == FMT_I16:
+        values /= scale
+    return Frame(seq, micros, np.arange(nch), values, t_us)
+
+
+def decode_json(message):
+    """JSON 텍스트 프레임 → Frame (단일 센서 dict 형식 포함)"""
+    msg = json.loads(message)
+    sensors = msg['sensors'] if 'sensors' in msg else [msg]
+    ids, rows, stamps = [], [], []
+    for rec in sensors:
+        sn = rec.get('id', rec.get('SN'))
+        if sn is None:
+            continue
+        ids.append(int(sn))
+        rows.append([rec.get(f, np.nan) for f in FIELDS])
+        stamps.append(rec.get('t_us', msg.get('t_us')))
+    values = np.array(rows, dtype=np.float64).reshape(len(ids), len(FIELDS))
+    t_us = np.array(stamps, dtype=np.int64) if stamps and None not in stamps else None
+    return Frame(msg.get('seq'), msg.get('t_us'), np.array(ids, dtype=np.int64), values, t_us)
+
+
+def parse_message(message):
+    """WebSocket 메시지(bytes 또는 str) → Frame"""
+    if is_binary(message):
+        return decode_frame(message)
+    return decode_json(message)
+
+
+class LinkTracker:
+    """
+    프레임 번호/장치 시각 추적 + 링 버퍼 기록
+
+    - seq 가 건너뛰면 빠진 프레임 수를 dropped 에 누적 (u32 wrap 고려)
+    - 늦게 온 프레임은 reordered 로 세고 그대로 기록, 같은 seq 중복 프레임은 버림
+    - 채널별 micros(u32, 약 71.6분마다 wrap)를 펼쳐 device_time(초)로 기록
+    - seq 가 0 으로 돌아오면 장치 재시작으로 보고 상태 초기화
+    - 연결이 끊긴 동안은 gaps 에 (마지막 수신 시각, 재연결 후 첫 수신 시각) 으로 기록
+    """
+    WRAP = 1 << 32
+
+    def __init__(self, n_sensors=8):
+        self.n_sensors = n_sensors
+        self.reset()
+
+    def reset(self):
+        self.last_seq = None
+        self.received = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.gaps = []
+        self.last_rx = None
+        self._gap_start = None
+        self._last_us = np.full(self.n_sensors, -1, dtype=np.int64)
+        self._wraps = np.zeros(self.n_sensors, dtype=np.int64)
+
+    @property
+    def gap_seconds(self):
+        return sum(end - start for start, end in self.gaps)
+
+    def gap_intervals(self, now):
+        """기록된 끊김 구간 + 아직 재연결되지 않은 구간 (now 까지)"""
+        if self._gap_start is None:
+            return list(self.gaps)
+        return self.gaps + [(self._gap_start, now)]
+
+    def disconnected(self, ts):
+        """연결 끊김 표시. 다음 ingest 에서 끊긴 구간을 gaps 에 기록 (수신 전 끊김은 무시)"""
+        if self.last_rx is not None and self._gap_start is None:
+            self._gap_start = self.last_rx
+
+    @property
+    def loss_rate(self):
+        expected = self.received + self.dropped
+        return self.dropped / expected if expected else 0.0
+
+    def update_seq(self, seq):
+        """프레임 번호 반영. 이번 프레임 앞에서 빠진 프레임 수 반환 (중복 프레임이면 None)"""
+        if seq is None:
+            return 0
+        seq = int(seq)
+        gap = 0
+        if self.last_seq is not None:
+            d = (seq - self.last_seq) % self.WRAP
+            if seq == 0 and d != 1:
+                self._restart()
+            elif d == 0:
+                self.duplicates += 1
+                return None
+            elif d >= self.WRAP // 2:
+                # 늦게 도착: 이미 빠진 것으로 센 프레임이면 되돌림
+                self.reordered += 1
+                self.received += 1
+                self.dropped = max(self.dropped - 1, 0)
+                return 0
+            else:
+                gap = d - 1
+                self.dropped += gap
+        self.received += 1
+        self.last_seq = seq
+        return gap
+
+    def device_time(self, ids, t_us):
+        """채널별 u32 micros → 펼친 장치 시각(초). t_us 가 없으면 NaN"""
+        if t_us is None:
+            return np.nan
+        t = np.asarray(t_us, dtype=np.int64)
+        last = self._last_us[ids]
+        wrapped = (last >= 0) & (t < last) & (last - t > self.WRAP // 2)
+        self._wraps[ids] += wrapped
+        self._last_us[ids] = t
+        return (t + self._wraps[ids] * self.WRAP) / 1e6
+
+    def ingest(self, buffer, frame, ts):
+        """Frame 을 링 버퍼에 기록. 기록한 센서 수 반환 (호출 측에서 buffer lock 보유)"""
+        if self._gap_start is not None:
+            self.gaps.append((self._gap_start, ts))
+            self._gap_start = None
+        self.last_rx = ts
+        if self.update_seq(frame.seq) is None:
+            return 0
+        keep = (frame.ids >= 0) & (frame.ids < min(self.n_sensors, buffer.n_sensors))
+        ids = frame.ids[keep]
+        if ids.size == 0:
+            return 0
+        t_us = None if frame.t_us is None else frame.t_us[keep]
+        seq = np.nan if frame.seq is None else frame.seq
+        buffer.append_block(ids, ts, frame.values[keep],
+                            device_time=self.device_time(ids, t_us), seq=seq)
+        return int(ids.size)
+
+    def _restart(self):
+        self.last_seq = None
+        self._last_us.fill(-1)
+        self._wraps.fill(0)
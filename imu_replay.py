@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+# imu_replay.py
+"""
+WebSocket 수신 프레임 녹화/재생
+
+- FrameRecorder: 수신한 원본 메시지(JSON 텍스트/바이너리)를 수신 시각과 함께 append-only 파일에 기록
+- ReplaySource : 녹화 파일을 websocket.WebSocketApp 과 같은 콜백/메서드로 재생 (1×, N×, 최대 속도)
+                 GUI 의 on_message → update_plot → predict 경로를 장비 없이 그대로 사용
+- recv_time    : 재생 중 현재 프레임의 수신 시각 (원본 간격 유지). GUI 는 있으면 time.time() 대신 사용
+
+파일 형식 (.imurec)
+    b'IMUREC1\\n' + 레코드 반복
+    레코드 = <d 수신시각(epoch 초)> <B 종류 0=텍스트, 1=바이너리> <I 길이> + 페이로드
+    (마지막 레코드가 잘려 있으면 그 앞까지만 읽음)
+
+사용 예)
+    python imu_replay.py record ws://10.200.246.81:81 -o capture.imurec --duration 60
+    python imu_replay.py info capture.imurec
+    python imu_replay.py bench capture.imurec [--speed 0] [--model model.pkl]
+"""
+import struct
+import threading
+import time
+
+FILE_MAGIC = b'IMUREC1\n'
+RECORD = struct.Struct('<dBI')
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+
+class FrameRecorder:
+    """수신 메시지 녹화 (여러 스레드에서 write 해도 안전)"""
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(FILE_MAGIC)
+        self._last_flush = time.monotonic()
+
+    def write(self, message, ts=None):
+        if isinstance(message, str):
+            kind, payload = KIND_TEXT, message.encode('utf-8')
+        else:
+            kind, payload = KIND_BINARY, bytes(message)
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(ts, kind, len(payload)))
+            self._file.write(payload)
+            self.count += 1
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_records(path):
+    """녹화 파일 → (수신시각, 메시지) 제너레이터 (텍스트는 str, 바이너리는 bytes)"""
+    with open(path, 'rb') as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"녹화 파일 형식이 아닙니다: {path}")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            ts, kind, length = RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield ts, (payload.decode('utf-8') if kind == KIND_TEXT else payload)
+
+
+class ReplaySource:
+    """
+    녹화 파일 재생기 (websocket.WebSocketApp 대체)
+
+    - speed: 1.0 = 실시간, N = N배속, 0 = 대기 없이 최대 속도
+    - run_forever() 는 재생이 끝나거나 close() 될 때까지 블록 (GUI 는 기존처럼 별도 스레드에서 호출)
+    """
+    def __init__(self, path, on_open=None, on_message=None, on_error=None, on_close=None, speed=1.0):
+        self.path = path
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_error = on_error
+        self.on_close = on_close
+        self.speed = speed
+        self.recv_time = None
+        self.sent = 0
+        self._stop = threading.Event()
+
+    def run_forever(self, **kwargs):
+        self._stop.clear()
+        try:
+            if self.on_open:
+                self.on_open(self)
+            first = wall0 = mono0 = None
+            for rec_ts, message in read_records(self.path):
+                if self._stop.is_set():
+                    break
+                if first is None:
+                    first, wall0, mono0 = rec_ts, time.time(), time.monotonic()
+                rel = rec_ts - first
+                if self.speed:
+                    wait = mono0 + rel / self.speed - time.monotonic()
+                    if wait > 0 and self._stop.wait(wait):
+                        break
+                # 재생 속도와 무관하게 원본 수신 간격을 유지한 시각
+                self.recv_time = wall0 + rel
+                if self.on_message:
+                    self.on_message(self, message)
+                self.sent += 1
+        except Exception as e:
+            if self.on_error:
+                self.on_error(self, e)
+        finally:
+            if self.on_close:
+                self.on_close(self, None, None)
+
+    def close(self, **kwargs):
+        self._stop.set()
+
+
+# ----------------- CLI -----------------
+def _record(args):
+    import websocket
+
+    recorder = FrameRecorder(args.output)
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def on_message(ws, message):
+        recorder.write(message)
+        if deadline and time.monotonic() >= deadline:
+            ws.close()
+
+    ws = websocket.WebSocketApp(args.url, on_message=on_message,
+                                on_error=lambda ws, e: print("WebSocket 오류:", e))
+    try:
+        ws.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    print(f"✅ {recorder.count:,}개 프레임 녹화: {args.output}")
+
+
+def _info(args):
+    n = n_bin = size = 0
+    first = last = None
+    for ts, message in read_records(args.path):
+        n += 1
+        n_bin += not isinstance(message, str)
+        size += len(message)
+        first = ts if first is None else first
+        last = ts
+    span = (last - first) if n else 0.0
+    print(f"프레임 {n:,}개 (바이너리 {n_bin:,}) / {span:.1f}초 / 평균 {size / max(n, 1):.0f}바이트"
+          + (f" / {(n - 1) / span:.1f} Hz" if span > 0 else ""))
+
+
+def _bench(args):
+    import numpy as np
+
+    from imu_buffer import IMURingBuffer
+    from imu_features import FEATURE_COLUMNS, extract_features
+    from imu_protocol import LinkTracker, parse_message
+
+    buffer = IMURingBuffer(n_sensors=8, capacity=args.capacity)
+    link = LinkTracker(n_sensors=8)
+    lock = threading.Lock()
+    latencies = []
+    samples = [0]
+
+    def on_message(ws, message):
+        t0 = time.perf_counter()
+        frame = parse_message(message)
+        with lock:
+            samples[0] += link.ingest(buffer, frame, ws.recv_time)
+        latencies.append(time.perf_counter() - t0)
+
+    src = ReplaySource(args.path, on_message=on_message, speed=args.speed,
+                       on_error=lambda ws, e: print("재생 오류:", e))
+    t_start = time.perf_counter()
+    src.run_forever()
+    elapsed = time.perf_counter() - t_start
+
+    lat = np.array(latencies) * 1e6
+    print(f"프레임 {src.sent:,}개 / {elapsed:.3f}초 → {src.sent / max(elapsed, 1e-9):,.0f} 프레임/s, "
+          f"{samples[0] / max(elapsed, 1e-9):,.0f} 샘플/s")
+    if lat.size:
+        print(f"수신 처리 지연: p50 {np.percentile(lat, 50):.1f}us / p99 {np.percentile(lat, 99):.1f}us / "
+              f"max {lat.max():.1f}us")
+    print(f"손실 {link.dropped:,} ({link.loss_rate:.2%}), 순서 뒤바뀜 {link.reordered:,}, 중복 {link.duplicates:,}")
+
+    if args.model:
+        import joblib
+        import pandas as pd
+
+        pipeline = joblib.load(args.model)
+        t0 = time.perf_counter()
+        sensor_ids, X = extract_features(buffer.columns())
+        pred = pipeline.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS)) if len(X) else []
+        print(f"특성 추출 + 추론: {(time.perf_counter() - t0) * 1000:.1f}ms")
+        for sn, p in zip(sensor_ids.tolist(), pred):
+            print(f"  센서 {sn}: {np.round(np.ravel(p), 3).tolist()}")
+
+
+def _main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="IMU WebSocket 프레임 녹화/재생")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("record", help="장비에서 수신한 프레임 녹화")
+    p.add_argument("url", help="예: ws://10.200.246.81:81")
+    p.add_argument("-o", "--output", default="capture.imurec")
+    p.add_argument("--duration", type=float, default=0, help="녹화 시간(초), 0 = Ctrl+C 까지")
+    p.set_defaults(func=_record)
+
+    p = sub.add_parser("info", help="녹화 파일 요약")
+    p.add_argument("path")
+    p.set_defaults(func=_info)
+
+    p = sub.add_parser("bench", help="녹화 파일을 GUI 와 같은 수신 경로로 재생하며 처리량/지연 측정")
+    p.add_argument("path")
+    p.add_argument("--speed", type=float, default=0, help="재생 배속 (0 = 최대 속도)")
+    p.add_argument("--capacity", type=int, default=1250, help="센서별 링 버퍼 용량")
+    p.add_argument("--model", help="재생 후 마지막 창으로 예측할 모델(.pkl)")
+    p.set_defaults(func=_bench)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    _main()
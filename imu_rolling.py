@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+# imu_rolling.py
+"""
+연속(rolling) 드리프트 진단용 특성 갱신 + 고장 판정 히스테리시스
+
+- RollingFeatures: 센서별 최근 WINDOW_LENGTH 초 창의 특성 9개를 새 샘플만 반영해 갱신
+  - 평균 특성(p5/q5/r5/Rdot5/Pdot5/Ydot5): 창에 들어온 샘플은 누적합에 더하고, 창 밖으로 나간 샘플은 뺌
+  - 변화율 특성(Rd5/Pd5/Yd5): 창의 첫/마지막 샘플 (끝점) 만 사용
+  - 링 버퍼의 totals() 커서로 지난 갱신 이후 샘플만 읽음 → 매 갱신마다 전체 버퍼/DataFrame 을 다시 만들지 않음
+  - 특성 정의는 imu_features.extract_features 와 동일 (창 위치만 '첫 샘플 +1~+5초' 대신 '최근 4초')
+- FaultHysteresis: 고장 진입은 threshold 초과, 해제는 threshold - hysteresis 이하,
+  상태 변경은 confirm 회 연속으로 같은 판정이 나와야 반영 (경계값 근처에서 판정이 깜빡이지 않도록)
+"""
+import numpy as np
+
+from imu_features import FEATURE_COLUMNS, WINDOW_LENGTH, euler_rates
+
+# 창 샘플 한 행: 시각, 끝점용 각도 3개, 평균용 값 (NaN 은 0 + 유효 개수 따로)
+_T, _ROLL, _PITCH, _YAW = 0, 1, 2, 3
+_SUM = slice(4, 13)        # p, q, r, p_ok, q_ok, r_ok, Rdot, Pdot, Ydot
+_NCOL = 13
+
+
+class RollingFeatures:
+    """센서별 최근 length 초 창의 특성 (update(buffer, lock) 로 새 샘플 반영, features() 로 조회)"""
+    def __init__(self, n_sensors=8, length=WINDOW_LENGTH, capacity=4096, resum_every=500):
+        self.n_sensors = int(n_sensors)
+        self.length = float(length)
+        self.capacity = int(capacity)
+        self.resum_every = resum_every
+        self._win = np.zeros((self.n_sensors, self.capacity, _NCOL))
+        self._start = np.zeros(self.n_sensors, dtype=np.int64)
+        self._end = np.zeros(self.n_sensors, dtype=np.int64)
+        self._sums = np.zeros((self.n_sensors, _SUM.stop - _SUM.start))
+        self._evicted = np.zeros(self.n_sensors, dtype=np.int64)
+        self._device_clock = np.zeros(self.n_sensors, dtype=bool)
+        self._cursor = None
+
+    def reset(self, sn=None):
+        """창 비우기 (sn 을 주면 해당 센서만). 버퍼 커서는 유지"""
+        sensors = range(self.n_sensors) if sn is None else [sn]
+        for s in sensors:
+            self._start[s] = self._end[s] = 0
+            self._sums[s] = 0.0
+            self._evicted[s] = 0
+
+    def count(self, sn):
+        return int(self._end[sn] - self._start[sn])
+
+    # ----------------- 갱신 -----------------
+    def update(self, buffer, lock=None):
+        """링 버퍼에서 지난 갱신 이후 추가된 샘플만 읽어 창에 반영. 반영한 샘플 수 반환"""
+        if lock is not None:
+            with lock:
+                cols = self._pull(buffer)
+        else:
+            cols = self._pull(buffer)
+        return self.add(cols)
+
+    def _pull(self, buffer):
+        since = self._cursor if self._cursor is not None else np.zeros(buffer.n_sensors, dtype=np.int64)
+        cols = buffer.columns(since=since)
+        self._cursor = buffer.totals()
+        return cols
+
+    def add(self, cols):
+        """
+        columns() 형식 샘플(SN, timestamp, 각도/각속도, device_time 선택) 을 창에 추가
+        센서별 시간축: 창의 모든 샘플에 device_time 이 있으면 device_time, 아니면 수신 timestamp
+        """
+        sn = np.asarray(cols['SN']).astype(np.int64)
+        if sn.size == 0:
+            return 0
+        x = np.asarray(cols['X_DEL_ANG'], dtype=np.float64)
+        y = np.asarray(cols['Y_DEL_ANG'], dtype=np.float64)
+        z = np.asarray(cols['Z_DEL_ANG'], dtype=np.float64)
+        roll = np.asarray(cols['ROLL'], dtype=np.float64)
+        pitch = np.asarray(cols['PITCH'], dtype=np.float64)
+        rows = np.empty((sn.size, _NCOL))
+        rows[:, _ROLL] = roll
+        rows[:, _PITCH] = pitch
+        rows[:, _YAW] = cols['YAW']
+        for i, v in enumerate((-x, -z, y)):
+            ok = ~np.isnan(v)
+            rows[:, 4 + i] = np.where(ok, v, 0.0)
+            rows[:, 7 + i] = ok
+        rows[:, 10], rows[:, 11], rows[:, 12] = euler_rates(roll, pitch, x, y, z)
+
+        t_rx = np.asarray(cols['timestamp'], dtype=np.float64)
+        t_dev = np.asarray(cols['device_time'], dtype=np.float64) if 'device_time' in cols else None
+        for s in np.unique(sn):
+            if not 0 <= s < self.n_sensors:
+                continue
+            m = sn == s
+            use_device = t_dev is not None and bool(np.all(np.isfinite(t_dev[m])))
+            rows[m, _T] = t_dev[m] if use_device else t_rx[m]
+            self._add_sensor(int(s), rows[m], use_device)
+        return int(sn.size)
+
+    def _add_sensor(self, s, rows, use_device):
+        # 시간축이 바뀌었거나 시각이 되돌아가면(새 세션, 장치 재시작) 창을 새로 시작
+        n = self.count(s)
+        if n and (use_device != self._device_clock[s] or rows[0, _T] < self._win[s, self._end[s] - 1, _T]):
+            self.reset(s)
+        self._device_clock[s] = use_device
+        if rows.shape[0] >= self.capacity:
+            self.reset(s)
+            rows = rows[-(self.capacity - 1):]
+        if self._end[s] + rows.shape[0] > self.capacity:
+            self._compact(s)
+            if self._end[s] + rows.shape[0] > self.capacity:
+                self._evict(s, self._start[s] + rows.shape[0] - (self.capacity - self._end[s]))
+        end = self._end[s] + rows.shape[0]
+        self._win[s, self._end[s]:end] = rows
+        self._end[s] = end
+        self._sums[s] += rows[:, _SUM].sum(axis=0)
+
+        # 최근 length 초 밖으로 나간 샘플 제거
+        win_t = self._win[s, self._start[s]:self._end[s], _T]
+        cut = self._start[s] + int(np.searchsorted(win_t, win_t[-1] - self.length, side='left'))
+        self._evict(s, cut)
+        # 더하고 빼기를 반복하며 쌓이는 부동소수 오차를 주기적으로 정리
+        if self._evicted[s] >= self.resum_every:
+            self._sums[s] = self._win[s, self._start[s]:self._end[s], _SUM].sum(axis=0)
+            self._evicted[s] = 0
+
+    def _evict(self, s, upto):
+        upto = min(int(upto), int(self._end[s]))
+        if upto <= self._start[s]:
+            return
+        self._sums[s] -= self._win[s, self._start[s]:upto, _SUM].sum(axis=0)
+        self._evicted[s] += upto - self._start[s]
+        self._start[s] = upto
+
+    def _compact(self, s):
+        n = self.count(s)
+        self._win[s, :n] = self._win[s, self._start[s]:self._end[s]]
+        self._start[s], self._end[s] = 0, n
+
+    # ----------------- 조회 -----------------
+    def features(self, min_samples=2):
+        """
+        반환: (sensor_ids (k,), X (k, 9), coverage (k,))
+        coverage = 창에 실제로 들어 있는 시간 / length (수집 직후에는 1 보다 작음)
+        샘플 부족/dt=0/비유한 특성 센서는 제외 (extract_features 와 같은 기준)
+        """
+        ids, rows, cover = [], [], []
+        for s in range(self.n_sensors):
+            n = self.count(s)
+            if n < min_samples:
+                continue
+            first = self._win[s, self._start[s]]
+            last = self._win[s, self._end[s] - 1]
+            dt = last[_T] - first[_T]
+            if dt == 0:
+                continue
+            sums = self._sums[s]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(sums[3:6] > 0, sums[0:3] / np.maximum(sums[3:6], 1), np.nan)
+            drift = (last[_ROLL:_YAW + 1] - first[_ROLL:_YAW + 1]) / dt
+            x = np.concatenate((means, drift, sums[6:9] / n))
+            if not np.all(np.isfinite(x)):
+                continue
+            ids.append(s)
+            rows.append(x)
+            cover.append(dt / self.length)
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(FEATURE_COLUMNS))), np.empty(0)
+        return np.array(ids, dtype=np.int64), np.array(rows), np.array(cover)
+
+
+class FaultHysteresis:
+    """센서별 고장 상태 (진입 threshold 초과 / 해제 threshold - hysteresis 이하, confirm 회 연속 시 반영)"""
+    def __init__(self, threshold=3.3, hysteresis=0.3, confirm=2):
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.confirm = max(1, int(confirm))
+        self.state = {}
+        self._streak = {}
+
+    def reset(self):
+        self.state.clear()
+        self._streak.clear()
+
+    def update(self, sn, value):
+        """이번 드리프트 크기 → 반영된 고장 여부"""
+        faulty = self.state.get(sn, False)
+        limit = self.threshold - self.hysteresis if faulty else self.threshold
+        if (abs(value) > limit) == faulty:
+            self._streak[sn] = 0
+            return faulty
+        self._streak[sn] = self._streak.get(sn, 0) + 1
+        if self._streak[sn] >= self.confirm:
+            faulty = not faulty
+            self.state[sn] = faulty
+            self._streak[sn] = 0
+        return faulty
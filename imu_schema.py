@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+# imu_schema.py
+"""
+SQLite 스키마 버전 관리 (PRAGMA user_version)
+
+- 마이그레이션 = (버전, 이름, 단계 목록). 단계는 SQL 문자열 또는 fn(conn)
+- migrate(): user_version 보다 높은 단계만 순서대로, 단계마다 BEGIN IMMEDIATE ~ COMMIT 한 트랜잭션으로 적용
+  (다른 프로세스가 먼저 적용했으면 트랜잭션 안에서 버전을 다시 읽어 건너뜀)
+- 무언가 적용했으면 ANALYZE (analysis_limit 로 큰 DB 에서도 짧게) → 새 인덱스를 쿼리 플래너가 바로 사용
+- ANALYSIS_MIGRATIONS: imu_analysis.db (imu_raw_data / diagnosis_results / measurement_sessions / upload_outbox /
+  imu_raw_blob)
+- smartfactory.db (user / imurecord / imu_code_seq) 는 서버/다른 도구가 소유한 스키마라 버전을 기록하지 않음
+  ensure_legacy_schema(): LEGACY_STEPS 를 매번 IF NOT EXISTS 로 확인만 (user_version / ANALYZE 는 건드리지 않음).
+  서버가 만든 테이블은 그대로 두고, 인덱스는 해당 컬럼이 있을 때만 생성
+
+인덱스 (실제 조회 기준)
+    imu_raw_data       (session_id, sensor_id, timestamp)  세션별 조회/건수 (COUNT DISTINCT sensor_id 까지 인덱스만으로)
+                       (sensor_id, timestamp)              센서별 시간 구간 추이
+    diagnosis_results  (session_id, sensor_id)             세션 결과 조회
+                       (sensor_id, measurement_date, measurement_time, max_drift_value, is_faulty)  센서별 진단 추이 (커버링)
+    measurement_sessions (start_time)                      기간별 세션 목록
+    imu_raw_blob       UNIQUE (session_id, sensor_id, chunk) 세션 읽기 / 다음 조각 번호
+    imurecord          (serial, inspected_at) / (inspected_at)
+
+실행 계획 확인
+    python imu_schema.py imu_analysis.db --explain
+    python imu_schema.py smartfactory.db --legacy --explain
+"""
+import time
+
+from imu_blob import BLOB_SCHEMA
+from imu_outbox import OUTBOX_SCHEMA
+
+ANALYSIS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS imu_raw_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        sensor_id INTEGER NOT NULL,
+        timestamp DATETIME NOT NULL,
+        roll REAL NOT NULL,
+        pitch REAL NOT NULL,
+        yaw REAL NOT NULL,
+        x_del_ang REAL NOT NULL,
+        y_del_ang REAL NOT NULL,
+        z_del_ang REAL NOT NULL,
+        device_time REAL,
+        seq INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS diagnosis_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        sensor_id INTEGER NOT NULL,
+        measurement_date DATE NOT NULL,
+        measurement_time TIME NOT NULL,
+        data_collection_duration REAL NOT NULL,
+        predicted_roll_drift REAL,
+        predicted_pitch_drift REAL,
+        predicted_yaw_drift REAL,
+        max_drift_axis TEXT,
+        max_drift_value REAL,
+        max_drift_signed REAL,
+        is_faulty BOOLEAN NOT NULL,
+        fault_threshold REAL NOT NULL,
+        diagnosis_status TEXT NOT NULL,
+        model_version TEXT,
+        data_quality_score REAL,
+        notes TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS measurement_sessions (
+        session_id TEXT PRIMARY KEY,
+        start_time DATETIME NOT NULL,
+        end_time DATETIME,
+        total_duration REAL,
+        sensor_count INTEGER,
+        total_data_points INTEGER,
+        session_type TEXT,
+        operator_name TEXT,
+        facility_location TEXT,
+        equipment_id TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+# 버전 관리 이전에 만들어진 DB 파일에 나중에 추가된 컬럼 (테이블, 컬럼, 타입)
+ANALYSIS_ADDED_COLUMNS = [
+    ('imu_raw_data', 'device_time', 'REAL'),
+    ('imu_raw_data', 'seq', 'INTEGER'),
+]
+
+ANALYSIS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_raw_session_sensor_time ON imu_raw_data (session_id, sensor_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_raw_sensor_time ON imu_raw_data (sensor_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_diag_session ON diagnosis_results (session_id, sensor_id)",
+    "CREATE INDEX IF NOT EXISTS idx_diag_sensor_time ON diagnosis_results "
+    "(sensor_id, measurement_date, measurement_time, max_drift_value, is_faulty)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_start ON measurement_sessions (start_time)",
+]
+
+LEGACY_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS user (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE,
+        password_hash TEXT,
+        name TEXT,
+        role TEXT DEFAULT 'USER',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS imurecord (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE,
+        serial TEXT,
+        inspected_at DATETIME,
+        passed INTEGER,
+        inspector_id INTEGER,
+        box_no INTEGER,
+        destination TEXT,
+        arrived INTEGER,
+        roll REAL,
+        pitch REAL,
+        yaw REAL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(inspector_id) REFERENCES user(id)
+    )
+    ''',
+]
+
+IMU_CODE_SEQ_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS imu_code_seq (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+'''
+
+# (인덱스 이름, 테이블, 컬럼) - 서버 쪽 스키마에 컬럼이 없으면 건너뜀
+LEGACY_INDEXES = [
+    ('idx_imurecord_serial_time', 'imurecord', ('serial', 'inspected_at')),
+    ('idx_imurecord_time', 'imurecord', ('inspected_at',)),
+]
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_analysis_columns(conn):
+    for table, column, decl in ANALYSIS_ADDED_COLUMNS:
+        if column not in table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# 인덱스 생략 경고를 이미 출력한 (DB 파일, 인덱스) - 저장할 때마다 확인하므로 한 번만 알림
+_skipped_indexes = set()
+
+
+def _create_legacy_indexes(conn):
+    for name, table, columns in LEGACY_INDEXES:
+        existing = table_columns(conn, table)
+        if all(c in existing for c in columns):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            continue
+        key = (conn.execute("PRAGMA database_list").fetchone()[2], name)
+        if key not in _skipped_indexes:
+            _skipped_indexes.add(key)
+            print(f"⚠️ {table} 에 {columns} 컬럼이 없어 인덱스 {name} 생략")
+
+
+ANALYSIS_MIGRATIONS = [
+    (1, "기본 테이블", ANALYSIS_SCHEMA + [_add_analysis_columns]),
+    (2, "API 업로드 대기열", OUTBOX_SCHEMA),
+    (3, "진단 이력 인덱스", ANALYSIS_INDEXES),
+    (4, "원시 데이터 압축 저장", BLOB_SCHEMA),
+]
+
+# smartfactory.db: 버전 없이 매번 확인 (모두 IF NOT EXISTS)
+LEGACY_STEPS = LEGACY_SCHEMA + [IMU_CODE_SEQ_SCHEMA, _create_legacy_indexes]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations, analyze=True, analysis_limit=1000):
+    """
+    user_version 이후 단계 적용 → (이전 버전, 현재 버전)
+    DB 가 코드보다 새 버전이면 아무것도 하지 않음. 호출 측 트랜잭션이 열려 있으면 먼저 commit
+    """
+    before = schema_version(conn)
+    if before >= migrations[-1][0]:
+        return before, before
+    if conn.in_transaction:
+        conn.commit()
+    applied = 0
+    for version, name, steps in migrations:
+        t0 = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+        print(f"DB 스키마 v{version} 적용: {name} ({time.perf_counter() - t0:.2f}초)")
+    if applied and analyze:
+        t0 = time.perf_counter()
+        # analysis_limit: 인덱스마다 표본만 읽음 (수 GB DB 에서도 전체 스캔 없이 통계 생성)
+        conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"DB 통계 갱신(ANALYZE) {time.perf_counter() - t0:.2f}초")
+    return before, schema_version(conn)
+
+
+def create_analysis_schema(conn):
+    """imu_analysis.db 스키마를 최신 버전으로"""
+    return migrate(conn, ANALYSIS_MIGRATIONS)
+
+
+def ensure_legacy_schema(conn):
+    """
+    smartfactory.db 최소 스키마 + 인덱스 확인 (이미 있는 테이블은 건드리지 않음)
+    호출 측 트랜잭션 안에서 실행. PRAGMA user_version 은 서버 쪽 것이므로 읽지도 쓰지도 않음
+    """
+    for step in LEGACY_STEPS:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(step)
+
+
+# ----------------- 실행 계획 확인 -----------------
+ANALYSIS_QUERIES = {
+    '세션 원시 데이터 건수': ("SELECT COUNT(*), COUNT(DISTINCT sensor_id) FROM imu_raw_data WHERE session_id = ?",
+                     ('s',)),
+    '세션 원시 데이터': ("SELECT * FROM imu_raw_data WHERE session_id = ? ORDER BY sensor_id, timestamp", ('s',)),
+    '센서 시간 구간': ("SELECT timestamp, roll, pitch, yaw FROM imu_raw_data "
+                 "WHERE sensor_id = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp", (0, 'a', 'b')),
+    '세션 진단 결과': ("SELECT * FROM diagnosis_results WHERE session_id = ? ORDER BY sensor_id", ('s',)),
+    '센서 진단 추이': ("SELECT measurement_date, measurement_time, max_drift_value, is_faulty FROM diagnosis_results "
+                 "WHERE sensor_id = ? AND measurement_date >= ? ORDER BY measurement_date, measurement_time",
+                 (0, 'a')),
+    '기간별 세션': ("SELECT * FROM measurement_sessions WHERE start_time >= ? ORDER BY start_time", ('a',)),
+}
+
+LEGACY_QUERIES = {
+    '시리얼 이력': ("SELECT * FROM imurecord WHERE serial = ? ORDER BY inspected_at", ('s',)),
+    '기간별 검사': ("SELECT * FROM imurecord WHERE inspected_at BETWEEN ? AND ?", ('a', 'b')),
+}
+
+
+def explain(conn, queries):
+    """{이름: [실행 계획 줄]}"""
+    plans = {}
+    for name, (sql, params) in queries.items():
+        try:
+            plans[name] = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except Exception as e:
+            plans[name] = [f"오류: {e}"]
+    return plans
+
+
+def _main():
+    import argparse
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="SQLite 스키마 마이그레이션 / 실행 계획 확인")
+    ap.add_argument("db")
+    ap.add_argument("--legacy", action="store_true", help="smartfactory.db (user/imurecord)")
+    ap.add_argument("--explain", action="store_true", help="주요 조회의 EXPLAIN QUERY PLAN 출력")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if args.legacy:
+            with conn:
+                ensure_legacy_schema(conn)
+            print("레거시 스키마 확인 완료 (user_version 은 변경하지 않음)")
+        else:
+            before, after = create_analysis_schema(conn)
+            print(f"스키마 버전: v{before} → v{after}")
+        if args.explain:
+            for name, lines in explain(conn, LEGACY_QUERIES if args.legacy else ANALYSIS_QUERIES).items():
+                print(f"- {name}")
+                for line in lines:
+                    print(f"    {line}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+# imu_simulator.py
+"""
+IMU_connect.ino 대역 WebSocket 서버 (부하 시험/개발용)
+
+- 펌웨어와 같은 프레임 전송: JSON {"seq","t_us","sensors":[{id,t_us,X_DEL_ANG,...,YAW}]} 또는 바이너리(imu_protocol)
+- 채널별 자이로 잔여 bias, yaw drift, 잡음, 채널 수, 전송 주기, 고장 주입을 설정
+- 표준 라이브러리 asyncio 로 만든 최소 WebSocket 서버 (imu_ws, 추가 패키지 불필요)
+
+사용 예)
+    python imu_simulator.py --rate 100 --channels 8
+    python imu_simulator.py --rate 1000 --channels 64 --format bin --fault 3:drift:0.5 --fault 5:stuck
+    python "IMU고장진단_GUI__claude.py" --url ws://127.0.0.1:8081
+    python imu_simulator.py --devices 16 --rate 100 --port 9000     (장비 16대, 포트 9000~9015)
+
+고장 (--fault CH:KIND[:VALUE]):
+    drift    yaw drift 를 VALUE deg/s 로 (기본 0.5)
+    stuck    값이 고정됨
+    dropout  해당 채널을 프레임에서 뺌
+    spike    VALUE 확률(기본 0.01)로 ±90° 튐
+    nan      값 대신 NaN (JSON 에서는 null)
+
+연결 끊김 (--disconnect-every S): S 초마다 모든 클라이언트 연결을 끊음 (Wi-Fi 단절 흉내, seq 는 계속 증가)
+"""
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from imu_buffer import FIELDS
+from imu_protocol import FMT_F32, FMT_I16, encode_frame
+from imu_ws import OP_BINARY, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, read_frame, ws_header
+
+FAULT_KINDS = ('drift', 'stuck', 'dropout', 'spike', 'nan')
+
+
+class IMUModel:
+    """
+    채널별 자세/각속도 생성 (펌웨어 송신값과 같은 의미)
+    - X/Y/Z_DEL_ANG: bias 보정 후 각속도(dps) = 잔여 bias + 잡음
+    - ROLL/PITCH: 장착 자세 + 칼만 출력 수준의 잡음
+    - YAW: (Z 잔여 bias + drift) 적분
+    """
+    def __init__(self, channels=8, bias=0.05, drift=0.01, noise=0.02, seed=None, faults=None):
+        self.channels = channels
+        self.rng = np.random.default_rng(seed)
+        self.bias = self.rng.normal(0.0, bias, size=(channels, 3))
+        self.drift = self.rng.normal(0.0, drift, size=channels)
+        self.noise = noise
+        self.attitude = self.rng.normal(0.0, 2.0, size=(channels, 2))   # roll, pitch 장착 오차
+        self.yaw = np.zeros(channels)
+        self.faults = dict(faults or {})
+        self._stuck = {}
+        for ch, (kind, value) in self.faults.items():
+            if kind == 'drift':
+                self.drift[ch] = 0.5 if value is None else value
+
+    def step(self, dt):
+        """dt 초 진행 후 (channels, 6) FIELDS 순서 값 + 포함할 채널 mask 반환"""
+        n = self.channels
+        rates = self.bias + self.rng.normal(0.0, self.noise, size=(n, 3))
+        self.yaw += (rates[:, 2] + self.drift) * dt
+        values = np.empty((n, len(FIELDS)))
+        values[:, 0:2] = self.attitude + self.rng.normal(0.0, self.noise, size=(n, 2))
+        values[:, 2] = self.yaw
+        values[:, 3:6] = rates
+
+        keep = np.ones(n, dtype=bool)
+        for ch, (kind, value) in self.faults.items():
+            if kind == 'stuck':
+                values[ch] = self._stuck.setdefault(ch, values[ch].copy())
+            elif kind == 'dropout':
+                keep[ch] = False
+            elif kind == 'spike':
+                if self.rng.random() < (0.01 if value is None else value):
+                    values[ch, 0:3] += self.rng.choice([-90.0, 90.0])
+            elif kind == 'nan':
+                values[ch] = np.nan
+        return values, keep
+
+
+def parse_fault(text):
+    """'CH:KIND[:VALUE]' → (ch, (kind, value))"""
+    parts = text.split(':')
+    if len(parts) not in (2, 3) or parts[1] not in FAULT_KINDS:
+        raise ValueError(f"고장 형식 오류: {text} (예: 3:drift:0.5, 종류: {', '.join(FAULT_KINDS)})")
+    return int(parts[0]), (parts[1], float(parts[2]) if len(parts) == 3 else None)
+
+
+def json_frame(seq, t_us, values, keep):
+    """펌웨어 broadcastJSON 과 같은 형식 (소수 둘째 자리)"""
+    sensors = []
+    for ch in np.flatnonzero(keep).tolist():
+        rec = {'id': ch, 't_us': int(t_us)}
+        for f, v in zip(FIELDS, values[ch].tolist()):
+            rec[f] = round(v, 2) if v == v else None
+        sensors.append(rec)
+    return json.dumps({'seq': seq, 't_us': int(t_us), 'sensors': sensors}, separators=(',', ':'))
+
+
+# ----------------- 최소 WebSocket 서버 -----------------
+class SimulatorServer:
+    """
+    연결된 모든 클라이언트에 같은 프레임을 broadcast (펌웨어 webSocket.broadcastTXT/BIN 과 동일)
+    송신 버퍼가 max_backlog 바이트를 넘은 느린 클라이언트는 그 프레임을 건너뜀
+    """
+    def __init__(self, model, rate=10.0, fmt='json', host='127.0.0.1', port=8081,
+                 drop_rate=0.0, max_backlog=1 << 20, report_every=5.0, disconnect_every=None):
+        self.model = model
+        self.rate = rate
+        self.fmt = fmt
+        self.host = host
+        self.port = port
+        self.drop_rate = drop_rate
+        self.max_backlog = max_backlog
+        self.report_every = report_every
+        self.disconnect_every = disconnect_every
+        self.clients = set()
+        self.sent = 0
+        self.skipped = 0
+
+    async def serve(self, duration=None):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"✅ IMU 시뮬레이터: ws://{self.host}:{self.port} ({self.model.channels}채널, "
+              f"{self.rate:g} Hz, {self.fmt})")
+        async with server:
+            try:
+                await self._broadcast_loop(duration)
+            finally:
+                for writer in list(self.clients):
+                    writer.close()
+
+    async def _broadcast_loop(self, duration):
+        period = 1.0 / self.rate
+        start = time.monotonic()
+        next_t = start
+        last_report, last_sent = start, 0
+        last_disconnect = start
+        seq = 0
+        while duration is None or time.monotonic() - start < duration:
+            now = time.monotonic()
+            if next_t > now:
+                await asyncio.sleep(next_t - now)
+            next_t += period
+            # 크게 밀린 경우 따라잡기 대신 기준 시각 재설정
+            if time.monotonic() - next_t > 1.0:
+                next_t = time.monotonic() + period
+
+            values, keep = self.model.step(period)
+            t_us = int((time.monotonic() - start) * 1e6) & 0xFFFFFFFF
+            if self.drop_rate and self.model.rng.random() < self.drop_rate:
+                seq += 1    # 전송 손실 흉내: 번호만 증가
+                continue
+            if self.clients:
+                self._broadcast(self._encode(seq, t_us, values, keep))
+            seq += 1
+
+            now = time.monotonic()
+            if self.disconnect_every and now - last_disconnect >= self.disconnect_every:
+                for writer in list(self.clients):
+                    writer.transport.abort()
+                last_disconnect = now
+            if self.report_every and now - last_report >= self.report_every:
+                rate = (self.sent - last_sent) / (now - last_report)
+                print(f"클라이언트 {len(self.clients)} / 전송 {self.sent:,} ({rate:,.0f}/s) / 건너뜀 {self.skipped:,}")
+                last_report, last_sent = now, self.sent
+
+    def _encode(self, seq, t_us, values, keep):
+        if self.fmt == 'json':
+            return OP_TEXT, json_frame(seq, t_us, values, keep).encode('utf-8')
+        # 바이너리 프레임은 채널 id = 행 번호이므로 dropout 채널은 NaN 으로 보냄
+        values = np.where(keep[:, None], values, np.nan)
+        fmt = FMT_I16 if self.fmt == 'bin16' else FMT_F32
+        return OP_BINARY, encode_frame(values, seq=seq, micros=t_us, t_us=np.full(len(values), t_us), fmt=fmt)
+
+    def _broadcast(self, message):
+        opcode, payload = message
+        data = ws_header(opcode, len(payload)) + payload
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > self.max_backlog:
+                self.skipped += 1
+                continue
+            writer.write(data)
+            self.sent += 1
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            if not await self._handshake(reader, writer):
+                return
+            print(f"Client {peer} connected")
+            self.clients.add(writer)
+            await self._read_loop(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if writer in self.clients:
+                self.clients.discard(writer)
+                print(f"Client {peer} disconnected")
+            writer.close()
+
+    @staticmethod
+    async def _handshake(reader, writer):
+        request = await reader.readuntil(b'\r\n\r\n')
+        key = None
+        for line in request.split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'sec-websocket-key':
+                key = value.strip()
+        if key is None:
+            writer.write(b'HTTP/1.1 400 Bad Request\r\n\r\n')
+            return False
+        accept = accept_key(key)
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        await writer.drain()
+        return True
+
+    @staticmethod
+    async def _read_loop(reader, writer):
+        """클라이언트 프레임 처리: ping → pong, close → 종료 (그 외는 무시)"""
+        while True:
+            _, opcode, payload = await read_frame(reader)
+            if opcode == OP_CLOSE:
+                writer.write(ws_header(OP_CLOSE, len(payload)) + payload)
+                return
+            if opcode == OP_PING:
+                writer.write(ws_header(OP_PONG, len(payload)) + payload)
+
+
+def _main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="IMU_connect.ino 대역 WebSocket 시뮬레이터")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--devices", type=int, default=1, help="장비 수 (port 부터 연속된 포트로 하나씩)")
+    ap.add_argument("--channels", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=10.0, help="초당 프레임 수 (펌웨어 기본 10)")
+    ap.add_argument("--format", choices=("json", "bin", "bin16"), default="json")
+    ap.add_argument("--bias", type=float, default=0.05, help="채널별 잔여 자이로 bias 표준편차 (dps)")
+    ap.add_argument("--drift", type=float, default=0.01, help="채널별 yaw drift 표준편차 (deg/s)")
+    ap.add_argument("--noise", type=float, default=0.02, help="측정 잡음 표준편차")
+    ap.add_argument("--fault", action="append", default=[], help="CH:KIND[:VALUE] (여러 번 지정 가능)")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="프레임 손실 확률 (seq 는 증가)")
+    ap.add_argument("--disconnect-every", type=float, help="S 초마다 모든 클라이언트 연결 끊기")
+    ap.add_argument("--duration", type=float, help="실행 시간(초), 생략 시 Ctrl+C 까지")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    faults = dict(parse_fault(f) for f in args.fault)
+    servers = []
+    for i in range(args.devices):
+        model = IMUModel(args.channels, bias=args.bias, drift=args.drift, noise=args.noise,
+                         seed=None if args.seed is None else args.seed + i, faults=faults)
+        servers.append(SimulatorServer(model, rate=args.rate, fmt=args.format, host=args.host,
+                                       port=args.port + i, drop_rate=args.drop_rate,
+                                       report_every=5.0 if args.devices == 1 else 0,
+                                       disconnect_every=args.disconnect_every))
+
+    async def serve_all():
+        await asyncio.gather(*(server.serve(args.duration) for server in servers))
+
+    try:
+        asyncio.run(serve_all())
+    except KeyboardInterrupt:
+        pass
+    print(f"전송 {sum(s.sent for s in servers):,} / 건너뜀 {sum(s.skipped for s in servers):,}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+# imu_upload.py
+"""
+API 업로드 클라이언트 (POST /imu)
+
+- 작업 스레드마다 requests.Session 하나 (keep-alive 연결 재사용), 스레드 풀로 여러 건 동시 전송
+- UI 스레드를 막지 않음: submit() 은 바로 반환, 건별 결과 on_item / 전체 결과 on_done 은 dispatch 로 전달
+- batch_path 를 주면 batch_size 건씩 JSON 배열로 전송 (서버가 404/405 면 건별 전송으로 전환)
+- POST 는 멱등이 아니므로 자동 재시도하지 않음 (실패 건은 결과로 보고, 재시도는 imu_outbox 가 멱등 키와 함께 담당)
+- items 의 각 항목은 (key, payload) 또는 (key, payload, 추가 헤더)
+
+테스트용 대역 서버 / 벤치마크
+    python imu_upload.py --serve --port 8000 --latency 0.05
+    python imu_upload.py --bench http://127.0.0.1:8000 --items 64 --workers 8
+"""
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from imu_metrics import metrics
+
+UploadResult = namedtuple('UploadResult', ['key', 'ok', 'status', 'detail', 'seconds'])
+
+
+def _detail(resp):
+    try:
+        return resp.json().get("detail", resp.text)
+    except Exception:
+        return resp.text
+
+
+class UploadClient:
+    def __init__(self, base_url, token=None, max_workers=8, timeout=(3.05, 10), dispatch=None,
+                 batch_path=None, batch_size=50):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.batch_path = batch_path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="imu-upload")
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            if self.token:
+                session.headers["X-Auth-Token"] = self.token
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    # ----------------- 전송 -----------------
+    def post(self, path, payload, headers=None):
+        """현재 스레드에서 POST 한 건 → (ok, status, detail)"""
+        with metrics.timer('upload'):
+            resp = self._session().post(f"{self.base_url}{path}", json=payload, headers=headers,
+                                        timeout=self.timeout)
+        if resp.status_code in (200, 201):
+            return True, resp.status_code, None
+        return False, resp.status_code, _detail(resp)
+
+    def _post_item(self, key, payload, path, headers=None):
+        t0 = time.perf_counter()
+        try:
+            ok, status, detail = self.post(path, payload, headers)
+        except Exception as e:
+            ok, status, detail = False, None, str(e)
+        return UploadResult(key, ok, status, detail, time.perf_counter() - t0)
+
+    def _post_batch(self, items):
+        """배치 전송 → 결과 목록. 서버가 배치를 지원하지 않으면 None"""
+        t0 = time.perf_counter()
+        try:
+            ok, status, detail = self.post(self.batch_path, [item[1] for item in items])
+        except Exception as e:
+            ok, status, detail = False, None, str(e)
+        if status in (404, 405):
+            return None
+        seconds = time.perf_counter() - t0
+        return [UploadResult(item[0], ok, status, detail, seconds) for item in items]
+
+    def upload_all(self, items, path='/imu', on_item=None):
+        """
+        items: [(key, payload)] 를 동시 전송하고 결과 목록 반환 (현재 스레드는 완료까지 대기)
+        on_item(result) 은 건별 완료 시 작업 스레드에서 호출
+        """
+        items = list(items)
+        # 항목별 헤더(멱등 키 등)가 있으면 배치로 묶지 않음
+        if self.batch_path and not any(len(item) > 2 for item in items):
+            chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+            batches = list(self._pool.map(self._post_batch, chunks))
+            if all(b is not None for b in batches):
+                results = [r for batch in batches for r in batch]
+                if on_item is not None:
+                    for r in results:
+                        on_item(r)
+                return results
+            print("⚠️ 배치 업로드 미지원 서버 - 건별 전송으로 전환")
+            self.batch_path = None
+
+        def run(item):
+            result = self._post_item(item[0], item[1], path, item[2] if len(item) > 2 else None)
+            if on_item is not None:
+                on_item(result)
+            return result
+        return list(self._pool.map(run, items))
+
+    def submit(self, items, path='/imu', on_item=None, on_done=None):
+        """
+        백그라운드 업로드 (바로 반환)
+        on_item(result, 완료 수, 전체 수) / on_done([UploadResult]) 는 dispatch 로 전달 (GUI 는 root.after)
+        """
+        items = list(items)
+        total = len(items)
+        done = [0]
+        done_lock = threading.Lock()
+
+        def item_done(result):
+            with done_lock:
+                done[0] += 1
+                n = done[0]
+            if on_item is not None:
+                self.dispatch(lambda: on_item(result, n, total))
+
+        def run():
+            try:
+                results = self.upload_all(items, path, on_item=item_done)
+            except Exception as e:
+                results = [UploadResult(item[0], False, None, str(e), 0.0) for item in items]
+            if on_done is not None:
+                self.dispatch(lambda: on_done(results))
+
+        thread = threading.Thread(target=run, name="imu-upload-batch", daemon=True)
+        thread.start()
+        return thread
+
+
+def summarize_results(results, label=lambda key: f"센서 {key}"):
+    """(성공 수, 실패 수, 실패 상세 문자열 목록)"""
+    failures = [f"{label(r.key)}: {r.status} {r.detail}" if r.status else f"{label(r.key)}: {r.detail}"
+                for r in results if not r.ok]
+    return len(results) - len(failures), len(failures), failures
+
+
+# ----------------- 테스트용 대역 서버 -----------------
+def serve_stub(host='127.0.0.1', port=8000, latency=0.0, fail_every=0):
+    """POST /auth/login, /imu, /imu/batch 를 받는 HTTP/1.1 keep-alive 서버 (latency 초 지연, Idempotency-Key 중복 제거)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    counter = {'n': 0}
+    seen = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            if latency:
+                time.sleep(latency)
+            if self.path == '/auth/login':
+                email = body.get('email', 'stub@local')
+                return self._reply(200, {'token': 'stub-token', 'summary': {'name': email.split('@')[0], 'email': email}})
+            if self.path not in ('/imu', '/imu/batch'):
+                return self._reply(404, {'detail': 'Not Found'})
+            idem = self.headers.get('Idempotency-Key')
+            with lock:
+                if idem and idem in seen:
+                    # 같은 멱등 키 재전송 → 새로 만들지 않고 처음 응답 그대로
+                    return self._reply(200, seen[idem])
+                counter['n'] += 1
+                n = counter['n']
+            if fail_every and n % fail_every == 0:
+                return self._reply(422, {'detail': f'stub failure #{n}'})
+            reply = {'id': n, 'count': len(body) if isinstance(body, list) else 1}
+            if idem:
+                with lock:
+                    seen[idem] = reply
+            return self._reply(201, reply)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"대역 API 서버: http://{host}:{port} (지연 {latency * 1000:.0f}ms)")
+    return server
+
+
+def _main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="API 업로드 대역 서버 / 업로드 벤치마크")
+    ap.add_argument("--serve", action="store_true", help="대역 API 서버 실행")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--latency", type=float, default=0.0, help="대역 서버 요청당 지연(초)")
+    ap.add_argument("--fail-every", type=int, default=0, help="대역 서버가 N 번째 요청마다 422 응답")
+    ap.add_argument("--bench", metavar="BASE_URL", help="업로드 벤치마크 대상 (예: http://127.0.0.1:8000)")
+    ap.add_argument("--items", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    if args.serve:
+        server = serve_stub(args.host, args.port, args.latency, args.fail_every)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.bench:
+        import requests
+        items = [(i, {"serial": f"SENSOR-{i:02d}", "passed": True, "roll": 0.0, "pitch": 0.0, "yaw": 0.0})
+                 for i in range(args.items)]
+        t0 = time.perf_counter()
+        for _, payload in items:
+            requests.post(f"{args.bench}/imu", json=payload, timeout=10)
+        serial = time.perf_counter() - t0
+
+        client = UploadClient(args.bench, max_workers=args.workers)
+        t0 = time.perf_counter()
+        results = client.upload_all(items)
+        pooled = time.perf_counter() - t0
+        client.close()
+        ok, failed, _ = summarize_results(results)
+        print(f"{args.items}건: 순차 {serial:.2f}초 / 풀+동시({args.workers}) {pooled:.2f}초 "
+              f"(성공 {ok}, 실패 {failed})")
+        return
+    ap.print_help()
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+# imu_ws.py
+"""
+asyncio 용 최소 WebSocket (RFC 6455) 구현 - 표준 라이브러리만 사용
+
+- WSConnection.connect(url): 클라이언트 연결 (imu_ingest 다중 장비 수신)
+- accept_key / read_frame / ws_header: 서버 측 핸드셰이크·프레임 처리 (imu_simulator)
+- Backoff: 재연결 지연 (지수 증가 + jitter, 엔진/다중 장비 수신 공용)
+- 확장(permessage-deflate 등)과 TLS(wss://)는 지원하지 않음 (ESP8266 펌웨어도 사용하지 않음)
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import struct
+from urllib.parse import urlsplit
+
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class ConnectionClosed(ConnectionError):
+    pass
+
+
+class Backoff:
+    """
+    재연결 지연: initial × factor^n (maximum 상한) 에서 jitter 비율만큼 무작위로 줄임
+    여러 장비가 같은 AP 장애 후 동시에 재접속하지 않도록 분산
+    """
+    def __init__(self, initial=0.5, maximum=30.0, factor=2.0, jitter=0.5):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next(self):
+        delay = min(self.maximum, self.initial * self.factor ** self.attempt)
+        self.attempt += 1
+        return delay * (1.0 - self.jitter * random.random())
+
+    def reset(self):
+        self.attempt = 0
+
+
+def accept_key(key):
+    """Sec-WebSocket-Key → Sec-WebSocket-Accept"""
+    return base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+
+
+def ws_header(opcode, length, fin=True, mask=None):
+    """프레임 헤더 (mask 4바이트를 주면 클라이언트용 masked 헤더)"""
+    b0 = (0x80 if fin else 0) | opcode
+    mbit = 0x80 if mask else 0
+    if length < 126:
+        head = struct.pack('!BB', b0, mbit | length)
+    elif length < (1 << 16):
+        head = struct.pack('!BBH', b0, mbit | 126, length)
+    else:
+        head = struct.pack('!BBQ', b0, mbit | 127, length)
+    return head + mask if mask else head
+
+
+def apply_mask(payload, mask):
+    """XOR mask (바이트 반복 대신 큰 정수 한 번으로 처리)"""
+    n = len(payload)
+    if n == 0:
+        return b''
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'little') ^ int.from_bytes(key, 'little')).to_bytes(n, 'little')
+
+
+async def read_frame(reader):
+    """프레임 하나 읽기 → (fin, opcode, payload)"""
+    b0, b1 = await reader.readexactly(2)
+    length = b1 & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = apply_mask(payload, mask)
+    return bool(b0 & 0x80), b0 & 0x0F, payload
+
+
+class WSConnection:
+    """클라이언트 연결. recv() 는 텍스트 프레임은 str, 바이너리 프레임은 bytes 로 반환"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, url, timeout=5.0):
+        parts = urlsplit(url)
+        if parts.scheme != 'ws':
+            raise ValueError(f"지원하지 않는 주소: {url} (ws:// 만 지원)")
+        host, port = parts.hostname, parts.port or 80
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        try:
+            key = base64.b64encode(os.urandom(16))
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n'
+                         f'Connection: Upgrade\r\nSec-WebSocket-Version: 13\r\n'.encode('ascii')
+                         + b'Sec-WebSocket-Key: ' + key + b'\r\n\r\n')
+            response = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+            status = response.split(b'\r\n', 1)[0]
+            if status.split()[1:2] != [b'101']:
+                raise ConnectionError(f"WebSocket 핸드셰이크 실패: {status.decode('latin-1')}")
+            expected = accept_key(key)
+            for line in response.split(b'\r\n')[1:]:
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'sec-websocket-accept' and value.strip() == expected:
+                    break
+            else:
+                raise ConnectionError("WebSocket 핸드셰이크 실패: Sec-WebSocket-Accept 불일치")
+        except BaseException:
+            writer.close()
+            raise
+        return cls(reader, writer)
+
+    async def recv(self):
+        """다음 데이터 메시지 (ping 에는 pong 으로 응답, 종료 시 ConnectionClosed)"""
+        parts, opcode = [], None
+        while True:
+            try:
+                fin, op, payload = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                self.closed = True
+                raise ConnectionClosed(str(e)) from e
+            if op == OP_PING:
+                self._send(OP_PONG, payload)
+                continue
+            if op == OP_PONG:
+                continue
+            if op == OP_CLOSE:
+                if not self.closed:
+                    self._send(OP_CLOSE, payload[:2])
+                self.closed = True
+                raise ConnectionClosed("서버가 연결을 종료했습니다")
+            if op != OP_CONT:
+                opcode = op
+            parts.append(payload)
+            if fin:
+                data = b''.join(parts) if len(parts) > 1 else parts[0]
+                return data.decode('utf-8') if opcode == OP_TEXT else data
+
+    def _send(self, opcode, payload):
+        mask = os.urandom(4)
+        self.writer.write(ws_header(opcode, len(payload), mask=mask) + apply_mask(payload, mask))
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self._send(OP_CLOSE, struct.pack('!H', 1000))
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+        self.writer.close()